@@ -0,0 +1,4 @@
+"""
+Benchmark of the geometry pipeline on synthetic fixtures; see
+`bench.run_bench`.
+"""
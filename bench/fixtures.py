@@ -0,0 +1,235 @@
+"""
+This module generates the synthetic inputs of the geometry benchmark:
+a river reach, parcels along its banks and a GeoTIFF DEM, written with
+the file names the program expects under `./gis`.
+
+The reach runs west to east and meanders as a sine wave. All layers
+use EPSG:6441 (feet), like the production data.
+
+Layers written to `<directory>/gis`:
+- suw_eb_line.shp, suw_wb_line.shp: bank lines.
+- efldwy_l.shp, wfldwy_l.shp: floodway lines.
+- suw_cut.shp: the centerline cut into one segment (fid) per pair of
+  cross sections.
+- suw_xs.shp: cross sections with their river station (stream_stn).
+- subset_parcels20.shp, parcels20.shp: parcels with a PARCELID.
+- dem.tiff: the DEM; a trapezoidal channel whose banks rise towards
+  the floodway lines and beyond.
+
+Functions:
+- build_fixtures(directory, parcels=8, reach_length=8000.0,
+  cell_size=2.0, seed=0):
+    Writes every layer and returns a Fixtures description.
+"""
+import math
+import os
+import random
+from collections import namedtuple
+import geopandas as gpd
+import numpy as np
+import rasterio
+import rasterio.windows
+from rasterio.transform import from_origin
+from shapely.geometry import LineString, Point, Polygon
+from shapely.ops import substring
+
+CRS = "epsg:6441"
+ORIGIN = (2500000.0, 400000.0)
+AMPLITUDE = 300.0
+WAVELENGTH = 6000.0
+CHANNEL_HALF_WIDTH = 120.0
+FLOODWAY_HALF_WIDTH = 900.0
+XS_SPACING = 1000.0
+CHANNEL_BED = 5.0
+BANK_TOP = 25.0
+FLOODWAY_TOP = 45.0
+
+Fixtures = namedtuple(
+    "Fixtures",
+    ["gis_dir", "dem_path", "parcel_ids", "centerline", "xs_stations"]
+    )
+
+
+def _centerline(reach_length, step=10.0):
+    x0, y0 = ORIGIN
+    xs = np.arange(0.0, reach_length + step, step)
+    ys = AMPLITUDE * np.sin(2 * math.pi * xs / WAVELENGTH)
+    return LineString(zip(x0 + xs, y0 + ys))
+
+
+def _offset(line, distance):
+    """
+    Parallel of `line` at `distance` feet to its left (negative: right).
+    """
+    side = "left" if distance > 0 else "right"
+    offset = line.parallel_offset(abs(distance), side, join_style=2)
+    if offset.geom_type != "LineString":
+        offset = max(offset.geoms, key=lambda g: g.length)
+    coords = list(offset.coords)
+    # shapely returns right-hand offsets reversed
+    if Point(coords[0]).distance(Point(line.coords[0])) \
+        > Point(coords[-1]).distance(Point(line.coords[0])):
+        coords.reverse()
+    return LineString(coords)
+
+
+def _write(gdf, path):
+    gdf.set_crs(CRS, inplace=True, allow_override=True)
+    gdf.to_file(path)
+
+
+def _parcels(centerline, count, rng):
+    """
+    Builds `count` parcels alternating between the north and south
+    bank. Frontage (75-300 ft), depth (200-900 ft) and skew vary so that
+    the skeleton and convex hull steps see different shapes.
+    """
+    parcels = []
+    spacing = centerline.length / (count + 1)
+    for i in range(count):
+        frontage = rng.uniform(75.0, 300.0)
+        depth = rng.uniform(200.0, 900.0)
+        skew = rng.uniform(-0.4, 0.4) * depth
+        side = 1 if i % 2 == 0 else -1
+        start = spacing * (i + 1) - frontage / 2
+        edge = substring(centerline, start, start + frontage)
+        near = _offset(edge, side * (CHANNEL_HALF_WIDTH + 10.0))
+        far = _offset(edge, side * (CHANNEL_HALF_WIDTH + 10.0 + depth))
+        p1, p2 = near.coords[0], near.coords[-1]
+        q1, q2 = far.coords[0], far.coords[-1]
+        dx = (q2[0] - q1[0]) / max(edge.length, 1.0)
+        dy = (q2[1] - q1[1]) / max(edge.length, 1.0)
+        q1 = (q1[0] + dx * skew, q1[1] + dy * skew)
+        q2 = (q2[0] + dx * skew, q2[1] + dy * skew)
+        parcels.append(Polygon([p1, p2, q2, q1]))
+    return parcels
+
+
+def _dem(centerline, path, cell_size):
+    """
+    Writes a DEM whose elevation depends on the distance from the
+    centerline: channel bed, bank slope up to the bank top, a gentle
+    rise to the floodway lines and a steeper one beyond, plus a little
+    noise so that contours are not perfectly parallel.
+    """
+    minx, miny, maxx, maxy = centerline.buffer(
+        FLOODWAY_HALF_WIDTH + 1500.0).bounds
+    width = int(math.ceil((maxx - minx) / cell_size))
+    height = int(math.ceil((maxy - miny) / cell_size))
+    transform = from_origin(minx, maxy, cell_size, cell_size)
+    xs = minx + (np.arange(width) + 0.5) * cell_size
+    x0, y0 = ORIGIN
+    center_y = y0 + AMPLITUDE * np.sin(2 * math.pi * (xs - x0) / WAVELENGTH)
+    slope = np.cos(2 * math.pi * (xs - x0) / WAVELENGTH) \
+        * 2 * math.pi * AMPLITUDE / WAVELENGTH
+    rng = np.random.default_rng(0)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=1,
+        dtype="float32",
+        crs=CRS,
+        transform=transform,
+        tiled=True,
+        compress="deflate"
+        ) as dst:
+        block = 512
+        for row in range(0, height, block):
+            rows = min(block, height - row)
+            ys = maxy - (row + np.arange(rows) + 0.5) * cell_size
+            # perpendicular distance to a locally straight centerline
+            d = np.abs(ys[:, None] - center_y[None, :]) \
+                / np.sqrt(1 + slope[None, :] ** 2)
+            z = np.where(
+                d <= CHANNEL_HALF_WIDTH,
+                CHANNEL_BED + (BANK_TOP - CHANNEL_BED) \
+                    * (d / CHANNEL_HALF_WIDTH) ** 2,
+                np.where(
+                    d <= FLOODWAY_HALF_WIDTH,
+                    BANK_TOP + (FLOODWAY_TOP - BANK_TOP) \
+                        * (d - CHANNEL_HALF_WIDTH) \
+                        / (FLOODWAY_HALF_WIDTH - CHANNEL_HALF_WIDTH),
+                    FLOODWAY_TOP + 0.02 * (d - FLOODWAY_HALF_WIDTH)
+                    )
+                )
+            z = z + rng.normal(0.0, 0.05, z.shape)
+            dst.write(
+                z.astype("float32"),
+                1,
+                window=rasterio.windows.Window(0, row, width, rows)
+                )
+
+
+def build_fixtures(
+    directory,
+    parcels=8,
+    reach_length=8000.0,
+    cell_size=2.0,
+    seed=0
+    ):
+    """
+    Writes the synthetic reach, parcels and DEM.
+
+    :param directory: Benchmark workspace; layers go to `gis/` in it.
+    :param parcels: Number of parcels.
+    :param reach_length: Length of the reach in feet.
+    :param cell_size: DEM resolution in feet.
+    :param seed: Seed for the parcel shapes.
+    :return: A Fixtures tuple.
+    """
+    rng = random.Random(seed)
+    gis_dir = os.path.join(str(directory), "gis")
+    os.makedirs(gis_dir, exist_ok=True)
+    centerline = _centerline(reach_length)
+    eb = _offset(centerline, -CHANNEL_HALF_WIDTH)
+    wb = _offset(centerline, CHANNEL_HALF_WIDTH)
+    efldwy = _offset(centerline, -FLOODWAY_HALF_WIDTH)
+    wfldwy = _offset(centerline, FLOODWAY_HALF_WIDTH)
+    _write(gpd.GeoDataFrame(geometry=[eb]),
+           os.path.join(gis_dir, "suw_eb_line.shp"))
+    _write(gpd.GeoDataFrame(geometry=[wb]),
+           os.path.join(gis_dir, "suw_wb_line.shp"))
+    _write(gpd.GeoDataFrame(geometry=[efldwy]),
+           os.path.join(gis_dir, "efldwy_l.shp"))
+    _write(gpd.GeoDataFrame(geometry=[wfldwy]),
+           os.path.join(gis_dir, "wfldwy_l.shp"))
+    distances = np.arange(0.0, centerline.length, XS_SPACING).tolist()
+    distances.append(centerline.length)
+    # river stations in miles, decreasing downstream (eastwards)
+    stations = [
+        round((centerline.length - d) / 5280.0 + 10.0, 3) for d in distances]
+    segments = [
+        substring(centerline, a, b) for a, b in zip(distances, distances[1:])]
+    _write(
+        gpd.GeoDataFrame(
+            {"fid": list(range(1, len(segments) + 1))}, geometry=segments),
+        os.path.join(gis_dir, "suw_cut.shp")
+        )
+    sections = []
+    for d in distances:
+        point = centerline.interpolate(d)
+        ahead = centerline.interpolate(min(d + 1.0, centerline.length))
+        behind = centerline.interpolate(max(d - 1.0, 0.0))
+        angle = math.atan2(ahead.y - behind.y, ahead.x - behind.x)
+        nx, ny = -math.sin(angle), math.cos(angle)
+        half = FLOODWAY_HALF_WIDTH + 200.0
+        sections.append(LineString([
+            (point.x - nx * half, point.y - ny * half),
+            (point.x + nx * half, point.y + ny * half),
+            ]))
+    _write(
+        gpd.GeoDataFrame({"stream_stn": stations}, geometry=sections),
+        os.path.join(gis_dir, "suw_xs.shp")
+        )
+    parcel_shapes = _parcels(centerline, parcels, rng)
+    parcel_ids = [f"BENCH-{i + 1:04d}" for i in range(len(parcel_shapes))]
+    gdf_parcels = gpd.GeoDataFrame(
+        {"PARCELID": parcel_ids}, geometry=parcel_shapes)
+    _write(gdf_parcels, os.path.join(gis_dir, "subset_parcels20.shp"))
+    _write(gdf_parcels.copy(), os.path.join(gis_dir, "parcels20.shp"))
+    dem_path = os.path.join(gis_dir, "dem.tiff")
+    _dem(centerline, dem_path, cell_size)
+    return Fixtures(gis_dir, dem_path, parcel_ids, centerline, stations)
@@ -0,0 +1,90 @@
+"""
+This module sets up a local PostGIS database as a stand-in for the
+remote one queried by the postgis backend of `hecras_calc`, so that the
+benchmark measures the same queries without the network round trips
+to the production server (and without touching its tables).
+
+Functions:
+- load_stand_in(url, fixtures):
+    Creates the reference tables the stages query from the synthetic
+    fixtures.
+
+- use_stand_in(url, modules):
+    Points the `create_engine` of the given modules (stages, or
+    helpers.db) at `url`.
+
+Note:
+- The stages use the SQLAlchemy 1.x `engine.execute` API, so the
+  stand-in needs the same SQLAlchemy version as the program.
+"""
+import os
+import geopandas as gpd
+import sqlalchemy
+from shapely.geometry import Point
+
+CRS = "epsg:6441"
+
+
+def _to_postgis(gdf, name, engine):
+    gdf = gdf.set_crs(CRS, allow_override=True)
+    gdf = gdf.rename_geometry("geom")
+    gdf.to_postgis(name, engine, if_exists="replace")
+
+
+def _points(line):
+    return gpd.GeoDataFrame(geometry=[Point(c) for c in line.coords])
+
+
+def load_stand_in(url, fixtures):
+    """
+    Loads the synthetic reference layers into a PostGIS database with
+    the table and column names used by the stage queries.
+
+    :param url: SQLAlchemy URL of the stand-in database.
+    :param fixtures: The bench.fixtures.Fixtures to load.
+    """
+    engine = sqlalchemy.create_engine(url)
+    gis_dir = fixtures.gis_dir
+    try:
+        engine.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
+        for name in ("suw_eb_line", "suw_wb_line", "efldwy_l", "wfldwy_l"):
+            gdf = gpd.read_file(os.path.join(gis_dir, f"{name}.shp"))
+            _to_postgis(gdf, name, engine)
+            if name.endswith("fldwy_l"):
+                _to_postgis(
+                    _points(gdf.geometry[0]),
+                    name.replace("_l", "_pt"),
+                    engine
+                    )
+        suw_cut = gpd.read_file(os.path.join(gis_dir, "suw_cut.shp"))
+        _to_postgis(suw_cut, "suw_cut", engine)
+        stations = gpd.read_file(os.path.join(gis_dir, "suw_xs.shp"))
+        xs_points = gpd.GeoDataFrame(
+            {"stream_stn": stations["stream_stn"]},
+            geometry=[
+                fixtures.centerline.intersection(line)
+                for line in stations.geometry
+                ]
+            )
+        _to_postgis(xs_points, "suw_xs_pt", engine)
+        _to_postgis(
+            gpd.GeoDataFrame(geometry=[fixtures.centerline]),
+            "suw_cl_l_merged",
+            engine
+            )
+    finally:
+        engine.dispose()
+
+
+def use_stand_in(url, modules):
+    """
+    Replaces `create_engine` in each module so that the hard-coded
+    connection string is swapped for `url`; pool options are kept.
+
+    :param url: SQLAlchemy URL of the stand-in database.
+    :param modules: Modules that call create_engine.
+    """
+    def create_engine(_, **kwargs):
+        return sqlalchemy.create_engine(url, **kwargs)
+    for module in modules:
+        module.create_engine = create_engine
@@ -0,0 +1,460 @@
+"""
+This module runs the geometry benchmark: it generates the synthetic
+fixtures of `bench.fixtures`, runs the geometry stages for every
+synthetic parcel in the order main runs them, and writes the timings as
+JSON so that results can be compared across commits.
+
+Stages timed individually and end to end:
+parcel_geometry, center_line, center_tob, bank_geom, hecras_calc,
+parcel_builder. Every iteration also times `hecras_batch` over all the
+parcels, reported per parcel.
+
+No stage needs PostGIS by default. With FLOODWAY_GEOMETRY_BACKEND=postgis
+`hecras_calc` queries a local stand-in database loaded with the
+fixtures, given with `--postgis URL` (see `bench.postgis`); without it,
+it and the stages that need its output are reported as "skipped". The
+network stages (water level, FEMA data) are replaced by fixed values.
+
+Usage:
+    python -m bench.run_bench --parcels 8 --repeat 3 \\
+        --output bench_results.json [--postgis URL] [--dem-store]
+    python -m bench.run_bench --compare old.json new.json
+
+Functions:
+- run_benchmark(workspace, parcels, repeat, postgis=None, cell_size=2.0,
+  seed=0, dem_store=False):
+    Runs the benchmark and returns the result dict.
+
+- compare(old, new):
+    Formats the median change of every stage between two results.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGE_ORDER = (
+    "parcel_geometry",
+    "center_line",
+    "center_tob",
+    "bank_geom",
+    "hecras_calc",
+    "parcel_builder",
+    "write_artifacts",
+    )
+# replaces the network stages: flood levels from fema_data and the
+# water surface elevation from water_level
+YR100, YR50, YR10 = 40.0, 36.0, 30.0
+FIRM_PANEL = "BENCH"
+WATER_LEVEL_EL = 15.0
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+            ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _logger(workspace):
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.DEBUG)
+    handler = logging.FileHandler(os.path.join(workspace, "bench.log"))
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    try:
+        result = func(*args)
+        error = None
+    except Exception as e:
+        result = None
+        error = f"{type(e).__name__}: {e}"
+    return result, time.perf_counter() - started, error
+
+
+def _run_parcel(modules, projectnumber, parcelid, logger, postgis):
+    """
+    Runs the geometry stages for one parcel.
+
+    :return: Dict of stage name to {"seconds", "status", "error"}.
+    """
+    timings = {}
+    # every parcel is its own project: no DEM window or artifacts
+    # carried over
+    modules["dem_window"].clear()
+    modules["artifacts"].clear()
+
+    def run(name, func, *args):
+        result, seconds, error = _timed(func, *args)
+        # the stages log and swallow their own errors and return None
+        status = "done" if error is None and result is not None else "failed"
+        timings[name] = {
+            "seconds": seconds, "status": status, "error": error}
+        return result if status == "done" else None
+
+    def skip(name, reason):
+        timings[name] = {"seconds": None, "status": "skipped", "error": reason}
+
+    geometry = run(
+        "parcel_geometry",
+        modules["parcel_geometry"].parcel_geometry,
+        projectnumber,
+        parcelid,
+        logger
+        )
+    if geometry is None:
+        for name in STAGE_ORDER[1:]:
+            skip(name, "parcel_geometry failed")
+        return timings
+    gs_1, river_frontage_length, gs_setback = geometry
+    center = run(
+        "center_line",
+        modules["center_line"].center_line,
+        gs_1,
+        river_frontage_length,
+        logger
+        )
+    gs_center = center[0] if center else None
+    tob = None
+    if gs_center is None:
+        skip("center_tob", "center_line failed")
+        skip("bank_geom", "center_line failed")
+    else:
+        tob = run(
+            "center_tob",
+            modules["center_tob"].center_tob,
+            gs_center,
+            river_frontage_length,
+            logger
+            )
+        if tob is None:
+            skip("bank_geom", "center_tob failed")
+        else:
+            run(
+                "bank_geom",
+                modules["bank_geom"].bank_geom,
+                projectnumber,
+                WATER_LEVEL_EL,
+                gs_center,
+                tob[0],
+                gs_1,
+                gs_setback,
+                logger
+                )
+    if modules["hecras"].GEOMETRY_BACKEND == "postgis" and not postgis:
+        skip("hecras_calc", "no PostGIS stand-in (--postgis)")
+        skip("parcel_builder", "hecras_calc skipped")
+        return timings
+    hxline = run(
+        "hecras_calc",
+        modules["hecras"].hecras_calc,
+        projectnumber,
+        gs_1,
+        YR100,
+        YR50,
+        YR10,
+        FIRM_PANEL,
+        logger
+        )
+    if gs_center is None or hxline is None \
+        or timings.get("bank_geom", {}).get("status") != "done":
+        skip("parcel_builder", "an input stage failed")
+        return timings
+    started = time.perf_counter()
+    try:
+        modules["parcel_builder"].parcel_builder(
+            projectnumber,
+            gs_center,
+            gs_setback,
+            YR100,
+            YR50,
+            YR10,
+            WATER_LEVEL_EL,
+            river_frontage_length,
+            logger
+            )
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    # parcel_builder returns None on success as well
+    timings["parcel_builder"] = {
+        "seconds": time.perf_counter() - started,
+        "status": "done" if error is None else "failed",
+        "error": error,
+        }
+    return timings
+
+
+def _write_artifacts(modules):
+    """
+    Writes the artifacts of a parcel, as run_pipeline does at the end
+    of a project.
+    """
+    written, seconds, error = _timed(
+        modules["artifacts"].write_artifacts, lambda message: None)
+    return {
+        "seconds": seconds,
+        "status": "done" if error is None else "failed",
+        "error": error,
+        }
+
+
+def _hecras_batch(modules, parcels):
+    """
+    Builds the cross sections of every parcel with one hecras_batch
+    call, to compare its cost per parcel with hecras_calc.
+    """
+    batch, seconds, error = _timed(
+        modules["hecras"].hecras_batch, parcels, None, lambda message: None)
+    results = batch[0] if batch else ()
+    return {
+        "seconds": seconds,
+        "per_parcel": seconds / len(parcels) if error is None else None,
+        "done": sum(1 for r in results if r is not None),
+        "error": error,
+        }
+
+
+def _summary(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "runs": len(values),
+        "min": min(values),
+        "median": statistics.median(values),
+        "mean": statistics.mean(values),
+        "max": max(values),
+        }
+
+
+def run_benchmark(
+    workspace,
+    parcels,
+    repeat,
+    postgis=None,
+    cell_size=2.0,
+    seed=0,
+    dem_store=False
+    ):
+    """
+    Generates the fixtures in `workspace` and times the geometry stages.
+
+    :param workspace: Empty directory used as the job workspace.
+    :param parcels: Number of synthetic parcels.
+    :param repeat: Number of runs over all parcels.
+    :param postgis: SQLAlchemy URL of a local PostGIS stand-in, or None.
+    :param cell_size: DEM resolution in feet.
+    :param seed: Seed for the parcel shapes.
+    :param dem_store: Prepare the tiled DEM store of the fixture DEM
+    (helpers.dem_store) so that the stages read through it.
+    :return: Result dict (see the module docstring).
+    """
+    workspace = os.path.abspath(str(workspace))
+    # dirs_configs.config picks the project tree at import time
+    os.environ["FLOODWAY_JOB_DIR"] = workspace
+    os.chdir(workspace)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    from bench.fixtures import build_fixtures
+    started = time.perf_counter()
+    fixtures = build_fixtures(
+        workspace, parcels=parcels, cell_size=cell_size, seed=seed)
+    if dem_store:
+        from helpers.dem_store import prepare_store
+        prepare_store(fixtures.dem_path, log=lambda message: None)
+    fixture_seconds = time.perf_counter() - started
+    import_started = time.perf_counter()
+    from dirs_configs import config
+    from helpers import artifacts, db, dem_window
+    from geometry import (
+        bank_geom,
+        center_line,
+        center_tob,
+        hecras,
+        parcel_builder,
+        parcel_geometry
+        )
+    import_seconds = time.perf_counter() - import_started
+    modules = {
+        "parcel_geometry": parcel_geometry,
+        "center_line": center_line,
+        "center_tob": center_tob,
+        "bank_geom": bank_geom,
+        "hecras": hecras,
+        "parcel_builder": parcel_builder,
+        "dem_window": dem_window,
+        "artifacts": artifacts,
+        }
+    for module in modules.values():
+        if hasattr(module, "IN_DEM_MAIN"):
+            module.IN_DEM_MAIN = fixtures.dem_path
+    if postgis:
+        from bench.postgis import load_stand_in, use_stand_in
+        load_stand_in(postgis, fixtures)
+        use_stand_in(postgis, (db,))
+    for directory in (
+        config.DATA_DIR,
+        config.OUTPUT_DIR,
+        config.OUTPUT_DIRx,
+        config.FORM_DIR,
+        config.CADD_DIR,
+        config.LOG_DIR,
+        config.TMP_DIR,
+        config.BASE_DIR / "HECRAS"
+        ):
+        os.makedirs(directory, exist_ok=True)
+    logger = _logger(workspace)
+    import geopandas as gpd
+    parcel_shapes = list(gpd.read_file(
+        os.path.join(fixtures.gis_dir, "subset_parcels20.shp")).geometry)
+    runs = []
+    batches = []
+    for iteration in range(repeat):
+        for index, parcelid in enumerate(fixtures.parcel_ids):
+            projectnumber = f"B{index + 1:03d}"
+            started = time.perf_counter()
+            stages = _run_parcel(
+                modules, projectnumber, parcelid, logger, postgis)
+            stages["write_artifacts"] = _write_artifacts(modules)
+            runs.append({
+                "iteration": iteration,
+                "parcelid": parcelid,
+                "end_to_end": time.perf_counter() - started,
+                "stages": stages,
+                })
+        batches.append(_hecras_batch(modules, parcel_shapes))
+    stages = {}
+    for name in STAGE_ORDER:
+        records = [run["stages"].get(name, {}) for run in runs]
+        stages[name] = {
+            "timing": _summary([
+                r.get("seconds") for r in records
+                if r.get("status") == "done"]),
+            "done": sum(1 for r in records if r.get("status") == "done"),
+            "failed": sum(1 for r in records if r.get("status") == "failed"),
+            "skipped": sum(
+                1 for r in records if r.get("status") == "skipped"),
+            }
+    return {
+        "commit": _git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            "parcels": parcels,
+            "repeat": repeat,
+            "cell_size": cell_size,
+            "seed": seed,
+            "postgis": bool(postgis),
+            "dem_store": dem_store,
+            },
+        "fixture_seconds": fixture_seconds,
+        "import_seconds": import_seconds,
+        "stages": stages,
+        "end_to_end": _summary([run["end_to_end"] for run in runs]),
+        "hecras_batch": {
+            "per_parcel": _summary([b["per_parcel"] for b in batches]),
+            "done": sum(b["done"] for b in batches),
+            "errors": [b["error"] for b in batches if b["error"]],
+            },
+        "runs": runs,
+        }
+
+
+def compare(old, new):
+    """
+    :param old, new: Result dicts of run_benchmark.
+    :return: List of lines with the median of each stage and the
+    change from `old` to `new`.
+    """
+    lines = [f"{'stage':<16}{'old':>10}{'new':>10}{'change':>10}"]
+    rows = [(name, old["stages"].get(name, {}).get("timing"),
+             new["stages"].get(name, {}).get("timing"))
+            for name in STAGE_ORDER]
+    rows.append(("end_to_end", old.get("end_to_end"), new.get("end_to_end")))
+    for name, a, b in rows:
+        if not a or not b:
+            lines.append(f"{name:<16}{'-':>10}{'-':>10}{'-':>10}")
+            continue
+        change = (b["median"] - a["median"]) / a["median"] * 100
+        lines.append(
+            f"{name:<16}{a['median']:>9.3f}s{b['median']:>9.3f}s" \
+                + f"{change:>+9.1f}%")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the geometry stages on synthetic data")
+    parser.add_argument("--parcels", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cell-size", type=float, default=2.0,
+                        help="DEM resolution in feet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dem-store", action="store_true",
+                        help="read the DEM through a tiled DEM store")
+    parser.add_argument("--postgis", default=os.getenv("BENCH_POSTGIS_URL"),
+                        help="SQLAlchemy URL of a local PostGIS stand-in")
+    parser.add_argument("--workspace",
+                        help="directory for fixtures and outputs" \
+                            + " (default: a new temporary directory)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files and exit")
+    args = parser.parse_args(argv)
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        print("\n".join(compare(old, new)))
+        return 0
+    output = os.path.abspath(args.output)
+    workspace = args.workspace or tempfile.mkdtemp(prefix="floodway_bench_")
+    os.makedirs(workspace, exist_ok=True)
+    result = run_benchmark(
+        workspace,
+        args.parcels,
+        args.repeat,
+        postgis=args.postgis,
+        cell_size=args.cell_size,
+        seed=args.seed,
+        dem_store=args.dem_store
+        )
+    with open(output, "w") as f:
+        json.dump(result, f, indent=1)
+    for name in STAGE_ORDER:
+        stage = result["stages"][name]
+        median = f"{stage['timing']['median']:.3f}s" \
+            if stage["timing"] else "-"
+        print(
+            f"{name:<16}{median:>10}  done {stage['done']}," \
+                + f" failed {stage['failed']}, skipped {stage['skipped']}")
+    print(f"results written to {output} (workspace {workspace})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 import random
 import string
 
@@ -28,16 +29,57 @@ def generate_code(length=4):
     return ''.join(random.choice(characters) for _ in range(length))
 
 
-CODE = generate_code()
+def job_code(job_dir, length=4):
+    """
+    Return the project code of a job workspace, generating and storing
+    it on the first attempt so that retries of the job reuse the same
+    project tree (and its checkpointed files).
+
+    Parameters:
+    job_dir (Path): The job workspace.
+    length (int, optional): Length of a new code. Defaults to 4.
+
+    Returns:
+    str: The code stored in `job_dir/code.txt`.
+    """
+    code_file = Path(job_dir) / "code.txt"
+    if code_file.exists():
+        code = code_file.read_text().strip()
+        if code:
+            return code
+    code = generate_code(length)
+    code_file.write_text(code)
+    return code
+
+
 PARENT_DIR = Path(__file__).parent.parent
-BASE_DIR = PARENT_DIR / CODE
+# set by the pre_main job runner so concurrent projects get their own
+# workspace (project tree, tmp files, logs) inside tmp/jobs/<job_id>
+JOB_DIR = os.environ.get("FLOODWAY_JOB_DIR")
+# set by the job runner on retries: reuse valid stage checkpoints
+RESUME = os.environ.get("FLOODWAY_RESUME") == "1"
+# set by the job runner on the last attempt of a job
+FINAL_ATTEMPT = os.environ.get("FLOODWAY_FINAL_ATTEMPT") == "1"
+# how hecras_calc builds its cross section: "local" (in process, with
+# shapely) or "postgis" (the original queries, to validate against)
+GEOMETRY_BACKEND = os.environ.get("FLOODWAY_GEOMETRY_BACKEND", "local")
+# "0" skips the station/elevation spreadsheet of hecras_calc
+# (hecras_existing_xs.xlsx); the HEC-RAS geometry file is always written
+HECRAS_SPREADSHEET = os.environ.get("FLOODWAY_HECRAS_SPREADSHEET", "1") == "1"
+CODE = job_code(JOB_DIR) if JOB_DIR else generate_code()
+WORK_DIR = Path(JOB_DIR) if JOB_DIR else PARENT_DIR
+BASE_DIR = WORK_DIR / CODE
 DATA_DIR = BASE_DIR / "Property"
 OUTPUT_DIR = BASE_DIR / "zz_python_do_not_touch"
 OUTPUT_DIRx = BASE_DIR / "Cadd" / "map_imports"
 FORM_DIR = BASE_DIR / "PM"
-LOG_DIR = PARENT_DIR / "logs"
+LOG_DIR = WORK_DIR / "logs"
 INPUT_DIR = PARENT_DIR / "inputs"
-TMP_DIR = PARENT_DIR / "tmp"
+TMP_DIR = WORK_DIR / "tmp"
+# decoded DEM tiles, shared by all jobs (see helpers.dem_store)
+DEM_TILE_CACHE_DIR = PARENT_DIR / "tmp" / "dem_tiles"
 TEMPLATE_DIR = PARENT_DIR / "templates"
 CADD_DIR = BASE_DIR / "Cadd"
 RESULT_DIR = PARENT_DIR / "output"
+TEMPLATE_CONFIG_FILE = WORK_DIR / "config.json"
+CHECKPOINT_DIR = WORK_DIR / "checkpoints"
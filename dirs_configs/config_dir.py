@@ -22,14 +22,14 @@ Functions:
     Generates a JSON configuration file for copying files and
     directories.
 
-- copy_template(src: str, dest_dir: str) -> None:
+- copy_template(src: str, dest_dir: str) -> str:
     Copies a file or a directory to a specified destination directory.
 
-- copy_templates_from_config(config_file: str) -> None:
+- copy_templates_from_config(config_file: str) -> list:
     Copies multiple files or directories based on the configurations
     in a JSON file.
 
-- execute_template_operations(project_number: int or str) -> None:
+- execute_template_operations(project_number: int or str) -> list:
     Execute a series of operations to manipulate templates based on a
     specific project number.
 
@@ -42,7 +42,7 @@ import os
 import shutil
 import json
 from .config_vars import *
-from .config import PARENT_DIR
+from .config import TEMPLATE_CONFIG_FILE
 
 
 def configure_directories_structure(project_number):
@@ -288,7 +288,7 @@ def remove_empty_dicts(template_configs):
 
 
 def generate_config_file(configs,
-                        config_file_path=PARENT_DIR / 'config.json'):
+                        config_file_path=TEMPLATE_CONFIG_FILE):
     """
     Generates a JSON configuration file for copying files and
     directories.
@@ -324,17 +324,24 @@ def copy_template(src, dest_dir):
     Output:
     Prints out a message indicating whether the file or directory has
     been copied successfully.
+
+    Returns:
+    - str: Path of the copy, or None when `src` does not exist.
     """
     if os.path.isdir(src):
-        shutil.copytree(src, os.path.join(dest_dir, os.path.basename(src)))
+        copied = shutil.copytree(
+            src, os.path.join(dest_dir, os.path.basename(src)))
         print(f"Directory {src} copied to {dest_dir}")
+        return copied
     elif os.path.isfile(src):
         if not os.path.exists(dest_dir):
             os.makedirs(dest_dir)
-        shutil.copy(src, dest_dir)
+        copied = shutil.copy(src, dest_dir)
         print(f"File {src} copied to {dest_dir}")
+        return copied
     else:
         print(f"No such file or directory: {src}")
+        return None
 
 
 def copy_templates_from_config(config_file):
@@ -352,12 +359,18 @@ def copy_templates_from_config(config_file):
     respective destination
     and prints out messages indicating the status of the copying
     process.
+
+    Returns:
+    - list: Paths of the copies.
     """
-    config_file = PARENT_DIR / 'config.json'
+    copied = []
     with open(config_file, 'r', encoding='utf-8') as file:
         configs = json.load(file)
         for config in configs:
-            copy_template(config['src'], config['dest'])
+            path = copy_template(config['src'], config['dest'])
+            if path:
+                copied.append(str(path))
+    return copied
 
 
 def execute_template_operations(project_number):
@@ -381,8 +394,7 @@ def execute_template_operations(project_number):
     destination paths and configurations.
 
     Returns:
-    - None: The function performs in-place operations and does not
-    return any value.
+    - list: Paths of the copied templates.
     """
     project_number = str(project_number)
     dst_1 = str(dst_1_template).format(projectnumber=project_number)
@@ -464,4 +476,4 @@ def execute_template_operations(project_number):
     ]
     config_dict = remove_empty_dicts(template_configs)
     generate_config_file(config_dict)
-    copy_templates_from_config(PARENT_DIR / 'config.json')
+    return copy_templates_from_config(TEMPLATE_CONFIG_FILE)
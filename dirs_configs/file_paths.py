@@ -76,6 +76,9 @@ CSV_PATH = str(
 XL_XS_DATA = str(
     BASE_DIR / "HECRAS" / "CrossSectionData.xlsx"
     )
+HX_GEOMETRY_TEMPLATE = str(
+    BASE_DIR / "HECRAS" / "{projectnumber}-CrossSection.g01"
+    )
 OUT_SHP_CENTER = str(
             OUTPUT_DIR / "center_line.shp"
             )
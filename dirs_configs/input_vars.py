@@ -22,7 +22,10 @@ others.
 
 All paths and URLs are hardcoded and point to specific locations or
 files necessary for the execution and completion of the GIS project.
+XML_LINKS and BOUND_COORDS live in the job's tmp directory so that
+concurrent projects do not share them.
 """
+from .config import TMP_DIR
 EB_LINE="./gis/suw_eb_line.shp"
 WB_LINE="./gis/suw_wb_line.shp"
 EFLDWY="./gis/efldwy_l.shp"
@@ -33,8 +36,8 @@ IN_SHP_MAIN="./gis/parcels20.shp"
 IN_SHP_MAIN_SUBSET="./gis/subset_parcels20.shp"
 IN_DEM_MAIN="/mnt/ubuntu-storage-2/dem2019.tiff"
 SQLITE_PARCELS_20="./gis/parcels20.sqlite3"
-XML_LINKS="./tmp/xml_links.txt"
-BOUND_COORDS="./tmp/bound_coords.txt"
+XML_LINKS=str(TMP_DIR / "xml_links.txt")
+BOUND_COORDS=str(TMP_DIR / "bound_coords.txt")
 LASTOOLS_DIRECTORY="./tmp/LAStools/bin"
 USGS_METADATA_FTP_SUWANNEE="https://rockyweb.usgs.gov/vdelivery/Datasets/" \
     + "Staged/Elevation/LPC/Projects/FL_Peninsular_FDEM_2018_D19_DRRA/" \
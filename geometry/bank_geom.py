@@ -56,6 +56,14 @@ from dirs_configs.file_paths import (
     CONTOUR_TOB_TEMPLATE_2,
     IN_SHP_CONTOURS
     )
+from dirs_configs.input_vars import IN_DEM_MAIN
+from helpers.artifacts import put
+from helpers.contours import (
+    area_contour_index,
+    contour_area,
+    file_contour_index
+    )
+from helpers.dem_window import dem_window
 from helpers.geom_helper import (
     distance_to_point,
     shorten_linestring,
@@ -122,35 +130,21 @@ def bank_geom(projectnumber,
         pt_2 = new_point
         new_line = LineString((pt_1, pt_2))
         logger.debug(f"new_line: {new_line}")
-        gdf_contours = gpd.read_file(IN_SHP_CONTOURS)
+        contours = area_contour_index(
+            dem_window(IN_DEM_MAIN), contour_area(gs_1))
         target_elevation = round(float(delta_water_level_el))
         logger.debug(f"target_elevation: {target_elevation}")
-        elevations = []
-        if 'ELEV' not in gdf_contours.columns:
-            gdf_contours['ELEV'] = gdf_contours['geometry'].apply(
-                lambda contour: sum(
-                    point[2] for point in contour.coords) / len(contour.coords)
-                if contour.coords else None
-            )
-            matching_contours = gdf_contours[
-                gdf_contours['ELEV'] == target_elevation
-                ]
-        else:
-            matching_contours = gdf_contours[
-                gdf_contours['ELEV'] == target_elevation
-                ]
         intersection_points = []
         intersecting_contour = []
-        for contour in matching_contours.geometry:
-            if contour.intersects(new_line):
-                intersecting_contour.append(contour)
-                intersection = contour.intersection(new_line)
-                if isinstance(intersection, Point):
-                    intersection_points.append(intersection)
-                else:
-                    for geom in intersection:
-                        if isinstance(geom, Point):
-                            intersection_points.append(geom)
+        for contour in contours.intersecting(new_line, target_elevation):
+            intersecting_contour.append(contour)
+            intersection = contour.intersection(new_line)
+            if isinstance(intersection, Point):
+                intersection_points.append(intersection)
+            else:
+                for geom in intersection:
+                    if isinstance(geom, Point):
+                        intersection_points.append(geom)
         if len(intersection_points) == 2:
             dist_3 =  parcel_centroid.distance(
                 Point(
@@ -170,7 +164,7 @@ def bank_geom(projectnumber,
                 geometry=[eow_contour],
                 crs="epsg:6441"
                 )
-            gdf_contour_eow.to_file(contour_eow)
+            put(contour_eow, gdf_contour_eow)
             gdf_eow_pt = gpd.GeoDataFrame(
                 geometry=[eow_pt],
                 crs="epsg:6441"
@@ -219,17 +213,12 @@ def bank_geom(projectnumber,
         adjusted_slope = slope_change + 1
         tob_arr = bank_arr[adjusted_slope]
         tob_pt = Point(tob_arr[0], tob_arr[1], tob_arr[2])
-        closest_contour = None
-        min_distance = float('inf')
-        tob_point = tob_pt
-        for contour in gdf_contours['geometry']:
-            distance = contour.distance(tob_point)
-            if distance < min_distance:
-                min_distance = distance
-                tob_closest_contour = contour
+        # every level of the area is already traced by parcel_geometry
+        _, tob_closest_contour = file_contour_index(
+            IN_SHP_CONTOURS).nearest(tob_pt)
         gs_tob = gpd.GeoSeries([tob_closest_contour])
         gdf_tob = gpd.GeoDataFrame(geometry=gs_tob, crs='epsg:6441')
-        gdf_tob.to_file(contour_tob)
+        put(contour_tob, gdf_tob)
     except Exception as e:
         logger.debug(f"Error: {e}")
         sys.exit(1)
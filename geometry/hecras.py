@@ -1,9 +1,9 @@
 import csv
+import io
 import os
 import os.path
-import shutil
 import time
-import fiona
+from collections import namedtuple
 import geopandas as gpd
 import numpy as np
 import pandas as pd
@@ -11,41 +11,204 @@ from dirs_configs.file_paths import (
     CSV_HX_ARR,
     CSV_PATH,
     HX_CADD_TEMPLATE,
-    HX_LINE_ADDED_PTS,
+    HX_GEOMETRY_TEMPLATE,
     HX_LINE_Z,
     HX_LINE_Z_SMOOTHED,
-    OUT_DEM_BUFFER,
-    OUT_SHP_BUFFER,
     OUT_SHP_HXLINE,
     XL_XS_DATA,
     XL_XS_EX,
 )
+from dirs_configs.config import GEOMETRY_BACKEND, HECRAS_SPREADSHEET
 from dirs_configs.input_vars import *
 from helpers.misc_helper import *
-from sqlalchemy import create_engine
+from helpers.artifacts import put
+from helpers.dem_window import dem_window
+from helpers.hecras_geometry import cross_section_block, write_geometry
+from helpers.profile import (
+    resample_profile,
+    sample_profile,
+    sample_profiles
+    )
+from helpers.db import get_engine
+from helpers.river_geometry import HxSection, cross_section, cross_sections
+from helpers.river_stations import station_index
+from sqlalchemy import text
 os.environ["SQLALCHEMY_WARN_20"] = "1"
-import math
-import rasterio
-import rasterio.mask
-import shapely.geometry
-from scipy.interpolate import CubicSpline
-from shapely import wkt
-from shapely.geometry import (
-    LineString,
-    Point,
-    MultiPoint,
-    MultiLineString
+from shapely import wkb
+from shapely.geometry import LineString
+
+
+# one statement per call; every step of the former query chain is a CTE
+# reading the parcel from the session's TEMP table hx_parcel
+_HX_SECTION_SQL = """
+WITH parcel AS (
+    SELECT ST_Centroid(geom) AS c FROM hx_parcel LIMIT 1
+),
+w_nearest AS (
+    SELECT ST_ShortestLine(parcel.c, wfldwy_pt.geom) AS geom
+    FROM parcel, wfldwy_pt
+    ORDER BY wfldwy_pt.geom <-> parcel.c LIMIT 1
+),
+e_nearest AS (
+    SELECT ST_ShortestLine(parcel.c, efldwy_pt.geom) AS geom
+    FROM parcel, efldwy_pt
+    ORDER BY efldwy_pt.geom <-> parcel.c LIMIT 1
+),
+w_pt AS (
+    SELECT ST_ClosestPoint(w_nearest.geom, wfldwy_l.geom) AS geom
+    FROM w_nearest, wfldwy_l LIMIT 1
+),
+e_pt AS (
+    SELECT ST_ClosestPoint(e_nearest.geom, efldwy_l.geom) AS geom
+    FROM e_nearest, efldwy_l LIMIT 1
+),
+hline_1 AS (
+    SELECT ST_MakeLine(e_pt.geom, w_pt.geom) AS geom FROM e_pt, w_pt
+),
+hline_2 AS (
+    SELECT ST_Translate(
+        hline_1.geom,
+        ST_X(parcel.c) - ST_X(ST_ClosestPoint(hline_1.geom, parcel.c)),
+        ST_Y(parcel.c) - ST_Y(ST_ClosestPoint(hline_1.geom, parcel.c))
+        ) AS geom
+    FROM hline_1, parcel
+),
+w_end AS (
+    SELECT ST_ClosestPoint(
+        ST_ShortestLine(wfldwy_l.geom, hline_2.geom), wfldwy_l.geom) AS geom
+    FROM wfldwy_l, hline_2 LIMIT 1
+),
+e_end AS (
+    SELECT ST_ClosestPoint(
+        ST_ShortestLine(efldwy_l.geom, hline_2.geom), efldwy_l.geom) AS geom
+    FROM efldwy_l, hline_2 LIMIT 1
+),
+hx AS (
+    SELECT ST_MakeLine(w_end.geom, e_end.geom) AS geom FROM w_end, e_end
+),
+eb AS (
+    SELECT part.geom
+    FROM hx, parcel, suw_eb_line,
+        ST_Dump(ST_Intersection(hx.geom, suw_eb_line.geom)) AS part
+    WHERE GeometryType(part.geom) = 'POINT'
+    ORDER BY part.geom <-> parcel.c LIMIT 1
+),
+wb AS (
+    SELECT part.geom
+    FROM hx, parcel, suw_wb_line,
+        ST_Dump(ST_Intersection(hx.geom, suw_wb_line.geom)) AS part
+    WHERE GeometryType(part.geom) = 'POINT'
+    ORDER BY part.geom <-> parcel.c LIMIT 1
+),
+cut AS (
+    SELECT suw_cut.fid
+    FROM suw_cut JOIN hx ON ST_Intersects(hx.geom, suw_cut.geom)
+    LIMIT 1
+)
+SELECT
+    ST_AsBinary(hx.geom) AS hx_line,
+    ST_X(e_end.geom) AS efldwy_x,
+    ST_Y(e_end.geom) AS efldwy_y,
+    ST_X(eb.geom) AS eb_x,
+    ST_Y(eb.geom) AS eb_y,
+    ST_X(wb.geom) AS wb_x,
+    ST_Y(wb.geom) AS wb_y,
+    cut.fid AS river_section_fid,
+    ST_Length(hx.geom) AS hx_length
+FROM hx
+    CROSS JOIN e_end
+    LEFT JOIN eb ON TRUE
+    LEFT JOIN wb ON TRUE
+    LEFT JOIN cut ON TRUE;
+"""
+
+
+def _postgis_section(gs_1, logger):
+    """
+    Builds the HEC-RAS line of a parcel in PostGIS (the "postgis"
+    backend, kept to validate helpers.river_geometry). The parcel is
+    sent once, to a TEMP table of the call's connection, and the whole
+    construction runs as one statement, so concurrent projects never
+    share a table.
+
+    :param gs_1: The parcel polygon.
+    :return: HxSection, see helpers.river_geometry.cross_section.
+    :raises ValueError: when the line does not cross both bank lines or
+    the river centerline.
+    """
+    with get_engine().begin() as connection:
+        connection.execute(text(
+            "CREATE TEMP TABLE hx_parcel (geom geometry(Geometry, 6441))" \
+                + " ON COMMIT DROP;"
+                ))
+        connection.execute(
+            text(
+                "INSERT INTO hx_parcel (geom)" \
+                    + " VALUES (ST_GeomFromWKB(:parcel, 6441));"
+                    ),
+            {"parcel": wkb.dumps(gs_1)}
+            )
+        row = connection.execute(text(_HX_SECTION_SQL)).fetchone()
+    logger.debug("hecras section query: %s", row)
+    if row is None or row.eb_x is None or row.wb_x is None:
+        raise ValueError("hecras line does not cross both bank lines")
+    if row.river_section_fid is None:
+        raise ValueError("hecras line does not cross the river")
+    return HxSection(
+        hx_line=wkb.loads(bytes(row.hx_line)),
+        efldwy_pt=np.asarray([row.efldwy_x, row.efldwy_y]),
+        eb_pt=np.asarray([row.eb_x, row.eb_y]),
+        wb_pt=np.asarray([row.wb_x, row.wb_y]),
+        river_section_fid=str(row.river_section_fid),
+        hx_length=row.hx_length,
+        )
+
+
+# points of a HEC-RAS cross section (HEC-RAS accepts up to 500)
+HX_POINTS = 500
+
+HxResult = namedtuple(
+    "HxResult",
+    [
+        "section",
+        "station",
+        "profile",
+        "smooth_points",
+        "hecras_arr",
+        "left_bank_station",
+        "right_bank_station",
+        ]
     )
-from sqlalchemy.orm import sessionmaker
 
 
-def closest_point(geometry, ref_point):
-    if isinstance(geometry, MultiPoint):
-        return min(geometry.geoms, key=lambda p: p.distance(ref_point))
-    elif isinstance(geometry, Point):
-        return geometry
-    else:
-        return None
+def _smooth_profile(profile):
+    """
+    Resamples a sampled profile to the HEC-RAS cross section.
+
+    :param profile: (n, 4) station/x/y/z array from sample_profile.
+    :return: (smooth_points, hecras_arr): the HX_POINTS smoothed points
+    of the line as (x at the start + station, y, z), and their
+    station/elevation table starting at station 10000.
+    """
+    smooth_points = resample_profile(profile[:, [0, 2, 3]], count=HX_POINTS)
+    smooth_points[:, 0] += profile[0, 1]
+    hecras_arr = smooth_points[:, [0, 2]]
+    hecras_arr[:, 0] += 10000 - hecras_arr[0, 0]
+    hecras_arr[:, 1] = hecras_arr[::-1, 1]
+    return smooth_points, hecras_arr
+
+
+def _bank_stations(section, hecras_arr):
+    """
+    :return: (left bank station, right bank station) of a section on
+    its station/elevation table.
+    """
+    hecras_lb = section.efldwy_pt[0] - section.eb_pt[0]
+    hecras_rb = section.efldwy_pt[0] - section.wb_pt[0]
+    return (
+        hecras_arr[0][0] + int(hecras_lb),
+        hecras_arr[0][0] + int(hecras_rb),
+        )
 
 
 def hecras_calc(
@@ -72,652 +235,193 @@ def hecras_calc(
     firm_panel (str): The path to the firm panel file.
 
     Returns:
+    GeoDataFrame of the HEC-RAS line, or None when no cross section
+    could be built for the parcel.
     """
+    gdf_hxline_v3 = None
     try:
         logger = logger_1
         start_time = time.time()
         HX_CADD = HX_CADD_TEMPLATE.format(projectnumber=projectnumber)
-        db_connection_string = (
-            "postgresql+psycopg2://linpostgres:HJYkgHL74!t6nXJ9"
-            "@lin-18909-6549-pgsql-primary.servers.linodedb.net"
-            "/postgres"
-        )
-        engine = create_engine(
-            db_connection_string,
-            pool_size=30,
-            max_overflow=100,
-        )
         gs = gs_1
         gs = gpd.GeoSeries(gs)
         gs = gs.set_crs("epsg:6441")
-        gs_pbound_p = gs
-        gs_pbound_c = gs_pbound_p.centroid
-        gdf_pbound_p = gpd.GeoDataFrame(geometry=gs_pbound_p)
-        gdf_pbound_c = gpd.GeoDataFrame(geometry=gs_pbound_c)
-        session = sessionmaker(bind=engine)
         try:
-            with session() as session:
-                gdf_pbound_p.to_postgis(
-                    "gdf_pbound_p",
-                    engine,
-                    if_exists="replace"
-                    )
-                gdf_pbound_c.to_postgis(
-                    "gdf_pbound_c",
-                    engine,
-                    if_exists="replace"
-                    )
-                sql_gdf_pbound_c_wfldwy_shortestline = (
-                    "SELECT ST_ASTEXT(ST_SHORTESTLINE(gdf_pbound_c.geometry, wfldwy_pt.geom)) "
-                    "FROM gdf_pbound_c, wfldwy_pt ORDER BY "
-                    "wfldwy_pt.geom <-> gdf_pbound_c.geometry;"
-                )
-                result_1 = engine.execute(sql_gdf_pbound_c_wfldwy_shortestline)
-                geom_text_1 = result_1.fetchone()[0]
-                shapely_obj_1 = wkt.loads(geom_text_1)
-                gdf_1 = gpd.GeoDataFrame(geometry=[shapely_obj_1])
-                gdf_pbound_c_wfldwy_shortestline = gdf_1.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_pbound_c_wfldwy_shortestline.to_postgis(
-                    "gdf_pbound_c_wfldwy_shortestline",
-                    engine,
-                    index=True,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                sql_gdf_pbound_c_efldwy_shortestline = (
-                    "SELECT ST_ASTEXT(ST_SHORTESTLINE(gdf_pbound_c.geometry, efldwy_pt.geom)) "
-                    "FROM gdf_pbound_c, efldwy_pt ORDER BY "
-                    "efldwy_pt.geom <-> gdf_pbound_c.geometry;"
-                )
-                result_2 = engine.execute(sql_gdf_pbound_c_efldwy_shortestline)
-                geom_text_2 = result_2.fetchone()[0]
-                shapely_obj_2 = wkt.loads(geom_text_2)
-                gdf_2 = gpd.GeoDataFrame(geometry=[shapely_obj_2])
-                gdf_pbound_c_efldwy_shortestline = gdf_2.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_pbound_c_efldwy_shortestline.to_postgis(
-                    "gdf_pbound_c_efldwy_shortestline",
-                    engine,
-                    index=True,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                sql_gdf_pbound_c_efldwy_intersection_pt = (
-                    "SELECT ST_AsText(ST_ClosestPoint("
-                    "gdf_pbound_c_efldwy_shortestline.geometry,"
-                    "efldwy_l.geom)) FROM gdf_pbound_c_efldwy_shortestline, efldwy_l;"
-                )
-                sql_3 = sql_gdf_pbound_c_efldwy_intersection_pt
-                result_3 = engine.execute(sql_3)
-                geom_text_3 = result_3.fetchone()[0]
-                shapely_obj_3 = wkt.loads(geom_text_3)
-                gdf_3 = gpd.GeoDataFrame(geometry=[shapely_obj_3])
-                gdf_pbound_c_efldwy_intersection_pt = gdf_3.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_pbound_c_efldwy_intersection_pt.to_postgis(
-                    "gdf_pbound_c_efldwy_intersection_pt",
-                    engine,
-                    index=False,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                sql_gdf_pbound_c_wfldwy_intersection_pt = (
-                    "SELECT ST_AsText(ST_ClosestPoint("
-                    "gdf_pbound_c_wfldwy_shortestline.geometry, wfldwy_l.geom))"
-                    "FROM gdf_pbound_c_wfldwy_shortestline, wfldwy_l;"
-                )
-                sql_4 = sql_gdf_pbound_c_wfldwy_intersection_pt
-                result_4 = engine.execute(sql_4)
-                geom_text_4 = result_4.fetchone()[0]
-                shapely_obj_4 = wkt.loads(geom_text_4)
-                gdf_4 = gpd.GeoDataFrame(geometry=[shapely_obj_4])
-                gdf_pbound_c_wfldwy_intersection_pt = gdf_4.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_pbound_c_wfldwy_intersection_pt.to_postgis(
-                    "gdf_pbound_c_wfldwy_intersection_pt",
-                    engine,
-                    index=False,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                sql_gdf_hline_1 = (
-                    "SELECT ST_AsText(ST_MakeLine" \
-                        + "(gdf_pbound_c_efldwy_intersection_pt.geometry, "
-                    "gdf_pbound_c_wfldwy_intersection_pt.geometry)) "
-                    "FROM gdf_pbound_c_efldwy_intersection_pt, gdf_pbound_c_wfldwy_intersection_pt;"
-                )
-                sql_5 = sql_gdf_hline_1
-                result_5 = engine.execute(sql_5)
-                geom_text_5 = result_5.fetchone()[0]
-                shapely_obj_5 = wkt.loads(geom_text_5)
-                gdf_5 = gpd.GeoDataFrame(geometry=[shapely_obj_5])
-                gdf_hline_1 = gdf_5.set_geometry("geometry").set_crs("epsg:6441")
-                gdf_hline_1.to_postgis(
-                    "gdf_hline_1",
-                    engine,
-                    index=False,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                sql_gdf_hline_1_translate_l = (
-                    "SELECT ST_AsText(ST_ShortestLine("
-                    "gdf_pbound_c.geometry, gdf_hline_1.geometry)) "
-                    "FROM gdf_pbound_c, gdf_hline_1 ORDER BY gdf_hline_1.geometry"
-                    "<-> gdf_pbound_c.geometry limit 1;"
-                )
-                sql_6 = sql_gdf_hline_1_translate_l
-                result_6 = engine.execute(sql_6)
-                geom_text_6 = result_6.fetchone()[0]
-                shapely_obj_6 = wkt.loads(geom_text_6)
-                gdf_6 = gpd.GeoDataFrame(geometry=[shapely_obj_6])
-                gdf_hline_1_translate_l = gdf_6.set_geometry("geometry").set_crs(
-                    "epsg:6441"
-                )
-                gdf_hline_1_translate_l.to_postgis(
-                    "gdf_hline_1_translate_l",
-                    engine,
-                    index=False,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                sql_gdf_hline_1_translate_l_closest_point = (
-                    "SELECT ST_AsText(ST_ClosestPoint("
-                    "gdf_hline_1_translate_l.geometry, gdf_hline_1.geometry)) "
-                    "FROM gdf_hline_1_translate_l, gdf_hline_1;"
-                )
-                sql_7 = sql_gdf_hline_1_translate_l_closest_point
-                result_7 = engine.execute(sql_7)
-                geom_text_7 = result_7.fetchone()[0]
-                shapely_obj_7 = wkt.loads(geom_text_7)
-                gdf_7 = gpd.GeoDataFrame(geometry=[shapely_obj_7])
-                gdf_hline_1_translate_l_closest_point = gdf_7.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_hline_1_translate_l_closest_point.to_postgis(
-                    "gdf_hline_1_translate_l_closest_point",
-                    engine,
-                    index=False,
-                    index_label="Index",
-                    if_exists="replace",
-                )
-                gdf_hline_lst = [
-                    gdf_hline_1_translate_l_closest_point.geometry.x[0],
-                    gdf_hline_1_translate_l_closest_point.geometry.y[0],
-                ]
-                gdf_hline_arr = np.asarray(gdf_hline_lst)
-                gs_pbound_c.reset_index(drop=True, inplace=True)
-                gdf_pbound_c_lst = [
-                    gs_pbound_c.geometry.x[0],
-                    gs_pbound_c.geometry.y[0],
-                ]
-                gdf_pbound_c_arr = np.asarray(gdf_pbound_c_lst)
-                # begin with pbound_arr
-                translation_diff = np.subtract(gdf_pbound_c_arr, gdf_hline_arr)
-                pos_count, neg_count = 0, 0
-                for num in translation_diff:
-                    if num >= 0:
-                        pos_count += 1
-                    else:
-                        neg_count += 1
-                logger.debug("positive_count: %s", pos_count)
-                logger.debug("negative_count: %s", neg_count)
-                sql_gdf_hline_2 = (
-                    f"SELECT ST_AsText(ST_Translate(gdf_hline_1.geometry, "
-                    f"{translation_diff[0]}, {translation_diff[1]}, 0)) FROM gdf_hline_1;"
-                )
-                sql_9 = sql_gdf_hline_2
-                result_9 = engine.execute(sql_9)
-                geom_text_9 = result_9.fetchone()[0]
-                shapely_obj_9 = wkt.loads(geom_text_9)
-                gdf_9 = gpd.GeoDataFrame(geometry=[shapely_obj_9])
-
-                gdf_hline_2 = gdf_9.set_geometry("geometry").set_crs("epsg:6441")
-                gdf_hline_2.to_postgis("gdf_hline_2", engine, if_exists="replace")
-                sql_gdf_hline_2_efldwy_pt_shortestline = (
-                    "SELECT ST_AsText(ST_ShortestLine("
-                    "efldwy_l.geom, gdf_hline_2.geometry)) FROM efldwy_l, gdf_hline_2;"
-                )
-                sql_10 = sql_gdf_hline_2_efldwy_pt_shortestline
-                result_10 = engine.execute(sql_10)
-                geom_text_10 = result_10.fetchone()[0]
-                shapely_obj_10 = wkt.loads(geom_text_10)
-                gdf_10 = gpd.GeoDataFrame(geometry=[shapely_obj_10])
-                gdf_hline_2_efldwy_pt_shortestline = gdf_10.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_hline_2_efldwy_pt_shortestline.to_postgis(
-                    "gdf_hline_2_efldwy_pt_shortestline",
-                    engine,
-                    if_exists="replace",
-                )
-                sql_gdf_hline_2_wfldwy_pt_shortestline = (
-                    "SELECT ST_AsText(ST_ShortestLine("
-                    "wfldwy_l.geom, gdf_hline_2.geometry))"
-                    "FROM wfldwy_l, gdf_hline_2;"
-                )
-                sql_11 = sql_gdf_hline_2_wfldwy_pt_shortestline
-                result_11 = engine.execute(sql_11)
-                geom_text_11 = result_11.fetchone()[0]
-                shapely_obj_11 = wkt.loads(geom_text_11)
-                gdf_11 = gpd.GeoDataFrame(geometry=[shapely_obj_11])
-                gdf_hline_2_wfldwy_pt_shortestline = gdf_11.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_hline_2_wfldwy_pt_shortestline.to_postgis(
-                    "gdf_hline_2_wfldwy_pt_shortestline",
-                    engine,
-                    if_exists="replace",
-                )
-                sql_gdf_hline_2_efldwy_pt_shortestline_closest_point_ver2 = (
-                    "SELECT ST_AsText(ST_ClosestPoint("
-                    "gdf_hline_2_efldwy_pt_shortestline.geometry, efldwy_l.geom)) "
-                    "FROM gdf_hline_2_efldwy_pt_shortestline, efldwy_l;"
-                )
-                sql_12 = sql_gdf_hline_2_efldwy_pt_shortestline_closest_point_ver2
-                result_12 = engine.execute(sql_12)
-                geom_text_12 = result_12.fetchone()[0]
-                shapely_obj_12 = wkt.loads(geom_text_12)
-                gdf_12 = gpd.GeoDataFrame(geometry=[shapely_obj_12])
-                gdf_hline_2_efldwy_pt_shortestline_closest_point_ver2 = (
-                    gdf_12.set_geometry("geometry").set_crs("epsg:6441")
-                )
-                gdf_hline_2_efldwy_pt_shortestline_closest_point_ver2.to_postgis(
-                    "gdf_hline_2_efw_pt_shrtstln_clsst_pt_v2",
-                    engine,
-                    if_exists="replace",
-                )
-                xefldwy = (
-                    gdf_hline_2_efldwy_pt_shortestline_closest_point_ver2.geometry.x[0]
-                )
-                yefldwy = (
-                    gdf_hline_2_efldwy_pt_shortestline_closest_point_ver2.geometry.y[0]
-                )
-                gdf_hxline_v3_efldwy_pt_arr = np.asarray([xefldwy, yefldwy])
-                sql_gdf_hline_2_wfldwy_pt_shortestline_closest_point_ver2 = (
-                    "SELECT ST_AsText(ST_ClosestPoint("
-                    "gdf_hline_2_wfldwy_pt_shortestline.geometry, wfldwy_l.geom)) "
-                    "FROM gdf_hline_2_wfldwy_pt_shortestline, wfldwy_l;"
-                )
-                sql_13 = sql_gdf_hline_2_wfldwy_pt_shortestline_closest_point_ver2
-                result_13 = engine.execute(sql_13)
-                geom_text_13 = result_13.fetchone()[0]
-                shapely_obj_13 = wkt.loads(geom_text_13)
-                gdf_13 = gpd.GeoDataFrame(geometry=[shapely_obj_13])
-                gdf_hline_2_wfldwy_pt_shortestline_closest_point_ver2 = (
-                    gdf_13.set_geometry("geometry").set_crs("epsg:6441")
-                )
-                gdf_hline_2_wfldwy_pt_shortestline_closest_point_ver2.to_postgis(
-                    "gdf_hline_2_wfw_pt_shrtstln_clsst_pt_v2",
-                    engine,
-                    if_exists="replace",
-                )
-                sql_gdf_hxline_v3 = (
-                    "SELECT ST_AsText(ST_MakeLine("
-                    "gdf_hline_2_wfw_pt_shrtstln_clsst_pt_v2.geometry, "
-                    "gdf_hline_2_efw_pt_shrtstln_clsst_pt_v2.geometry)) "
-                    "FROM gdf_hline_2_wfw_pt_shrtstln_clsst_pt_v2, "
-                    "gdf_hline_2_efw_pt_shrtstln_clsst_pt_v2;"
-                )
-                sql_14 = sql_gdf_hxline_v3
-                result_14 = engine.execute(sql_14)
-                geom_text_14 = result_14.fetchone()[0]
-                shapely_obj_14 = wkt.loads(geom_text_14)
-                gdf_14 = gpd.GeoDataFrame(geometry=[shapely_obj_14])
-                gdf_hxline_v3 = gdf_14.set_geometry("geometry").set_crs("epsg:6441")
-                gdf_hxline_v3.to_file(OUT_SHP_HXLINE)
-                gdf_hxline_v3.to_postgis("gdf_hxline_v3", engine, if_exists="replace")
-                gs_hxline_v3 = gpd.GeoSeries(gdf_hxline_v3.geometry)
-                hx_line = gs_hxline_v3.geometry[0]
-                sql_gdf_hxline_v3_suw_eb_line_intersects = (
-                    "SELECT ST_AsText(ST_Intersection("
-                    "gdf_hxline_v3.geometry, suw_eb_line.geom)) "
-                    "FROM gdf_hxline_v3, suw_eb_line;"
-                )
-                sql_24 = sql_gdf_hxline_v3_suw_eb_line_intersects
-                result_24 = engine.execute(sql_24)
-                geom_text_24 = result_24.fetchone()[0]
-                shapely_obj_24 = wkt.loads(geom_text_24)
-                gdf_24 = gpd.GeoDataFrame(geometry=[shapely_obj_24])
-                gdf_hxline_v3_suw_eb_line_intersects = gdf_24.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_hxline_v3_suw_eb_line_intersects.to_postgis(
-                    "gdf_hxline_v3_suw_eb_line_intersects",
-                    engine,
-                    if_exists="replace",
-                )
-                hxline_ebline_interx = gdf_hxline_v3_suw_eb_line_intersects
-                gdf = hxline_ebline_interx
-                logger.debug(f"hx_line_intersects_eb_line: {hxline_ebline_interx}")
-                reference_point = gs_1.centroid
-                gdf['closest_point'] = gdf['geometry'].apply(
-                    lambda geom: closest_point(
-                        geom, reference_point)
-                    )
-                xe = gdf['closest_point'].x[0]
-                ye = gdf['closest_point'].y[0]
-                # xe = gdf_hxline_v3_suw_eb_line_intersects.geometry.x[0]
-                # ye = gdf_hxline_v3_suw_eb_line_intersects.geometry.y[0]
-                gdf_eb_line_arr = np.asarray([xe, ye])
-                sql_gdf_hxline_v3_suw_wb_line_intersects = (
-                    "SELECT ST_AsText(ST_Intersection("
-                    "gdf_hxline_v3.geometry, suw_wb_line.geom)) "
-                    "FROM gdf_hxline_v3, suw_wb_line;"
-                )
-                sql_25 = sql_gdf_hxline_v3_suw_wb_line_intersects
-                result_25 = engine.execute(sql_25)
-                geom_text_25 = result_25.fetchone()[0]
-                shapely_obj_25 = wkt.loads(geom_text_25)
-                gdf_25 = gpd.GeoDataFrame(geometry=[shapely_obj_25])
-                gdf_hxline_v3_suw_wb_line_intersects = gdf_25.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_hxline_v3_suw_wb_line_intersects.to_postgis(
-                    "gdf_hxline_v3_suw_wb_line_intersects",
-                    engine,
-                    if_exists="replace",
-                )
-                xw = gdf_hxline_v3_suw_wb_line_intersects.geometry.x[0]
-                yw = gdf_hxline_v3_suw_wb_line_intersects.geometry.y[0]
-                gdf_wb_line_arr = np.asarray([xw, yw])
-                hecras_lb = gdf_hxline_v3_efldwy_pt_arr[0] - gdf_eb_line_arr[0]
-                hecras_rb = gdf_hxline_v3_efldwy_pt_arr[0] - gdf_wb_line_arr[0]
-                logger.debug("hecras_LB: %s", hecras_lb)
-                logger.debug("hecras_RB: %s", hecras_rb)
-                sql_gdf_river_section_fid = (
-                    "SELECT suw_cut.fid FROM suw_cut, "
-                    "gdf_hxline_v3 WHERE ST_INTERSECTS(suw_cut.geom, gdf_hxline_v3.geometry);"
-                )
-                sql_15 = sql_gdf_river_section_fid
-                result_15 = engine.execute(sql_15)
-                geom_text_15 = result_15.fetchone()[0]
-                river_section_fid = str(geom_text_15)
-                sql_river_xs_pair = (
-                    "SELECT suw_xs_pt.stream_stn, suw_cut.fid "
-                    "FROM public.suw_cut JOIN public.suw_xs_pt "
-                    "ON ST_Touches(suw_xs_pt.geom, suw_cut.geom) "
-                    f"Where suw_cut.fid = {river_section_fid};"
-                )
-                sql_16 = sql_river_xs_pair
-                result_16 = engine.execute(sql_16)
-                geom_text_16 = result_16.fetchall()
-                river_xs_pair_1 = geom_text_16[0][0]
-                river_xs_pair_2 = geom_text_16[1][0]
-                logger.debug("river_xs_pair_1: %s", river_xs_pair_1)
-                logger.debug("river_xs_pair_2: %s", river_xs_pair_2)
-                sql_gdf_hxline_v3_suw_cut_intersects = (
-                    "SELECT ST_ASTEXT(ST_Intersection("
-                    "gdf_hxline_v3.geometry, suw_cut.geom)) "
-                    "FROM suw_cut JOIN gdf_hxline_v3 "
-                    "ON ST_Intersects(gdf_hxline_v3.geometry, suw_cut.geom);"
-                )
-                sql_17 = sql_gdf_hxline_v3_suw_cut_intersects
-                result_17 = engine.execute(sql_17)
-                geom_text_17 = result_17.fetchone()[0]
-                shapely_obj_17 = wkt.loads(geom_text_17)
-                gdf_17 = gpd.GeoDataFrame(geometry=[shapely_obj_17])
-                gdf_hxline_v3_suw_cut_intersects = gdf_17.set_geometry(
-                    "geometry"
-                ).set_crs("epsg:6441")
-                gdf_hxline_v3_suw_cut_intersects.to_postgis(
-                    "gdf_hxline_v3_suw_cut_intersects",
-                    engine,
-                    if_exists="replace",
-                )
-                sql_gdf_suw_cut_line_geometry = (
-                    f"SELECT ST_ASTEXT(suw_cut.geom) "
-                    "FROM public.suw_cut "
-                    f"WHERE suw_cut.fid = {river_section_fid};"
-                )
-                sql_18 = sql_gdf_suw_cut_line_geometry
-                result_18 = engine.execute(sql_18)
-                geom_text_18 = result_18.fetchone()[0]
-                gdf_suw_cut_line_geometry = geom_text_18
-                shapely_obj_18 = wkt.loads(geom_text_18)
-                gdf_18 = gpd.GeoDataFrame(geometry=[shapely_obj_18])
-                gdf_suw_cut_line_geometry = gdf_18.set_geometry("geometry").set_crs(
-                    "epsg:6441"
-                )
-                gdf_suw_cut_line_geometry.to_postgis(
-                    "gdf_suw_cut_line_geometry", engine, if_exists="replace"
-                )
-                sql_gdf_suw_cut_line_geometry_length = (
-                    "SELECT ST_Length(gdf_suw_cut_line_geometry.geometry)"
-                    "FROM gdf_suw_cut_line_geometry;"
-                )
-                sql_19 = sql_gdf_suw_cut_line_geometry_length
-                result_19 = engine.execute(sql_19)
-                geom_text_19 = result_19.fetchone()[0]
-                gdf_suw_cut_line_geometry_length = geom_text_19
-                hx_rm_cut = gdf_suw_cut_line_geometry_length
-                logger.debug("hx_rm_cut_length: %s", hx_rm_cut)
-                sql_gdf_suw_cut_linestring_drop_table = (
-                    "DROP TABLE IF EXISTS gdf_suw_cut_linestring;"
-                )
-                sql_26 = sql_gdf_suw_cut_linestring_drop_table
-                result__26 = engine.execute(sql_26)
-                sql_gdf_suw_cut_linestring_create_table = (
-                    "CREATE TABLE gdf_suw_cut_linestring"
-                    "(id SERIAL PRIMARY KEY, geom geometry(LineString, 6441));"
-                )
-                sql_20 = sql_gdf_suw_cut_linestring_create_table
-                result_20 = engine.execute(sql_20)
-                sql_gdf_suw_cut_linestring = (
-                    "INSERT INTO gdf_suw_cut_linestring (geom) "
-                    "SELECT ST_LineMerge(gdf_suw_cut_line_geometry.geometry) "
-                    "AS geom FROM gdf_suw_cut_line_geometry;"
-                )
-                sql_21 = sql_gdf_suw_cut_linestring
-                result_21 = engine.execute(sql_21)
-                sql_gdf_hxline_v3_suw_cut_intersects_ratio = (
-                    "SELECT ST_LineLocatePoint(gdf_suw_cut_linestring.geom, "
-                    "gdf_hxline_v3_suw_cut_intersects.geometry) "
-                    "FROM gdf_suw_cut_linestring, gdf_hxline_v3_suw_cut_intersects;"
-                )
-                sql_22 = sql_gdf_hxline_v3_suw_cut_intersects_ratio
-                result_22 = engine.execute(sql_22)
-                geom_text_22 = result_22.fetchone()[0]
-                logger.debug("hx_ratio: %s", geom_text_22)
-                gdf_hxline_v3_suw_cut_intersects_ratio = geom_text_22
-                hx_ratio = gdf_hxline_v3_suw_cut_intersects_ratio
-                suw_cl_l_merged_azimuth = (
-                    "SELECT ST_Azimuth(ST_StartPoint(suw_cl_l_merged.geom), "
-                    "ST_EndPoint(suw_cl_l_merged.geom)) FROM suw_cl_l_merged;"
-                )
-                sql_23 = suw_cl_l_merged_azimuth
-                result_23 = engine.execute(sql_23)
-                geom_text_23 = result_23.fetchone()[0]
-                azimuth_radians = geom_text_23
-                radians = azimuth_radians
-                azimuth = radians_to_degrees(radians)
-                logger.debug("azimuth (degrees): %s", azimuth)
-                if float(math.degrees(math.pi / 2)) > float(azimuth) or float(
-                    azimuth
-                ) > float(math.degrees(3 * math.pi / 2)):
-                    if float(river_xs_pair_1) > float(river_xs_pair_2):
-                        xs_diff = float(river_xs_pair_1) - float(river_xs_pair_2)
-                        hx_xs_calc_1 = float(xs_diff) * float(hx_ratio)
-                        gdf_river_mile = float(river_xs_pair_2) + hx_xs_calc_1
-                        logger.debug("gdf_river_mile: %s", gdf_river_mile)
-                    else:
-                        xs_diff = float(river_xs_pair_1) - float(river_xs_pair_2)
-                        hx_xs_calc_1 = float(xs_diff) * float(hx_ratio)
-                        gdf_river_mile = float(river_xs_pair_1) + hx_xs_calc_1
-                        logger.debug("gdf_river_mile: %s", gdf_river_mile)
-                else:
-                    if float(river_xs_pair_1) > float(river_xs_pair_2):
-                        xs_diff = float(river_xs_pair_1) - float(river_xs_pair_2)
-                        hx_xs_calc_1 = float(xs_diff) * float(hx_ratio)
-                        gdf_river_mile = float(river_xs_pair_2) + hx_xs_calc_1
-                        logger.debug("gdf_river_mile: %s", gdf_river_mile)
-                    else:
-                        xs_diff = float(river_xs_pair_1) - float(river_xs_pair_2)
-                        hx_xs_calc_1 = float(xs_diff) * float(hx_ratio)
-                        gdf_river_mile = float(river_xs_pair_1) + hx_xs_calc_1
-                        logger.debug("gdf_river_mile: %s", gdf_river_mile)
-                sql_gdf_hxline_v3_length = (
-                    "SELECT ST_Length(gdf_hxline_v3.geometry) FROM gdf_hxline_v3;"
-                )
-                sql_27 = sql_gdf_hxline_v3_length
-                result_27 = engine.execute(sql_27)
-                geom_text_27 = result_27.fetchone()[0]
-                hx_length = str(geom_text_27)
-                gdf = gpd.GeoDataFrame(geometry=[hx_line])
-                line = gdf.geometry
-                buffer_distance = 100
-                buffered_line = line.buffer(buffer_distance)
-                buffered_line.to_file(OUT_SHP_BUFFER)
-                with fiona.open(OUT_SHP_BUFFER, "r"):
-                    with rasterio.open(IN_DEM_MAIN) as src:
-                        out_image, out_transform = rasterio.mask.mask(
-                            src, buffered_line, crop=True
-                        )
-                        out_meta = src.meta
-                        out_meta.update(
-                            {
-                                "driver": "GTiff",
-                                "height": out_image.shape[1],
-                                "width": out_image.shape[2],
-                                "transform": out_transform,
-                            }
-                        )
-                        with rasterio.open(
-                            OUT_DEM_BUFFER,
-                            "w",
-                            **out_meta
-                            ) as dest:
-                            dest.write(out_image)
-                logger.debug("clipped dem with buffer")
-                gs = gpd.GeoSeries(gdf.geometry)
-                points = []
-                for line in gs:
-                    length = line.length
-                    for distance in range(0, int(length) + 5):
-                        point = line.interpolate(distance)
-                        points.append(point)
-                points_gs = gpd.GeoSeries(points)
-                coords = []
-                for line in points_gs:
-                    for x, y in line.coords:
-                        xy = x, y
-                        coords.append(xy)
-                original_coords = coords
-                original_linestring = LineString(original_coords)
-                gdf = original_linestring
-                gs = gpd.GeoSeries(gdf)
-                gs.to_file(f"{HX_LINE_ADDED_PTS}")
-                logger.debug("added points to hecras line")
-                raster_filename = OUT_DEM_BUFFER
-                raster_data, raster_transform = read_raster(raster_filename)
-                shapefile_path = HX_LINE_ADDED_PTS
-                gdf = gpd.read_file(shapefile_path)
-                gs = gpd.GeoSeries(gdf.geometry[0])
-                coords = []
-                for line in gs:
-                    for x, y in line.coords:
-                        xy = x, y
-                        coords.append(xy)
-                original_coords = coords
-                original_linestring = LineString(original_coords)
-                z_values = interpolate_z_values(
-                    original_linestring,
-                    raster_data,
-                    raster_transform
-                )
-                updated_coords = [
-                    (x, y, z) for (x, y), z in zip(original_coords, z_values)
-                ]
-                updated_linestring = LineString(updated_coords)
-                gs_updated = gpd.GeoDataFrame(geometry=[updated_linestring])
-                gs_updated.to_file(HX_LINE_Z)
-                shutil.copy(f"{HX_LINE_Z}", f"{HX_CADD}")
-                logger.debug("added z values to hecras line")
-                coords = []
-                for line in gs_updated.geometry:
-                    for x, y, z in line.coords:
-                        xyz = x, y, z
-                        coords.append(xyz)
-                gs_arr = np.array(coords)
-                adjust_value = gs_arr[0][0]
-                points = gs_arr
-                x = points[:, 0]
-                y = points[:, 1]
-                z = points[:, 2]
-                t = np.arange(len(points))
-                cs_y = CubicSpline(t, y)
-                cs_z = CubicSpline(t, z)
-                # 500 is the number of points to make for hecras cross section
-                t2 = np.linspace(t.min(), t.max(), 500)
-                y2 = cs_y(t2)
-                z2 = cs_z(t2)
-                smooth_points = np.vstack([t2, y2, z2]).T
-                smooth_points[:, 0] += adjust_value
-                linestring = LineString(smooth_points)
-                gdf = gpd.GeoDataFrame(geometry=[linestring])
-                gdf.to_file(HX_LINE_Z_SMOOTHED)
-                shutil.copy(f"{HX_LINE_Z_SMOOTHED}", f"{HX_CADD}")
-                smooth_arr = np.copy(smooth_points)
-                smooth_arr[:, 0] -= smooth_arr[0][0]
-                smooth_arr[:, 0] += 10000
-                hecras_arr = smooth_arr[:, [0, 2]]
-                hecras_arr[:, 1] = hecras_arr[::-1, 1]
-                np.savetxt(CSV_HX_ARR, hecras_arr, delimiter=",")
-                df = pd.DataFrame(hecras_arr)
+            if GEOMETRY_BACKEND == "postgis":
+                section = _postgis_section(gs_1, logger)
+            else:
+                section = cross_section(gs[0])
+            logger.debug(
+                f"hecras section ({GEOMETRY_BACKEND}): {section}")
+            hx_line = section.hx_line
+            gdf_hxline_v3 = gpd.GeoDataFrame(
+                geometry=[hx_line],
+                crs="epsg:6441"
+                )
+            gdf_hxline_v3.to_file(OUT_SHP_HXLINE)
+            station = station_index().locate(hx_line, gs[0].centroid)
+            logger.debug("hecras river station: %s", station)
+            gdf_river_mile = station.mile
+            hx_ratio = station.ratio
+            logger.debug("gdf_river_mile: %s", gdf_river_mile)
+            hx_length = str(section.hx_length)
+            profile = sample_profile(dem_window(IN_DEM_MAIN), hx_line)
+            logger.debug("sampled hecras line profile")
+            updated_linestring = LineString(profile[:, 1:])
+            gs_updated = gpd.GeoDataFrame(geometry=[updated_linestring])
+            put(HX_LINE_Z, gs_updated)
+            put(HX_CADD, gs_updated)
+            logger.debug("added z values to hecras line")
+            smooth_points, hecras_arr = _smooth_profile(profile)
+            linestring = LineString(smooth_points)
+            gdf = gpd.GeoDataFrame(geometry=[linestring])
+            put(HX_LINE_Z_SMOOTHED, gdf)
+            put(HX_CADD, gdf)
+            np.savetxt(CSV_HX_ARR, hecras_arr, delimiter=",")
+            if HECRAS_SPREADSHEET:
+                # the first point is left out, as the sheet always did
+                df = pd.DataFrame(hecras_arr[1:])
                 df.to_excel(XL_XS_EX, index=False)
-                xl = pd.ExcelFile(XL_XS_EX)
-                df = xl.parse("Sheet1")
-                df = df.drop(df.index[0])
-                df.to_excel(f"{XL_XS_EX}", index=False)
-                hecras_left_bank_station = hecras_arr[0][0] + int(hecras_lb)
-                hecras_right_bank_station = hecras_arr[0][0] + int(hecras_rb)
-                headers = [
-                    "RiverMile",
-                    "LeftBankStation",
-                    "RightBankStation",
-                    "RiverMileLength",
-                    "RiverMileRatio",
-                    "100yrElevation",
-                    "50yrElevation",
-                    "10yrElevation",
-                    "FirmPanel",
-                ]
-                data = [
-                    (
-                        f"{gdf_river_mile}",
-                        f"{hecras_left_bank_station}",
-                        f"{hecras_right_bank_station}",
-                        f"{hx_length}",
-                        f"{hx_ratio}",
-                        f"{yr100}",
-                        f"{yr50}",
-                        f"{yr10}",
-                        f"{firm_panel}",
+            hecras_left_bank_station, hecras_right_bank_station = (
+                _bank_stations(section, hecras_arr))
+            logger.debug(
+                "hecras bank stations: %s, %s",
+                hecras_left_bank_station,
+                hecras_right_bank_station
+                )
+            try:
+                block = cross_section_block(
+                    round(gdf_river_mile, 3),
+                    hecras_arr[:, 0],
+                    hecras_arr[:, 1],
+                    hecras_left_bank_station,
+                    hecras_right_bank_station,
+                    description=f"{projectnumber} floodway cross section"
+                    )
+                write_geometry(
+                    HX_GEOMETRY_TEMPLATE.format(projectnumber=projectnumber),
+                    [block],
+                    title=f"{projectnumber} floodway cross section"
                     )
-                ]
-                with open(CSV_PATH, "w", newline="", encoding="utf-8") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(headers)
-                    writer.writerows(data)
-                df_xs = pd.read_csv(CSV_PATH)
-                df_xs.to_excel(XL_XS_DATA, index=False)
-                logger.debug("hecras calculations:complete")
-                session.commit()
-                end_time = time.time()
-                execution_time = end_time - start_time
-                logger.debug(f"parcel_hecras_calcs execution time: {execution_time}")
+                logger.debug("hecras geometry file written")
+            except ValueError as e:
+                logger.debug("hecras geometry file not written: %s", e)
+            headers = [
+                "RiverMile",
+                "LeftBankStation",
+                "RightBankStation",
+                "RiverMileLength",
+                "RiverMileRatio",
+                "100yrElevation",
+                "50yrElevation",
+                "10yrElevation",
+                "FirmPanel",
+            ]
+            data = [
+                (
+                    f"{gdf_river_mile}",
+                    f"{hecras_left_bank_station}",
+                    f"{hecras_right_bank_station}",
+                    f"{hx_length}",
+                    f"{hx_ratio}",
+                    f"{yr100}",
+                    f"{yr50}",
+                    f"{yr10}",
+                    f"{firm_panel}",
+                )
+            ]
+            csv_text = io.StringIO()
+            writer = csv.writer(csv_text)
+            writer.writerow(headers)
+            writer.writerows(data)
+            with open(CSV_PATH, "w", newline="", encoding="utf-8") as file:
+                file.write(csv_text.getvalue())
+            # parsed from memory so the sheet gets the CSV's types
+            csv_text.seek(0)
+            df_xs = pd.read_csv(csv_text)
+            df_xs.to_excel(XL_XS_DATA, index=False)
+            logger.debug("hecras calculations:complete")
+            end_time = time.time()
+            execution_time = end_time - start_time
+            logger.debug(f"parcel_hecras_calcs execution time: {execution_time}")
         except pd.errors.EmptyDataError:
             logger.debug("hecras calculations:empty data error")
-            session.rollback()
         finally:
-            engine.dispose()
-            logger.debug("disposed engine")
             logger.debug("get_hecras_calc: completed")
     except ValueError as e:
         logger.debug("get_hecras_calc: failed")
         logger.debug("error: %s", e)
     return gdf_hxline_v3
+
+
+def hecras_batch(parcels, geometry_path=None, log=print):
+    """
+    Builds the HEC-RAS cross sections of many parcels of a reach in one
+    pass: the lines are built vectorized (river_geometry.cross_sections)
+    and the profiles sampled from one read of the DEM. Nothing is
+    written but the optional geometry file.
+
+    :param parcels: Sequence of shapely Polygons.
+    :param geometry_path: HEC-RAS geometry file receiving every cross
+    section, upstream first; None to write none.
+    :param log: Callable receiving a message per parcel that failed.
+    :return: (results, combined): a list aligned with `parcels` of
+    HxResult, None for a failed parcel, and a GeoDataFrame of the
+    smoothed lines with their parcel index, river mile and bank
+    stations, upstream first.
+    """
+    sections = cross_sections(parcels, log=log)
+    built = [i for i, section in enumerate(sections) if section is not None]
+    profiles = sample_profiles(
+        dem_window(IN_DEM_MAIN), [sections[i].hx_line for i in built])
+    index = station_index()
+    results = [None] * len(parcels)
+    for i, profile in zip(built, profiles):
+        section = sections[i]
+        try:
+            station = index.locate(section.hx_line, parcels[i].centroid)
+        except ValueError as e:
+            log(f"river station of parcel {i}: {e}")
+            continue
+        smooth_points, hecras_arr = _smooth_profile(profile)
+        left_bank, right_bank = _bank_stations(section, hecras_arr)
+        results[i] = HxResult(
+            section=section,
+            station=station,
+            profile=profile,
+            smooth_points=smooth_points,
+            hecras_arr=hecras_arr,
+            left_bank_station=left_bank,
+            right_bank_station=right_bank,
+            )
+    done = sorted(
+        (i for i, result in enumerate(results) if result is not None),
+        key=lambda i: -results[i].station.mile
+        )
+    combined = gpd.GeoDataFrame(
+        {
+            "parcel": done,
+            "RiverMile": [results[i].station.mile for i in done],
+            "LeftBank": [results[i].left_bank_station for i in done],
+            "RightBank": [results[i].right_bank_station for i in done],
+            },
+        geometry=[LineString(results[i].smooth_points) for i in done],
+        crs="epsg:6441"
+        )
+    if geometry_path is not None:
+        blocks = []
+        for i in done:
+            result = results[i]
+            try:
+                blocks.append(cross_section_block(
+                    round(result.station.mile, 3),
+                    result.hecras_arr[:, 0],
+                    result.hecras_arr[:, 1],
+                    result.left_bank_station,
+                    result.right_bank_station,
+                    description=f"parcel {i} floodway cross section"
+                    ))
+            except ValueError as e:
+                log(f"geometry block of parcel {i}: {e}")
+        write_geometry(geometry_path, blocks)
+    return results, combined
@@ -62,7 +62,16 @@ from helpers.geom_helper import (
     find_closest_line,
     create_polygon_from_lines
     )
-from dirs_configs.input_vars import EB_LINE, WB_LINE
+from dirs_configs.input_vars import EB_LINE, WB_LINE, IN_DEM_MAIN
+from helpers.contours import (
+    area_contour_index,
+    contour_area,
+    contours_frame,
+    file_contour_index
+    )
+from helpers import artifacts
+from helpers.dem_window import dem_window
+from helpers.layers import load_layer
 from dirs_configs.file_paths import (
     CONTOUR_EOW_TEMPLATE,
     CONTOUR_TOB_TEMPLATE,
@@ -127,21 +136,21 @@ def parcel_builder(
         delta_water_level_el = delta_water_level_el_1
         target_line_shp_path = CONTOUR_EOW_TEMPLATE.format(
             projectnumber=projectnumber)
-        gdf_eb = gpd.read_file(EB_LINE)
-        gdf_wb = gpd.read_file(WB_LINE)
+        gdf_eb = load_layer(EB_LINE)
+        gdf_wb = load_layer(WB_LINE)
         gs_eb = gpd.GeoSeries(gdf_eb['geometry'])
         gs_wb = gpd.GeoSeries(gdf_wb['geometry'])
-        gdf_center_line = gpd.read_file(OUT_SHP_CENTER)
+        gdf_center_line = artifacts.get(OUT_SHP_CENTER)
         gs_center_line = gpd.GeoSeries(gdf_center_line['geometry'])
-        gdf_polygon = gpd.read_file(IN_SHP)
+        gdf_polygon = artifacts.get(IN_SHP)
         gs_polygon = gpd.GeoSeries(gdf_polygon['geometry'])
         gs_centroid = gpd.GeoSeries(gdf_polygon['geometry'].centroid)
         simplified_polygon = gdf_polygon.geometry[0].simplify(1)
         center_line = shape(gdf_center_line.geometry.iloc[0])
         logger.debug(f"center_line: {center_line}")
-        gdf_target_line = gpd.read_file(target_line_shp_path)
+        gdf_target_line = artifacts.get(target_line_shp_path)
         target_line = shape(gdf_target_line.geometry.iloc[0])
-        gdf_line_75 = gpd.read_file(SETBACK75)
+        gdf_line_75 = artifacts.get(SETBACK75)
         line_75 = shape(gdf_line_75.geometry.iloc[0])
         coords_lst = []
         lines = [line for line in simplified_polygon.exterior.coords]
@@ -249,13 +258,12 @@ def parcel_builder(
             gdf2.to_file(PARCEL_BOUNDARY_SITE)
             gdf_parcel_boundary = gdf2
         logger.debug('checkpoint: parcel_boundary_sp created')
-        tob_line = gpd.read_file(
+        tob_line = artifacts.get(
             CONTOUR_TOB_TEMPLATE.format(projectnumber=projectnumber)
         )
-        eow_line = gpd.read_file(
+        eow_line = artifacts.get(
             CONTOUR_EOW_TEMPLATE.format(projectnumber=projectnumber)
         )
-        contours = gpd.read_file(IN_SHP_CONTOURS)
         clipped_tob_line = tob_line.geometry[0].intersection(
             gdf_parcel_boundary.geometry[0]
             )
@@ -268,11 +276,9 @@ def parcel_builder(
         gdf_eow_clipped = gpd.GeoDataFrame(geometry=[clipped_eow_line])
         gdf_eow_clipped.to_file(EOW_CONTOUR_PARCEL)
         logger.debug('checkpoint: eow_contour_parcel created')
-        clipped_contours = contours[contours.geometry.intersects(
-            gdf_parcel_boundary.geometry[0])]
-        gdf_clipped_contours = gpd.GeoDataFrame(
-            geometry=clipped_contours.geometry
-            )
+        clipped_contours = file_contour_index(IN_SHP_CONTOURS).intersecting(
+            gdf_parcel_boundary.geometry[0])
+        gdf_clipped_contours = gpd.GeoDataFrame(geometry=clipped_contours)
         gdf_clipped_contours.to_file(PARCEL_CONTOURS)
         logger.debug('checkpoint: contour_parcels created')
         time.sleep(5)
@@ -294,27 +300,24 @@ def parcel_builder(
                 OUTPUT_DIRx / f"{projectnumber}-\
                     parcel_boundary_siteplan.shp")
         )
-        gdf = gpd.read_file(IN_SHP_CONTOURS)
-        gdf['ELEV'] = None
-        yr100_elev = yr100
-        yr50_elev = yr50
-        yr10_elev = yr10
-        yr100_contour = gdf[gdf['ELEV'] == yr100_elev]
-        yr50_contour = gdf[gdf['ELEV'] == yr50_elev]
-        yr10_contour = gdf[gdf['ELEV'] == yr10_elev]
-        if not (yr100_contour.is_empty).empty:
-            yr100_contour.to_file(YR100_CONTOUR)
-        else:
-            logger.debug('yr100_contour is not found on parcel')
-        if not (yr50_contour.is_empty).empty:
-            yr50_contour.to_file(YR50_CONTOUR)
-        else:
-            logger.debug('yr50_contour is not found on parcel')
-        if not (yr10_contour.is_empty).empty:
-            yr10_contour.to_file(YR10_CONTOUR)
-        else:
-            logger.debug('yr10_contour is not found on parcel')
-        gdf = gpd.read_file(HX_LINE_Z_SMOOTHED)
+        flood_contours = area_contour_index(
+            dem_window(IN_DEM_MAIN),
+            contour_area(gdf_polygon.geometry[0])
+            )
+        flood_contours.ensure([float(yr100), float(yr50), float(yr10)])
+        for elev, path, name in (
+            (yr100, YR100_CONTOUR, "yr100_contour"),
+            (yr50, YR50_CONTOUR, "yr50_contour"),
+            (yr10, YR10_CONTOUR, "yr10_contour"),
+            ):
+            lines = [
+                (float(elev), line)
+                for line in flood_contours.at(float(elev))]
+            if lines:
+                contours_frame(lines).to_file(path)
+            else:
+                logger.debug(f'{name} is not found on parcel')
+        gdf = artifacts.get(HX_LINE_Z_SMOOTHED)
         gs = gpd.GeoSeries(gdf.geometry)[0]
         arr = np.array(gs.coords)
         value = float(delta_water_level_el)
@@ -329,9 +332,9 @@ def parcel_builder(
         yr100_line = LineString(yr100_arr)
         gs_yr100_line = gpd.GeoSeries(yr100_line)
         gs_yr100_line.to_file(YR100_SECTION_LINE)
-        gdf1 = gpd.read_file(SETBACK75)
-        gdf2 = gpd.read_file(HX_LINE_Z_SMOOTHED)
-        gdf3 = gpd.read_file(IN_SHP)
+        gdf1 = artifacts.get(SETBACK75)
+        gdf2 = artifacts.get(HX_LINE_Z_SMOOTHED)
+        gdf3 = artifacts.get(IN_SHP)
         geom1 = gdf1.geometry.all()
         geom2 = gdf2.geometry.all()
         geom3 = gdf3.geometry.all()
@@ -363,15 +366,15 @@ def parcel_builder(
             gs_xx.to_file(HX_LINE_PARCEL_INTERSECTION_PTS)
         else:
             logger.debug('hxline intersects parcel boundary = False')
-        gdf_center_line = gpd.read_file(OUT_SHP_CENTER)
+        gdf_center_line = artifacts.get(OUT_SHP_CENTER)
         geom4 = gdf_center_line.geometry[0]
         gdf3_centroid = gdf3.geometry.centroid[0]
         center_line_arr = np.array(geom4.coords)
-        gdf5 = gpd.read_file(
+        gdf5 = artifacts.get(
             CONTOUR_TOB_TEMPLATE.format(projectnumber=projectnumber)
             )
         geom5 = gdf5.geometry[0]
-        gdf_setback75 = gpd.read_file(SETBACK75)
+        gdf_setback75 = artifacts.get(SETBACK75)
         gs_setback = gpd.GeoSeries(gdf_setback75.geometry)[0].centroid
         setback_arr = np.array([gs_setback.x, gs_setback.y])
         if geom4.intersects(geom1):
@@ -470,7 +473,7 @@ def parcel_builder(
             if geom2.intersects(
                 geom3) == True and geom2.intersects(
                     geom1) == True:
-                gdf_hx = gpd.read_file(HX_LINE_Z_SMOOTHED)
+                gdf_hx = artifacts.get(HX_LINE_Z_SMOOTHED)
                 coords_hx = list(gdf_hx.iloc[0].geometry.coords)
                 hx_arr = np.array(coords_hx)
                 combined_arr = np.vstack((hx_arr, obstruction_arr))
@@ -12,15 +12,16 @@ conducts a series of operations, including:
 vertices, distances between points, and calculating river frontage
 length.
 - Manipulating, scaling, and saving geometrical shapes.
-- Executing external processes and shell commands for advanced
-geographical computations.
+- Tracing the elevation contours of the DEM around the parcel
+(helpers.contours).
+- Recording the parcel boundary, frontage and setback lines as
+artifacts (helpers.artifacts), written to their shapefiles at the end of
+the run.
 - Generating and saving new files, as well as handling the copying of
 specific results for further use or reference.
 
 The module utilizes various external modules and libraries such as
-rasterio, shapely, and geopandas for sophisticated spatial operations,
-and also interfaces with shell processes and external commands for
-certain calculations and file manipulations.
+rasterio, shapely, and geopandas for sophisticated spatial operations.
 
 Module Attributes:
 - Various constants representing file and directory paths used
@@ -29,18 +30,14 @@ throughout the module's functions.
 execution.
 
 Note:
-Adjustments to paths, environment variables, and external command
-invocations might be necessary based on the specific execution
+Adjustments to paths and environment variables might be necessary based on the specific execution
 environment and available datasets.
 """
 import shutil
-import subprocess
 import time
 from shapely.geometry import Point, LineString, Polygon, MultiLineString
 from shapely.affinity import translate
 from shapely.ops import nearest_points
-import rasterio
-import rasterio.mask
 from skimage.morphology import medial_axis
 from skimage.draw import polygon
 from scipy.spatial import ConvexHull
@@ -50,8 +47,11 @@ from dirs_configs.input_vars import *
 from helpers.multiprocessing_helper import *
 from helpers.misc_helper import *
 from helpers.geom_helper import *
+from helpers.artifacts import put
+from helpers.dem_window import dem_window
+from helpers.layers import load_layer
+from helpers.contours import contour_levels, contour_lines, contours_frame
 import geopandas as gpd
-import fiona
 import numpy as np
 from scipy.ndimage import convolve
 
@@ -65,7 +65,7 @@ def parcel_geometry(projectnumber, parcelid, logger_1):
     parcel, including:
     - Loading and processing shapes and geographical datasets.
     - Manipulating, scaling, and saving shapes.
-    - Executing external processes for geographic calculations.
+    - Tracing the elevation contours around the parcel.
     - Handling and saving results, including the generation and copying
     of files.
 
@@ -95,8 +95,6 @@ def parcel_geometry(projectnumber, parcelid, logger_1):
     execution timing or rate.
     - It uses external environment variables and relies on external
     file paths and datasets.
-    - It executes external shell commands for specific geographic
-    computations.
     - Paths and environment variable names may need to be adjusted
     based on execution environment.
     """
@@ -112,16 +110,16 @@ def parcel_geometry(projectnumber, parcelid, logger_1):
             projectnumber=projectnumber
             )
         time.sleep(500 / 1000)
-        gdf_eb = gpd.read_file(EB_LINE)
-        gdf_wb = gpd.read_file(WB_LINE)
+        gdf_eb = load_layer(EB_LINE)
+        gdf_wb = load_layer(WB_LINE)
         gs_eb = gpd.GeoSeries(gdf_eb["geometry"])
         gs_wb = gpd.GeoSeries(gdf_wb["geometry"])
         filename = IN_SHP_MAIN_SUBSET
         parcel_id = parcelid
-        result = parcel_geom(filename, parcel_id)
+        result = parcel_geom(filename, parcel_id, log=logger.debug)
         in_gdf_shp = result[0].geometry[0]
         gdf = gpd.GeoDataFrame(geometry=[in_gdf_shp])
-        gdf.to_file(OUT_SHP)
+        put(OUT_SHP, gdf)
         gs = gdf["geometry"]
         gs = gs.reset_index(drop=True)
         coords = gs[0].exterior.coords
@@ -190,7 +188,7 @@ def parcel_geometry(projectnumber, parcelid, logger_1):
         frontage_line = LineString(frontage_gs)
         gs_frontage = gpd.GeoSeries([frontage_line])
         gs_frontage.set_crs("epsg:6441", inplace=True)
-        gs_frontage.to_file(FRONTAGE_LINE)
+        put(FRONTAGE_LINE, gs_frontage)
         frontage_midpoint = frontage_line.interpolate(0.5, normalized=True)
         set1 = set(map(tuple, input_vertices))
         set2 = set(map(tuple, frontage_arr))
@@ -212,56 +210,28 @@ def parcel_geometry(projectnumber, parcelid, logger_1):
         gs_setback = translated_frontage_line
         gs_setback75 = gpd.GeoSeries([gs_setback])
         gs_setback75.set_crs("epsg:6441", inplace=True)
-        gs_setback75.to_file(SETBACK75)
+        put(SETBACK75, gs_setback75)
         gs_scale = gs.scale(8, 8)
         gs_scale.to_file(OUT_SHP_SCALED)
-        with fiona.open(OUT_SHP_SCALED, "r") as shapefile:
-            shapes = [feature["geometry"] for feature in shapefile]
-        with rasterio.open(IN_DEM_MAIN) as src:
-            out_image, out_transform = rasterio.mask.mask(
-                src,
-                shapes,
-                crop=True
-                )
-            out_meta = src.meta
-            out_meta.update(
-                {
-                    "driver": "GTiff",
-                    "height": out_image.shape[1],
-                    "width": out_image.shape[2],
-                    "transform": out_transform,
-                }
-            )
-            with rasterio.open(OUT_DEM, "w", **out_meta) as dest:
-                dest.write(out_image)
+        dem = dem_window(IN_DEM_MAIN)
+        dem_band, dem_transform = dem.write(OUT_DEM, gs_scale)
         logger.debug("new_dem_scaled:complete")
-        subprocess.run(
-            [
-                f"gdal_contour -a ELEV -3d -b 1 -i 1 \
-            {OUTPUT_DIR}/{projectnumber}-dem_clipped.tiff \
-                {OUTPUT_DIR}/{projectnumber}-contours.shp"
-            ],
-            shell=True,
-            check=True
-        )
-        logger.debug(f"gdal_contour: complete")
+        contours = contour_lines(
+            dem_band,
+            dem_transform,
+            contour_levels(dem_band, dem.nodata),
+            dem.nodata
+            )
+        contours_frame(contours).to_file(
+            OUTPUT_DIR / f"{projectnumber}-contours.shp")
+        logger.debug(f"contours: complete ({len(contours)} lines)")
         shutil.copy(
             OUTPUT_DIR / f"{projectnumber}-dem_clipped.tiff",
             OUTPUT_DIR / f"{projectnumber}-dem_clipped_2.tiff"
         )
         logger.debug("new_contours:complete")
-        shutil.copy(
-            OUTPUT_DIR / f"{projectnumber}-parcel_boundary.shp",
-            OUTPUT_DIRx / f"{projectnumber}-parcel_boundary.shp"
-        )
-        shutil.copy(
-            OUTPUT_DIR / f"{projectnumber}-parcel_boundary.shp",
-            OUTPUT_DIR / "parcel_boundary.shp"
-        )
-        shutil.copy(
-            OUTPUT_DIR / f"{projectnumber}-parcel_boundary.shx",
-            OUTPUT_DIR / "parcel_boundary.shx"
-        )
+        put(OUTPUT_DIRx / f"{projectnumber}-parcel_boundary.shp", gdf)
+        put(IN_SHP, gdf)
         shutil.copy(
             OUTPUT_DIR / f"{projectnumber}-contours.shp",
             OUTPUT_DIRx / f"{projectnumber}-contours_2.shp"
@@ -297,53 +267,25 @@ def parcel_geometry(projectnumber, parcelid, logger_1):
         logger.debug(f"parcel_geometry:failed-{e}")
         gs_scale = gs.scale(8, 8)
         gs_scale.to_file(OUT_SHP_SCALED)
-        with fiona.open(OUT_SHP_SCALED, "r") as shapefile:
-            shapes = [feature["geometry"] for feature in shapefile]
-        with rasterio.open(IN_DEM_MAIN) as src:
-            out_image, out_transform = rasterio.mask.mask(
-                src,
-                shapes,
-                crop=True
-                )
-            out_meta = src.meta
-            out_meta.update(
-                {
-                    "driver": "GTiff",
-                    "height": out_image.shape[1],
-                    "width": out_image.shape[2],
-                    "transform": out_transform,
-                }
-            )
-            with rasterio.open(OUT_DEM, "w", **out_meta) as dest:
-                dest.write(out_image)
+        dem = dem_window(IN_DEM_MAIN)
+        dem_band, dem_transform = dem.write(OUT_DEM, gs_scale)
         logger.debug("new_dem_scaled:complete")
-        subprocess.run(
-            [
-                f"gdal_contour -a ELEV -3d -b 1 -i 1 \
-            {OUTPUT_DIR}/{projectnumber}-dem_clipped.tiff \
-                {OUTPUT_DIR}/{projectnumber}-contours.shp"
-            ],
-            shell=True,
-            check=True
-        )
-        logger.debug(f"gdal_contour: complete")
+        contours = contour_lines(
+            dem_band,
+            dem_transform,
+            contour_levels(dem_band, dem.nodata),
+            dem.nodata
+            )
+        contours_frame(contours).to_file(
+            OUTPUT_DIR / f"{projectnumber}-contours.shp")
+        logger.debug(f"contours: complete ({len(contours)} lines)")
         shutil.copy(
             OUTPUT_DIR / f"{projectnumber}-dem_clipped.tiff",
             OUTPUT_DIR / f"{projectnumber}-dem_clipped_2.tiff"
         )
         logger.debug("new_contours:complete")
-        shutil.copy(
-            OUTPUT_DIR / f"{projectnumber}-parcel_boundary.shp",
-            OUTPUT_DIRx / f"{projectnumber}-parcel_boundary.shp"
-        )
-        shutil.copy(
-            OUTPUT_DIR / f"{projectnumber}-parcel_boundary.shp",
-            OUTPUT_DIR / "parcel_boundary.shp"
-        )
-        shutil.copy(
-            OUTPUT_DIR / f"{projectnumber}-parcel_boundary.shx",
-            OUTPUT_DIR / "parcel_boundary.shx"
-        )
+        put(OUTPUT_DIRx / f"{projectnumber}-parcel_boundary.shp", gdf)
+        put(IN_SHP, gdf)
         shutil.copy(
             OUTPUT_DIR / f"{projectnumber}-contours.shp",
             OUTPUT_DIRx / f"{projectnumber}-contours_2.shp"
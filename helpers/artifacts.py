@@ -0,0 +1,145 @@
+"""
+This module keeps the intermediate layers the stages hand to each other
+(the parcel boundary, the setback and center lines, the smoothed HEC-RAS
+line, the bank contours) in memory instead of round-tripping them
+through shapefiles. An artifact is named by the path of the file it
+used to be written to; the files are written once, at the end of the
+run, by `write_artifacts`.
+
+The store is per process. The scheduler (helpers.scheduler) ships the
+artifacts held by main to every cpu stage it submits and merges back
+the ones a stage produced, so a stage sees the artifacts of every stage
+that finished before it was submitted, wherever it ran.
+
+Functions:
+- put(name, layer):
+    Records an artifact produced by the running stage.
+
+- get(name):
+    GeoDataFrame of an artifact, read from its file when this process
+    does not hold it.
+
+- snapshot(), load(artifacts), drain():
+    Hand-over between main and the stage processes.
+
+- write_artifacts(log=print):
+    Writes every artifact held to its file.
+
+- clear():
+    Drops the artifacts of this process.
+
+Note:
+- Artifacts are GeoDataFrames; `put` copies the layer it is given and
+  `get` returns a copy, so stages never share a mutable frame.
+- The artifacts of a stage are saved with its checkpoint and restored
+  when the stage is resumed.
+- Stages running on the io threads of main share one store; the
+  artifacts drained after such a stage may include those of a
+  concurrent io stage. This only matters for checkpoints, which then
+  record both.
+"""
+import os
+import threading
+import geopandas as gpd
+
+# name -> GeoDataFrame
+_store = {}
+# names put since the last drain
+_produced = set()
+_lock = threading.Lock()
+
+
+def _frame(layer):
+    if isinstance(layer, gpd.GeoSeries):
+        return gpd.GeoDataFrame(geometry=layer.reset_index(drop=True))
+    return layer.copy()
+
+
+def put(name, layer):
+    """
+    Records an artifact.
+
+    :param name: Path of the file the artifact is written to, e.g.
+    SETBACK75.
+    :param layer: GeoDataFrame or GeoSeries.
+    """
+    frame = _frame(layer)
+    with _lock:
+        _store[str(name)] = frame
+        _produced.add(str(name))
+
+
+def get(name):
+    """
+    :param name: Path of the artifact's file.
+    :return: GeoDataFrame of the artifact; read from the file (and kept)
+    when no stage of this run produced it, e.g. on a resumed job.
+    """
+    name = str(name)
+    with _lock:
+        frame = _store.get(name)
+    if frame is None:
+        frame = gpd.read_file(name)
+        with _lock:
+            _store.setdefault(name, frame)
+    return frame.copy()
+
+
+def snapshot():
+    """
+    :return: Dict of every artifact held, to hand to a stage process.
+    """
+    with _lock:
+        return dict(_store)
+
+
+def load(artifacts):
+    """
+    Adds artifacts received from main or from a stage process.
+
+    :param artifacts: Dict of name to GeoDataFrame, or None.
+    """
+    if not artifacts:
+        return
+    with _lock:
+        _store.update(artifacts)
+
+
+def drain():
+    """
+    :return: Dict of the artifacts put since the last drain.
+    """
+    with _lock:
+        produced = {name: _store[name] for name in _produced}
+        _produced.clear()
+    return produced
+
+
+def write_artifacts(log=print):
+    """
+    Writes every artifact held to its file (ESRI Shapefile, as the
+    stages used to).
+
+    :param log: Callable receiving a message per artifact that could
+    not be written.
+    :return: List of the paths written.
+    """
+    written = []
+    for name, frame in sorted(snapshot().items()):
+        try:
+            os.makedirs(os.path.dirname(name) or ".", exist_ok=True)
+            frame.to_file(name)
+        except Exception as e:
+            log(f"artifacts: {name} not written-{e}")
+            continue
+        written.append(name)
+    return written
+
+
+def clear():
+    """
+    Drops the artifacts held by this process.
+    """
+    with _lock:
+        _store.clear()
+        _produced.clear()
@@ -0,0 +1,223 @@
+"""
+This module provides stage-level checkpoints for the pipeline. After a
+stage succeeds, its return values are pickled into the job's
+checkpoint directory together with a manifest entry holding
+
+- the key of the stage: a hash of the stage name and of every value it
+  consumed (file inputs such as the project database are hashed by
+  content), and
+- the files the stage declares as outputs: every output value that is
+  the path of a file or directory under the root (or a list of such
+  paths), recorded with their size and modification time.
+
+The artifacts a stage kept in memory (helpers.artifacts) are pickled
+next to its return values.
+
+On a resumed run a stage whose key is unchanged and whose files are
+still intact is not run again; its pickled values are handed to the
+downstream stages instead.
+
+Classes:
+- Checkpoint: the manifest and pickles of one project.
+
+Note:
+- Only declared files are checked, so recording a stage costs a stat
+  per file and no directory walk or hashing on the scheduler's
+  dispatch thread. A stage whose files matter on resume returns their
+  paths (e.g. configure_main, the templates it copied).
+- Artifacts need no file check: they are restored from the pickle and
+  written again at the end of the run.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import pickle
+import time
+
+MANIFEST = "manifest.json"
+
+
+def _sha1_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat(path):
+    """
+    :return: [size, mtime in ns] of a file, compared on resume instead
+    of its content.
+    """
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Checkpoint:
+    """
+    Stage checkpoints of one project.
+
+    Parameters:
+    - directory: where the manifest and pickles are stored.
+    - root: directory the recorded file paths are relative to; output
+    paths outside of it are not recorded.
+    - exclude: glob patterns of paths (relative to `root`) that are
+    never recorded, such as pid and lock files removed by main.
+    - resume: when False checkpoints are only written, never used.
+    - ignore: input names left out of the key (e.g. the pid of main,
+    which changes on every attempt).
+    - file_inputs: input names holding file paths; the key uses the
+    file content instead of the path.
+    """
+
+    def __init__(
+        self,
+        directory,
+        root,
+        exclude=(),
+        resume=False,
+        ignore=(),
+        file_inputs=()
+        ):
+        self.directory = str(directory)
+        self.root = str(root)
+        self.exclude = tuple(exclude)
+        self.resume = resume
+        self.ignore = set(ignore)
+        self.file_inputs = set(file_inputs)
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest_path = os.path.join(self.directory, MANIFEST)
+        try:
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def key(self, stage, values):
+        """
+        Computes the checkpoint key of a stage.
+
+        :param stage: The Stage about to run.
+        :param values: Dict of the input and required values it uses.
+        :return: Hex digest, or None if an input cannot be pickled.
+        """
+        digest = hashlib.sha1(stage.name.encode())
+        for name in sorted(values):
+            if name in self.ignore:
+                continue
+            digest.update(name.encode())
+            value = values[name]
+            try:
+                if name in self.file_inputs and os.path.isfile(str(value)):
+                    digest.update(_sha1_file(str(value)).encode())
+                else:
+                    digest.update(pickle.dumps(value, protocol=4))
+            except Exception:
+                return None
+        return digest.hexdigest()
+
+    def load(self, stage_name, key):
+        """
+        :return: Dict of output name to value if the stage has a valid
+        checkpoint for `key`, otherwise None.
+        """
+        entry = self.manifest.get(stage_name)
+        if not self.resume or key is None or entry is None:
+            return None
+        if entry["key"] != key:
+            return None
+        for rel_path, stat in entry["files"].items():
+            try:
+                if _stat(os.path.join(self.root, rel_path)) != stat:
+                    return None
+            except OSError:
+                return None
+        try:
+            with open(os.path.join(self.directory, entry["pickle"]), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def load_artifacts(self, stage_name):
+        """
+        :return: Dict of the artifacts saved with the checkpoint of a
+        stage (empty when it has none); call after a successful `load`.
+        """
+        entry = self.manifest.get(stage_name) or {}
+        if not entry.get("artifacts"):
+            return {}
+        try:
+            with open(
+                os.path.join(self.directory, entry["artifacts"]), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return {}
+
+    def _declared_files(self, outputs):
+        paths = []
+        for value in outputs.values():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            paths += [
+                str(v) for v in values if isinstance(v, (str, os.PathLike))]
+        files = {}
+        for path in paths:
+            if os.path.isdir(path):
+                found = [
+                    os.path.join(dir_path, file_name)
+                    for dir_path, _, file_names in os.walk(path)
+                    for file_name in file_names
+                    ]
+            else:
+                found = [path]
+            for file_path in found:
+                rel_path = os.path.relpath(file_path, self.root)
+                if rel_path.startswith(os.pardir) or any(
+                    fnmatch.fnmatch(rel_path, pattern)
+                    for pattern in self.exclude):
+                    continue
+                try:
+                    files[rel_path] = _stat(file_path)
+                except OSError:
+                    continue
+        return files
+
+    def save(
+        self,
+        stage_name,
+        key,
+        outputs,
+        artifacts=None
+        ):
+        """
+        Records a successful stage.
+
+        :param outputs: Dict of output name to value; values naming
+        files or directories under the root are recorded.
+        :param artifacts: Dict of the artifacts the stage produced.
+        """
+        if key is None:
+            return
+        pickle_name = f"{stage_name}.pkl"
+        pickle_path = os.path.join(self.directory, pickle_name)
+        with open(f"{pickle_path}.part", "wb") as f:
+            pickle.dump(outputs, f, protocol=4)
+        os.replace(f"{pickle_path}.part", pickle_path)
+        artifacts_name = None
+        if artifacts:
+            artifacts_name = f"{stage_name}.artifacts.pkl"
+            artifacts_path = os.path.join(self.directory, artifacts_name)
+            with open(f"{artifacts_path}.part", "wb") as f:
+                pickle.dump(artifacts, f, protocol=4)
+            os.replace(f"{artifacts_path}.part", artifacts_path)
+        self.manifest[stage_name] = {
+            "key": key,
+            "pickle": pickle_name,
+            "artifacts": artifacts_name,
+            "files": self._declared_files(outputs),
+            "saved": time.time(),
+            }
+        with open(f"{self.manifest_path}.part", "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(f"{self.manifest_path}.part", self.manifest_path)
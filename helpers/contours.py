@@ -0,0 +1,323 @@
+"""
+This module extracts elevation contours from the project's DEM in
+process, by marching squares (skimage.measure.find_contours) over the
+cells served by helpers.dem_window, instead of shelling out to
+`gdal_contour`. It produces either every contour of an area at a fixed
+interval, like `gdal_contour -a ELEV -3d -i 1`, or only the elevations
+a stage asks for (the water level, the flood elevations, the levels
+around the top of bank).
+
+Functions:
+- contour_area(parcel, factor=8):
+    The area around a parcel that the geometry stages contour.
+
+- contour_levels(data, nodata=None, interval=1.0):
+    Every multiple of `interval` within the range of the data.
+
+- contour_lines(data, transform, levels, nodata=None):
+    Contours of a grid as (elevation, 3D LineString) pairs.
+
+- area_contours(dem, area, levels=None, interval=1.0):
+    Contours of the DEM inside an area.
+
+- contours_frame(lines, crs=CRS):
+    GeoDataFrame of contours with the ID and ELEV columns written by
+    gdal_contour.
+
+- area_contour_index(dem, area):
+    The ContourIndex of an area, tracing levels as they are asked for.
+
+- file_contour_index(path):
+    The ContourIndex of a contour shapefile.
+
+Classes:
+- ContourIndex: contours grouped by elevation, with an STRtree per
+  elevation and one over all of them.
+
+Note:
+- Contours end where they meet cells without data, as they do with
+  gdal_contour; cells outside the masked area count as without data.
+- The indexes are kept per process: stages running in the same
+  process share them, a forked stage builds its own on first use.
+"""
+import math
+import os
+import geopandas as gpd
+import numpy as np
+from shapely import STRtree
+from shapely.affinity import scale
+from shapely.geometry import LineString
+from skimage import measure
+
+CRS = "epsg:6441"
+
+# (source, area wkb) or (path, mtime) -> ContourIndex
+_indexes = {}
+
+
+def contour_area(parcel, factor=8):
+    """
+    :param parcel: shapely Polygon of the parcel.
+    :param factor: Scale of the area relative to the parcel, about the
+    center of its bounding box (as GeoSeries.scale in parcel_geometry).
+    :return: shapely Polygon of the contoured area.
+    """
+    return scale(parcel, factor, factor, origin="center")
+
+
+def _valid(data, nodata):
+    valid = np.isfinite(data)
+    if nodata is not None and not (
+        isinstance(nodata, float) and math.isnan(nodata)):
+        valid &= data != nodata
+    return valid
+
+
+def contour_levels(data, nodata=None, interval=1.0):
+    """
+    :param data: 2D array of elevations.
+    :param nodata: Value marking cells without data.
+    :param interval: Spacing of the levels.
+    :return: Sorted list of the multiples of `interval` between the
+    lowest and highest valid cell.
+    """
+    values = np.asarray(data)[_valid(np.asarray(data), nodata)]
+    if values.size == 0:
+        return []
+    first = math.ceil(values.min() / interval)
+    last = math.floor(values.max() / interval)
+    return [level * interval for level in range(first, last + 1)]
+
+
+def contour_lines(data, transform, levels, nodata=None):
+    """
+    Traces the contours of a grid.
+
+    :param data: 2D array of elevations.
+    :param transform: Affine transform of `data`.
+    :param levels: Elevations to trace.
+    :param nodata: Value marking cells without data.
+    :return: List of (level, LineString) with the level as the z of
+    every vertex, ordered by level.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    valid = _valid(data, nodata)
+    if not valid.any():
+        return []
+    low, high = data[valid].min(), data[valid].max()
+    # find_contours needs finite values everywhere; masked cells are
+    # ignored through `mask`
+    filled = np.where(valid, data, low)
+    lines = []
+    for level in sorted(set(float(level) for level in levels)):
+        if level < low or level > high:
+            continue
+        for path in measure.find_contours(filled, level, mask=valid):
+            if len(path) < 2:
+                continue
+            # path holds (row, col) of cell centers
+            xs, ys = transform * (path[:, 1] + 0.5, path[:, 0] + 0.5)
+            lines.append((level, LineString(
+                np.column_stack([xs, ys, np.full(len(path), level)]))))
+    return lines
+
+
+def area_contours(dem, area, levels=None, interval=1.0):
+    """
+    Contours of the DEM inside an area.
+
+    :param dem: helpers.dem_window.DemWindow of the project.
+    :param area: shapely Polygon, e.g. contour_area(parcel).
+    :param levels: Elevations to trace; None for every multiple of
+    `interval` found in the area.
+    :param interval: Spacing of the levels when `levels` is None.
+    :return: List of (level, LineString), see contour_lines.
+    """
+    out_image, out_transform = dem.mask([area])
+    data = out_image[0]
+    if levels is None:
+        levels = contour_levels(data, dem.nodata, interval)
+    return contour_lines(data, out_transform, levels, dem.nodata)
+
+
+def contours_frame(lines, crs=CRS):
+    """
+    :param lines: List of (level, LineString) from contour_lines.
+    :param crs: CRS of the contours.
+    :return: GeoDataFrame with ID, ELEV and geometry columns.
+    """
+    return gpd.GeoDataFrame(
+        {
+            "ID": list(range(len(lines))),
+            "ELEV": [float(level) for level, _ in lines],
+            },
+        geometry=[line for _, line in lines],
+        crs=crs
+        )
+
+
+class ContourIndex:
+    """
+    Contours grouped by elevation, with an STRtree per elevation and
+    one over all of them.
+
+    Parameters:
+    - lines: (level, LineString) pairs.
+    - tracer: callable returning the (level, LineString) pairs of a
+    list of levels, or of every level when given None. With a tracer
+    the index traces the levels it is asked for on first use.
+    """
+
+    def __init__(self, lines=(), tracer=None):
+        self._tracer = tracer
+        self._complete = tracer is None
+        # level -> (array of lines, STRtree)
+        self._levels = {}
+        # (array of levels, array of lines, STRtree) of every level
+        self._all = None
+        self.add(lines)
+
+    def add(self, lines, levels=()):
+        """
+        Adds contours. Levels listed in `levels` are recorded even when
+        they have no line, so they are not traced again.
+        """
+        grouped = {float(level): [] for level in levels}
+        for level, line in lines:
+            grouped.setdefault(float(level), []).append(line)
+        for level, geoms in grouped.items():
+            known = self._levels.get(level)
+            if known is not None:
+                geoms = list(known[0]) + geoms
+            geoms = np.array(geoms, dtype=object)
+            self._levels[level] = (geoms, STRtree(geoms))
+        self._all = None
+
+    def ensure(self, levels):
+        """
+        Makes sure the index holds `levels`, tracing the missing ones
+        together.
+        """
+        missing = sorted(
+            {float(level) for level in levels} - set(self._levels))
+        if missing and not self._complete:
+            self.add(self._tracer(missing), missing)
+
+    def _ensure_all(self):
+        if not self._complete:
+            known = set(self._levels)
+            self.add([
+                (level, line) for level, line in self._tracer(None)
+                if float(level) not in known])
+            self._complete = True
+        if self._all is None:
+            levels, geoms = [], []
+            for level, (lines, _) in sorted(self._levels.items()):
+                levels.extend([level] * len(lines))
+                geoms.extend(lines)
+            geoms = np.array(geoms, dtype=object)
+            self._all = (np.array(levels, dtype=float), geoms, STRtree(geoms))
+
+    def levels(self):
+        """
+        :return: Sorted list of the elevations holding contours.
+        """
+        self._ensure_all()
+        return sorted(
+            level for level, (lines, _) in self._levels.items() if len(lines))
+
+    def at(self, level):
+        """
+        :return: List of the contours at elevation `level`.
+        """
+        self.ensure([level])
+        return list(self._levels[float(level)][0])
+
+    def intersecting(self, geometry, level=None):
+        """
+        :param geometry: shapely geometry.
+        :param level: Elevation to search; None for every elevation.
+        :return: List of the contours intersecting `geometry`.
+        """
+        if level is None:
+            self._ensure_all()
+            _, lines, tree = self._all
+        else:
+            self.ensure([level])
+            lines, tree = self._levels[float(level)]
+        found = tree.query(geometry, predicate="intersects")
+        # in the order the contours were added, as a scan would find them
+        return list(lines[np.sort(found)])
+
+    def nearest(self, point, levels=None):
+        """
+        :param point: shapely geometry.
+        :param levels: Elevations to search; None for every elevation.
+        :return: (level, contour) of the contour nearest to `point`, or
+        None when there is none.
+        """
+        if levels is None:
+            self._ensure_all()
+            all_levels, lines, tree = self._all
+            found = tree.nearest(point)
+            if found is None:
+                return None
+            return float(all_levels[found]), lines[found]
+        self.ensure(levels)
+        best = None
+        for level in {float(level) for level in levels}:
+            lines, tree = self._levels[level]
+            found = tree.nearest(point)
+            if found is None:
+                continue
+            distance = lines[found].distance(point)
+            if best is None or distance < best[0]:
+                best = (distance, level, lines[found])
+        return None if best is None else best[1:]
+
+    def lines(self):
+        """
+        :return: Every (level, contour) pair, ordered by level.
+        """
+        self._ensure_all()
+        all_levels, lines, _ = self._all
+        return list(zip(all_levels.tolist(), lines))
+
+
+def area_contour_index(dem, area):
+    """
+    :param dem: helpers.dem_window.DemWindow of the project.
+    :param area: shapely Polygon, e.g. contour_area(parcel).
+    :return: The ContourIndex of the area, shared within this process;
+    levels are traced from the DEM when first asked for.
+    """
+    key = (dem.source, area.wkb)
+    index = _indexes.get(key)
+    if index is None:
+        index = ContourIndex(
+            tracer=lambda levels: area_contours(dem, area, levels))
+        _indexes[key] = index
+    return index
+
+
+def file_contour_index(path):
+    """
+    :param path: Contour shapefile, e.g. the one written by
+    parcel_geometry. Lines without an ELEV attribute take the mean z of
+    their vertices.
+    :return: The ContourIndex of the file, shared within this process
+    until the file changes.
+    """
+    key = (str(path), os.path.getmtime(path))
+    index = _indexes.get(key)
+    if index is None:
+        gdf = gpd.read_file(path)
+        if "ELEV" in gdf.columns:
+            levels = gdf["ELEV"].astype(float).tolist()
+        else:
+            levels = [
+                float(np.mean(np.asarray(line.coords)[:, 2]))
+                for line in gdf.geometry]
+        index = ContourIndex(zip(levels, gdf.geometry))
+        _indexes[key] = index
+    return index
@@ -0,0 +1,65 @@
+"""
+This module holds the connection to the PostGIS database queried by the
+geometry stages. Each process keeps one pooled engine, created on first
+use, instead of a stage creating (and disposing of) its own engine on
+every call.
+
+Functions:
+- get_engine(url=None):
+    The pooled engine of this process.
+
+- dispose():
+    Closes the engines of this process.
+
+Note:
+- Engines must not cross a fork: a forked stage gets its own engine the
+  first time it asks for one, the inherited pool is never used.
+- Per-call state belongs in TEMP tables, which live in the connection
+  of a single stage call; tables in the public schema are shared by
+  every project running at the same time.
+"""
+import os
+from sqlalchemy import create_engine
+
+DB_CONNECTION_STRING = (
+    "postgresql+psycopg2://linpostgres:HJYkgHL74!t6nXJ9"
+    "@lin-18909-6549-pgsql-primary.servers.linodedb.net"
+    "/postgres"
+)
+# connections kept per process; a stage uses one at a time
+POOL_SIZE = 4
+MAX_OVERFLOW = 8
+
+# (pid, url) -> Engine
+_engines = {}
+
+
+def get_engine(url=None):
+    """
+    :param url: SQLAlchemy URL; defaults to DB_CONNECTION_STRING.
+    :return: The Engine of `url` for this process, shared by every call
+    made in it.
+    """
+    key = (os.getpid(), url or DB_CONNECTION_STRING)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = create_engine(
+            key[1],
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        _engines[key] = engine
+    return engine
+
+
+def dispose():
+    """
+    Closes the pooled connections of the engines created by this
+    process and forgets every engine.
+    """
+    pid = os.getpid()
+    for (owner, _), engine in list(_engines.items()):
+        if owner == pid:
+            engine.dispose()
+    _engines.clear()
@@ -0,0 +1,533 @@
+"""
+This module prepares and describes the tiled DEM store. The statewide
+DEM (`IN_DEM_MAIN`) is a monolithic, strip-organised GeoTIFF: reading
+the cells of one parcel makes GDAL decode strips spanning the whole
+width of the state. The store is a copy of it that is internally tiled,
+compressed and carries overviews, next to an index of the bounding box
+of every tile holding data, so that a reader only decodes the tiles a
+request intersects, wherever the parcel lies on the river.
+
+Layout of a store directory (by default `<source without extension>
+_store`, e.g. `/mnt/ubuntu-storage-2/dem2019_store`):
+- dem.tif: the tiled copy (deflate, floating point predictor, sparse
+  all-nodata tiles, average overviews).
+- tiles.json: grid description and the non-empty tiles as
+  [row, col, minx, miny, maxx, maxy].
+
+Usage (once per new source DEM):
+    python -m helpers.dem_store /mnt/ubuntu-storage-2/dem2019.tiff \\
+        [--store DIR] [--tile-size 512]
+
+Functions:
+- store_path(source):
+    Default store directory of a source DEM.
+
+- prepare_store(source, store_dir=None, tile_size=512,
+  overview_levels=OVERVIEW_LEVELS, log=print):
+    Writes the tiled copy and its tile index.
+
+- open_store(source, store_dir=None):
+    Returns the TileIndex of the store of `source`, or None when there
+    is no up-to-date store.
+
+- pixel_window(transform, bounds, height, width):
+    Cells of a north-up grid touched by a bounding box.
+
+- tile_cache(index, directory):
+    Returns the TileCache of a store for this process.
+
+- prune_tile_cache(directory, max_bytes=TILE_CACHE_MAX_BYTES):
+    Removes the least recently used decoded tiles.
+
+Classes:
+- TileIndex: the grid and tile index of a store.
+- TileCache: decoded tiles of a store, shared by all processes through
+  numpy.memmap.
+
+Note:
+- A store records the size and modification time of its source and is
+  ignored once the source changes; run the preparation again then.
+- Readers fall back to the source when no store exists (see
+  helpers.misc_helper.read_dem).
+- The tile cache (config.DEM_TILE_CACHE_DIR) holds raw tiles in the
+  data type of the store (float32 for dem2019) and is pruned by
+  pre_main at startup. This module does not import dirs_configs, so
+  that pre_main can use it before forking the warm pool.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+import rasterio
+import rasterio.windows
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+
+DEM_FILE = "dem.tif"
+INDEX_FILE = "tiles.json"
+OVERVIEW_LEVELS = (2, 4, 8, 16, 32)
+# columns of the source read at once while copying a row of tiles
+COPY_CHUNK_COLUMNS = 16384
+
+# decoded tiles mapped at once per process (virtual memory only; the
+# cells themselves stay in the shared page cache)
+MAX_MAPPED_TILES = 1024
+TILE_CACHE_MAX_BYTES = 20 * 1024 ** 3
+
+# store directory -> (index mtime, source stamp, TileIndex)
+_stores = {}
+# store directory -> TileCache
+_caches = {}
+
+
+def store_path(source):
+    """
+    :param source: Path of the source DEM.
+    :return: The default store directory of `source`.
+    """
+    return f"{os.path.splitext(str(source))[0]}_store"
+
+
+def _source_stamp(source):
+    stat = os.stat(str(source))
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def pixel_window(transform, bounds, height, width):
+    """
+    :param transform: Affine transform of a north-up grid.
+    :param bounds: (minx, miny, maxx, maxy).
+    :param height, width: Size of the grid.
+    :return: (row_start, row_stop, col_start, col_stop) of the cells
+    touched by `bounds`, clipped to the grid.
+    :raises ValueError: when `bounds` do not overlap the grid.
+    """
+    minx, miny, maxx, maxy = bounds
+    inverse = ~transform
+    col_a, row_a = inverse * (minx, maxy)
+    col_b, row_b = inverse * (maxx, miny)
+    row_start = max(0, int(math.floor(min(row_a, row_b))))
+    row_stop = min(height, int(math.ceil(max(row_a, row_b))))
+    col_start = max(0, int(math.floor(min(col_a, col_b))))
+    col_stop = min(width, int(math.ceil(max(col_a, col_b))))
+    if row_start >= row_stop or col_start >= col_stop:
+        raise ValueError("Input shapes do not overlap raster.")
+    return row_start, row_stop, col_start, col_stop
+
+
+def _is_empty(block, nodata):
+    if nodata is None:
+        return False
+    if isinstance(nodata, float) and math.isnan(nodata):
+        return bool(np.isnan(block).all())
+    return bool((block == nodata).all())
+
+
+def prepare_store(
+    source,
+    store_dir=None,
+    tile_size=512,
+    overview_levels=OVERVIEW_LEVELS,
+    log=print
+    ):
+    """
+    Converts a source DEM into a tiled store.
+
+    The copy is written a row of tiles at a time, so memory use stays
+    at one row of tiles whatever the size of the source. The store is
+    written under a temporary name and renamed once complete.
+
+    :param source: Path of the source DEM (band 1 is copied).
+    :param store_dir: Store directory; defaults to store_path(source).
+    :param tile_size: Tile width and height in cells (multiple of 16).
+    :param overview_levels: Decimation factors of the overviews.
+    :param log: Callable receiving progress messages.
+    :return: The store directory.
+    """
+    store_dir = str(store_dir or store_path(source))
+    partial_dir = f"{store_dir}.partial"
+    os.makedirs(partial_dir, exist_ok=True)
+    dem_path = os.path.join(partial_dir, DEM_FILE)
+    started = time.time()
+    tiles = []
+    with rasterio.Env(GDAL_CACHEMAX=1024), rasterio.open(source) as src:
+        nodata = src.nodata
+        profile = {
+            "driver": "GTiff",
+            "dtype": src.dtypes[0],
+            "nodata": nodata,
+            "width": src.width,
+            "height": src.height,
+            "count": 1,
+            "crs": src.crs,
+            "transform": src.transform,
+            "tiled": True,
+            "blockxsize": tile_size,
+            "blockysize": tile_size,
+            "compress": "deflate",
+            "predictor": 3 if np.dtype(src.dtypes[0]).kind == "f" else 2,
+            "sparse_ok": True,
+            "bigtiff": "if_safer",
+            }
+        chunk_columns = max(1, COPY_CHUNK_COLUMNS // tile_size) * tile_size
+        tile_rows = int(math.ceil(src.height / tile_size))
+        tile_cols = int(math.ceil(src.width / tile_size))
+        with rasterio.open(dem_path, "w", **profile) as dst:
+            for tile_row in range(tile_rows):
+                row_start = tile_row * tile_size
+                rows = min(tile_size, src.height - row_start)
+                for chunk_start in range(0, src.width, chunk_columns):
+                    columns = min(chunk_columns, src.width - chunk_start)
+                    chunk = src.read(1, window=rasterio.windows.Window(
+                        chunk_start, row_start, columns, rows))
+                    for offset in range(0, columns, tile_size):
+                        block = chunk[:, offset:offset + tile_size]
+                        if _is_empty(block, nodata):
+                            continue
+                        window = rasterio.windows.Window(
+                            chunk_start + offset,
+                            row_start,
+                            block.shape[1],
+                            rows
+                            )
+                        dst.write(block, 1, window=window)
+                        minx, miny, maxx, maxy = \
+                            rasterio.windows.bounds(window, src.transform)
+                        tiles.append([
+                            tile_row,
+                            (chunk_start + offset) // tile_size,
+                            minx,
+                            miny,
+                            maxx,
+                            maxy
+                            ])
+                log(f"dem_store: tile row {tile_row + 1}/{tile_rows}," \
+                    + f" {len(tiles)} tiles with data")
+            levels = [
+                level for level in overview_levels
+                if src.width // level > 0 and src.height // level > 0]
+            if levels:
+                dst.build_overviews(levels, Resampling.average)
+                dst.update_tags(ns="rio_overview", resampling="average")
+        index = {
+            "source": os.path.abspath(str(source)),
+            "source_stamp": _source_stamp(source),
+            "tile_size": tile_size,
+            "tile_rows": tile_rows,
+            "tile_cols": tile_cols,
+            "width": src.width,
+            "height": src.height,
+            "transform": list(src.transform)[:6],
+            "crs": src.crs.to_wkt() if src.crs else None,
+            "nodata": nodata,
+            "dtype": src.dtypes[0],
+            "overviews": levels,
+            "tiles": tiles,
+            }
+    with open(os.path.join(partial_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    if os.path.isdir(store_dir):
+        os.rename(store_dir, f"{store_dir}.old")
+        os.rename(partial_dir, store_dir)
+        for name in os.listdir(f"{store_dir}.old"):
+            os.remove(os.path.join(f"{store_dir}.old", name))
+        os.rmdir(f"{store_dir}.old")
+    else:
+        os.rename(partial_dir, store_dir)
+    log(f"dem_store: {len(tiles)} of {tile_rows * tile_cols} tiles hold" \
+        + f" data, written to {store_dir} in {time.time() - started:.0f}s")
+    return store_dir
+
+
+class TileIndex:
+    """
+    Grid and tile index of a DEM store.
+
+    Parameters:
+    - store_dir: the store directory.
+    - index: the parsed tiles.json.
+    """
+
+    def __init__(self, store_dir, index):
+        self.store_dir = str(store_dir)
+        self.dem_path = os.path.join(self.store_dir, DEM_FILE)
+        self.tile_size = index["tile_size"]
+        self.width = index["width"]
+        self.height = index["height"]
+        self.transform = Affine(*index["transform"])
+        self.crs = index["crs"]
+        self.nodata = index["nodata"]
+        self.dtype = index["dtype"]
+        self.tiles = {
+            (tile[0], tile[1]): tuple(tile[2:]) for tile in index["tiles"]}
+
+    def window(self, bounds):
+        """
+        :return: (row_start, row_stop, col_start, col_stop) of the cells
+        touched by `bounds`.
+        """
+        return pixel_window(self.transform, bounds, self.height, self.width)
+
+    def tile_window(self, key):
+        """
+        :param key: (tile_row, tile_col).
+        :return: rasterio Window of the tile.
+        """
+        tile_row, tile_col = key
+        size = self.tile_size
+        return rasterio.windows.Window(
+            tile_col * size,
+            tile_row * size,
+            min(size, self.width - tile_col * size),
+            min(size, self.height - tile_row * size)
+            )
+
+    def tiles_for(self, bounds):
+        """
+        :param bounds: (minx, miny, maxx, maxy).
+        :return: List of ((tile_row, tile_col), rasterio Window of the
+        tile) for the tiles holding data that intersect `bounds`.
+        """
+        row_start, row_stop, col_start, col_stop = self.window(bounds)
+        size = self.tile_size
+        found = []
+        for tile_row in range(row_start // size, (row_stop - 1) // size + 1):
+            for tile_col in range(
+                col_start // size, (col_stop - 1) // size + 1):
+                key = (tile_row, tile_col)
+                if key in self.tiles:
+                    found.append((key, self.tile_window(key)))
+        return found
+
+
+class TileCache:
+    """
+    Decoded tiles of a store, one raw file per tile in the tile cache
+    directory, opened with numpy.memmap.
+
+    A tile is decoded from the store the first time any process needs
+    it; afterwards every process (and every concurrent project) maps
+    the same file, so the cells live once in the OS page cache instead
+    of in a private copy per worker, and no decode or copy happens on
+    lookups.
+
+    Parameters:
+    - index: the TileIndex of the store.
+    - directory: root of the tile cache, shared by all jobs.
+    """
+
+    def __init__(self, index, directory):
+        self.index = index
+        stamp = os.stat(index.dem_path).st_mtime_ns
+        key = hashlib.sha1(
+            f"{os.path.abspath(index.dem_path)}:{stamp}".encode()
+            ).hexdigest()[:12]
+        self.directory = os.path.join(str(directory), key)
+        self.transform = index.transform
+        self.nodata = index.nodata
+        self.dtype = np.dtype(index.dtype)
+        self.fill = index.nodata if index.nodata is not None else 0
+        self._maps = OrderedDict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key[0]}_{key[1]}.raw")
+
+    def _decode(self, keys):
+        """
+        Decodes the tiles `keys` from the store into the cache. Another
+        process decoding the same tile at the same time only costs a
+        second decode: files are renamed into place complete.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with rasterio.open(self.index.dem_path) as src:
+            for key in keys:
+                data = src.read(1, window=self.index.tile_window(key))
+                partial = f"{self._path(key)}.{os.getpid()}"
+                data.astype(self.dtype, copy=False).tofile(partial)
+                os.replace(partial, self._path(key))
+
+    def tiles(self, keys):
+        """
+        :param keys: (tile_row, tile_col) of tiles holding data.
+        :return: Dict of key to the read-only memmap of the tile.
+        """
+        missing = [
+            key for key in keys
+            if key not in self._maps and not os.path.exists(self._path(key))]
+        if missing:
+            self._decode(missing)
+        tiles = {}
+        for key in keys:
+            tile = self._maps.get(key)
+            if tile is None:
+                window = self.index.tile_window(key)
+                tile = np.memmap(
+                    self._path(key),
+                    dtype=self.dtype,
+                    mode="r",
+                    shape=(window.height, window.width)
+                    )
+                self._maps[key] = tile
+            self._maps.move_to_end(key)
+            tiles[key] = tile
+        while len(self._maps) > MAX_MAPPED_TILES:
+            self._maps.popitem(last=False)
+        return tiles
+
+    def read(self, bounds):
+        """
+        :param bounds: (minx, miny, maxx, maxy).
+        :return: (data, transform) of the cells touched by `bounds`,
+        copied out of the mapped tiles.
+        """
+        row_start, row_stop, col_start, col_stop = self.index.window(bounds)
+        data = np.full(
+            (row_stop - row_start, col_stop - col_start),
+            self.fill,
+            dtype=self.dtype
+            )
+        found = self.index.tiles_for(bounds)
+        tiles = self.tiles([key for key, _ in found])
+        for key, window in found:
+            top = max(row_start, window.row_off)
+            bottom = min(row_stop, window.row_off + window.height)
+            left = max(col_start, window.col_off)
+            right = min(col_stop, window.col_off + window.width)
+            data[
+                top - row_start:bottom - row_start,
+                left - col_start:right - col_start
+                ] = tiles[key][
+                    top - window.row_off:bottom - window.row_off,
+                    left - window.col_off:right - window.col_off
+                    ]
+        transform = self.transform * Affine.translation(col_start, row_start)
+        return data, transform
+
+    def cells(self, rows, cols):
+        """
+        Values of single cells, looked up in the mapped tiles.
+
+        :param rows, cols: Integer arrays of cell rows and columns of
+        the store grid.
+        :return: numpy array of the values; cells of tiles without data
+        hold the nodata value.
+        :raises IndexError: when a cell lies outside the grid.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if rows.size and (
+            rows.min() < 0 or cols.min() < 0
+            or rows.max() >= self.index.height
+            or cols.max() >= self.index.width):
+            raise IndexError("cells outside of the DEM")
+        size = self.index.tile_size
+        values = np.full(rows.shape, self.fill, dtype=self.dtype)
+        tile_keys = np.stack([rows // size, cols // size], axis=-1)
+        keys = [
+            key for key in {tuple(k) for k in tile_keys.reshape(-1, 2)}
+            if key in self.index.tiles]
+        tiles = self.tiles(keys)
+        for key, tile in tiles.items():
+            inside = (tile_keys[..., 0] == key[0]) \
+                & (tile_keys[..., 1] == key[1])
+            values[inside] = tile[
+                rows[inside] - key[0] * size,
+                cols[inside] - key[1] * size
+                ]
+        return values
+
+
+def open_store(source, store_dir=None):
+    """
+    :param source: Path of the source DEM.
+    :param store_dir: Store directory; defaults to store_path(source).
+    :return: The TileIndex of the store, or None when it is missing or
+    was prepared from a different version of `source`.
+    """
+    store_dir = str(store_dir or store_path(source))
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    try:
+        stamp = os.stat(index_path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _stores.get(store_dir)
+    if cached is None or cached[0] != stamp:
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        cached = (stamp, index["source_stamp"], TileIndex(store_dir, index))
+        _stores[store_dir] = cached
+    try:
+        if cached[1] != _source_stamp(source):
+            return None
+    except OSError:
+        # the source may be unmounted; the store is a complete copy
+        pass
+    return cached[2]
+
+
+def tile_cache(index, directory):
+    """
+    :param index: TileIndex of a store.
+    :param directory: Root of the tile cache.
+    :return: The TileCache of the store, shared within this process.
+    """
+    cache = _caches.get(index.store_dir)
+    if cache is None or cache.index is not index:
+        cache = TileCache(index, directory)
+        _caches[index.store_dir] = cache
+    return cache
+
+
+def prune_tile_cache(directory, max_bytes=TILE_CACHE_MAX_BYTES):
+    """
+    Removes the least recently used decoded tiles until the tile cache
+    is at most `max_bytes` large.
+
+    :return: Number of tiles removed.
+    """
+    files = []
+    for root, _, names in os.walk(str(directory)):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append(
+                (max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Prepare the tiled DEM store of a source DEM")
+    parser.add_argument("source", help="source DEM, e.g. dem2019.tiff")
+    parser.add_argument("--store", help="store directory" \
+        + " (default: <source without extension>_store)")
+    parser.add_argument("--tile-size", type=int, default=512)
+    args = parser.parse_args(argv)
+    prepare_store(args.source, args.store, tile_size=args.tile_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
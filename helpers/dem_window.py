@@ -0,0 +1,351 @@
+"""
+This module serves the DEM of the current project from one window of
+the statewide DEM (`IN_DEM_MAIN`) instead of every stage masking the
+source file again. The window is read once, around the first area a
+stage asks for plus a margin, and kept as a raw array in the job's tmp
+directory; the forked stage processes memory-map that array. A request
+falling outside the window grows it to the union of both areas (one
+more read of the source).
+
+When the DEM has a tiled store (helpers.dem_store), no project window
+is kept: masks and profiles are served straight from the decoded tile
+cache, which all processes and concurrent projects share through
+numpy.memmap.
+
+Functions:
+- dem_window(source):
+    Returns the DemWindow of `source` for this process.
+
+- clear():
+    Drops the windows of this process and removes their files.
+
+Classes:
+- DemWindow: cells (`read`), masked sub-arrays (`mask`), GeoTIFF
+  outputs (`write`) and elevation profiles (`profile`) of one source
+  DEM. Interpolated profiles are built by helpers.profile.
+
+Note:
+- Masked cells match rasterio.mask.mask(src, shapes, crop=True): the
+  window is read on the source grid and cropped windows stay aligned
+  to it. Only band 1 is served.
+- The window files live in `tmp/dem_window/<project code>`, are left
+  out of the stage checkpoints and are removed by main (`clear`) at the
+  end of the run; a resumed job reads the window again on demand.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+import rasterio
+import rasterio.features
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from shapely.geometry import shape as to_shape
+from dirs_configs.config import CODE, DEM_TILE_CACHE_DIR, TMP_DIR
+from helpers.dem_store import open_store, pixel_window, tile_cache
+from helpers.misc_helper import interpolate_z_values, read_dem
+
+WINDOW_DIR = TMP_DIR / "dem_window" / CODE
+# feet read around the first requested area, so that the center line
+# and HEC-RAS line buffers of the same project usually fall inside
+MARGIN = 500.0
+
+_windows = {}
+_lock = threading.Lock()
+
+
+def _geometries(shapes):
+    """
+    :param shapes: Shapely geometries, a GeoSeries or GeoJSON-like
+    mappings (e.g. fiona features' geometries).
+    :return: List of non-empty shapely geometries.
+    """
+    geoms = []
+    for geom in shapes:
+        if not hasattr(geom, "geom_type"):
+            geom = to_shape(geom)
+        if not geom.is_empty:
+            geoms.append(geom)
+    if not geoms:
+        raise ValueError("Input shapes are empty.")
+    return geoms
+
+
+def _union_bounds(*bounds):
+    return (
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds),
+        )
+
+
+class DemWindow:
+    """
+    The cached window of one source DEM.
+
+    Parameters:
+    - source: path of the source GeoTIFF.
+    - directory: where the window array and its description are kept.
+    """
+
+    def __init__(self, source, directory=WINDOW_DIR):
+        self.source = str(source)
+        self.directory = str(directory)
+        key = hashlib.sha1(
+            os.path.abspath(self.source).encode()).hexdigest()[:12]
+        self.info_path = os.path.join(self.directory, f"{key}.json")
+        self.key = key
+        self.info = None
+        self.data = None
+        self.transform = None
+        # decoded tiles of the DEM store, if there is one
+        self.tiles = None
+        store = open_store(self.source)
+        if store is not None:
+            self.tiles = tile_cache(store, DEM_TILE_CACHE_DIR)
+            self.info = {
+                "crs": store.crs,
+                "nodata": store.nodata,
+                "dtype": store.dtype,
+                }
+
+    def _source_stamp(self):
+        stat = os.stat(self.source)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _open_cached(self):
+        """
+        Maps the window written by this or another process, if it is
+        newer than the one held and still matches the source.
+        """
+        try:
+            with open(self.info_path, "r") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return
+        if self.info is not None and info["array"] == self.info["array"]:
+            return
+        if info["source"] != self._source_stamp():
+            return
+        try:
+            data = np.load(
+                os.path.join(self.directory, info["array"]), mmap_mode="r")
+        except (OSError, ValueError):
+            return
+        self.info = info
+        self.data = data
+        self.transform = Affine(*info["transform"])
+
+    def bounds(self):
+        """
+        :return: (minx, miny, maxx, maxy) of the window, or None before
+        the first read.
+        """
+        if self.data is None:
+            return None
+        height, width = self.data.shape
+        left, top = self.transform * (0, 0)
+        right, bottom = self.transform * (width, height)
+        return (
+            min(left, right), min(top, bottom),
+            max(left, right), max(top, bottom))
+
+    def _covers(self, bounds):
+        window = self.bounds()
+        if window is None:
+            return False
+        # parts of `bounds` beyond the source can never be covered
+        extent = self.info["extent"]
+        bounds = (
+            max(bounds[0], extent[0]), max(bounds[1], extent[1]),
+            min(bounds[2], extent[2]), min(bounds[3], extent[3]))
+        return window[0] <= bounds[0] and window[1] <= bounds[1] \
+            and window[2] >= bounds[2] and window[3] >= bounds[3]
+
+    def _read(self, bounds):
+        """
+        Reads the window covering `bounds` (and the current window)
+        from the DEM, through its tiled store when there is one, and
+        publishes it for the other processes.
+        """
+        held = self.bounds()
+        if held is not None:
+            bounds = _union_bounds(held, bounds)
+        padded = (
+            bounds[0] - MARGIN, bounds[1] - MARGIN,
+            bounds[2] + MARGIN, bounds[3] + MARGIN)
+        data, transform, meta = read_dem(self.source, padded)
+        info = {
+            "source": self._source_stamp(),
+            "array": f"{self.key}-{uuid.uuid4().hex[:8]}.npy",
+            "transform": list(transform)[:6],
+            "crs": meta["crs"],
+            "nodata": meta["nodata"],
+            "dtype": meta["dtype"],
+            "extent": meta["extent"],
+            }
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(os.path.join(self.directory, info["array"]), data)
+        partial = f"{self.info_path}.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump(info, f)
+        os.replace(partial, self.info_path)
+        if self.info is not None:
+            # processes still mapping the old array keep it until they
+            # drop it
+            try:
+                os.remove(os.path.join(self.directory, self.info["array"]))
+            except OSError:
+                pass
+        self.info = info
+        self.data = data
+        self.transform = transform
+
+    def ensure(self, bounds):
+        """
+        Makes sure the window covers `bounds`.
+
+        :param bounds: (minx, miny, maxx, maxy) in the DEM's CRS.
+        """
+        if self.tiles is not None:
+            # tiles are decoded when they are first used
+            return
+        with _lock:
+            if self._covers(bounds):
+                return
+            self._open_cached()
+            if not self._covers(bounds):
+                self._read(bounds)
+
+    def read(self, bounds):
+        """
+        :param bounds: (minx, miny, maxx, maxy) in the DEM's CRS.
+        :return: (data, transform) of the cells touched by `bounds`;
+        `data` is read-only (a view of the window or a copy out of the
+        tile cache).
+        """
+        if self.tiles is not None:
+            return self.tiles.read(bounds)
+        self.ensure(bounds)
+        row_start, row_stop, col_start, col_stop = pixel_window(
+            self.transform, bounds, *self.data.shape)
+        transform = self.transform * Affine.translation(col_start, row_start)
+        return self.data[row_start:row_stop, col_start:col_stop], transform
+
+    @property
+    def resolution(self):
+        """
+        Cell size of the DEM (None before the first read when there is
+        no store).
+        """
+        transform = self.tiles.transform if self.tiles is not None \
+            else self.transform
+        if transform is None:
+            return None
+        return max(abs(transform.a), abs(transform.e))
+
+    @property
+    def nodata(self):
+        """
+        Nodata value of the DEM (None before the first read when there
+        is no store).
+        """
+        return self.info["nodata"] if self.info else None
+
+    def mask(self, shapes):
+        """
+        Equivalent of rasterio.mask.mask(src, shapes, crop=True) on the
+        window or the tile cache.
+
+        :param shapes: Geometries to mask with (see `_geometries`).
+        :return: (out_image, out_transform); out_image has the shape
+        (1, rows, cols) and cells outside the shapes are set to the
+        nodata value of the source (0 when it has none).
+        """
+        geoms = _geometries(shapes)
+        data, transform = self.read(
+            _union_bounds(*(geom.bounds for geom in geoms)))
+        outside = rasterio.features.geometry_mask(
+            geoms,
+            out_shape=data.shape,
+            transform=transform
+            )
+        out_image = np.array(data)
+        nodata = self.info["nodata"]
+        out_image[outside] = nodata if nodata is not None else 0
+        return out_image[np.newaxis, :, :], transform
+
+    def meta(self, out_image, out_transform):
+        """
+        :return: The rasterio profile of a GeoTIFF holding `out_image`.
+        """
+        crs = self.info["crs"]
+        return {
+            "driver": "GTiff",
+            "dtype": self.info["dtype"],
+            "nodata": self.info["nodata"],
+            "width": out_image.shape[2],
+            "height": out_image.shape[1],
+            "count": out_image.shape[0],
+            "crs": CRS.from_wkt(crs) if crs else None,
+            "transform": out_transform,
+            }
+
+    def write(self, path, shapes):
+        """
+        Masks the window with `shapes` and writes the result as a
+        GeoTIFF, like the stages used to do with the source DEM.
+
+        :return: (band, transform) of the written raster.
+        """
+        out_image, out_transform = self.mask(shapes)
+        with rasterio.open(
+            path,
+            "w",
+            **self.meta(out_image, out_transform)
+            ) as dest:
+            dest.write(out_image)
+        return out_image[0], out_transform
+
+    def profile(self, line):
+        """
+        Elevations of the DEM cells under the vertices of `line`, the
+        lookup of misc_helper.interpolate_z_values without a clipped
+        raster.
+
+        :param line: shapely LineString.
+        :return: numpy array with one value per vertex.
+        """
+        if self.tiles is not None:
+            return interpolate_z_values(
+                line, self.tiles, self.tiles.transform)
+        self.ensure(line.bounds)
+        return interpolate_z_values(line, self.data, self.transform)
+
+
+def dem_window(source):
+    """
+    :param source: Path of the source DEM (the stage's IN_DEM_MAIN).
+    :return: The DemWindow of `source`, shared by the stages that run
+    in this process.
+    """
+    with _lock:
+        window = _windows.get(str(source))
+        if window is None:
+            window = DemWindow(source)
+            _windows[str(source)] = window
+        return window
+
+
+def clear():
+    """
+    Drops the windows held by this process and removes the window
+    files of the project, e.g. once its run is over.
+    """
+    with _lock:
+        _windows.clear()
+        shutil.rmtree(WINDOW_DIR, ignore_errors=True)
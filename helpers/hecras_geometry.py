@@ -0,0 +1,147 @@
+"""
+This module writes cross sections in the text format of HEC-RAS
+geometry files (.g01, .g02, ...), as found in the models of
+./templates/current_hecras_data: a "Type RM Length L Ch R" header, the
+#Sta/Elev table in fixed 8-character fields, Manning's n by region,
+the bank stations and the expansion/contraction coefficients.
+
+Functions:
+- cross_section_block(river_mile, stations, elevations, left_bank,
+  right_bank, description="", lengths=(None, None, None),
+  mannings=MANNINGS, exp_cntr=EXP_CNTR):
+    The lines of one cross-section block.
+
+- write_geometry(path, blocks, title="Floodway cross sections"):
+    Writes a geometry file holding the given blocks.
+
+Note:
+- HEC-RAS accepts at most 500 points per cross section.
+- Files are written with CRLF line ends, as HEC-RAS writes them.
+- Reach lengths left as None are written empty, to be filled in when
+  the block is placed in a reach of the model.
+"""
+import numpy as np
+
+FIELD_WIDTH = 8
+# values per line of the #Sta/Elev and #Mann tables
+STA_ELEV_PER_LINE = 10
+MANN_PER_LINE = 9
+MAX_POINTS = 500
+# left overbank, channel, right overbank, as in the Suwannee model
+MANNINGS = (0.3, 0.05, 0.3)
+EXP_CNTR = (0.3, 0.1)
+PROGRAM_VERSION = "3.13"
+
+
+def _field(value, width=FIELD_WIDTH):
+    """
+    :return: `value` right-aligned in `width` characters, with as many
+    decimals (up to 2) as fit and without trailing zeros, e.g. "  103.84",
+    "   10000", "      .3".
+    """
+    for decimals in (2, 1, 0):
+        text = f"{float(value):.{decimals}f}"
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        if text.startswith("0.") or text.startswith("-0."):
+            text = text.replace("0.", ".", 1)
+        if text in ("", "-"):
+            text = "0"
+        if len(text) <= width:
+            return text.rjust(width)
+    raise ValueError(f"{value} does not fit in {width} characters")
+
+
+def _table(values, per_line):
+    return [
+        "".join(_field(value) for value in values[i:i + per_line])
+        for i in range(0, len(values), per_line)
+        ]
+
+
+def _number(value):
+    return "" if value is None else _field(value).strip()
+
+
+def cross_section_block(
+    river_mile,
+    stations,
+    elevations,
+    left_bank,
+    right_bank,
+    description="",
+    lengths=(None, None, None),
+    mannings=MANNINGS,
+    exp_cntr=EXP_CNTR
+    ):
+    """
+    :param river_mile: River station of the cross section.
+    :param stations: Stations (feet along the section), increasing.
+    :param elevations: Elevation at each station.
+    :param left_bank: Station of the left bank.
+    :param right_bank: Station of the right bank.
+    :param description: Text of the DESCRIPTION section.
+    :param lengths: Downstream reach lengths (left overbank, channel,
+    right overbank); None for unknown.
+    :param mannings: Manning's n of the left overbank, the channel and
+    the right overbank.
+    :param exp_cntr: Expansion and contraction coefficients.
+    :return: List of the lines of the block, ending with a blank line.
+    :raises ValueError: when the section has more than MAX_POINTS points
+    or its banks are not within its stations.
+    """
+    stations = np.asarray(stations, dtype=float)
+    elevations = np.asarray(elevations, dtype=float)
+    if len(stations) > MAX_POINTS:
+        raise ValueError(
+            f"{len(stations)} points, HEC-RAS accepts {MAX_POINTS}")
+    left_bank, right_bank = sorted((float(left_bank), float(right_bank)))
+    if left_bank < stations[0] or right_bank > stations[-1]:
+        raise ValueError(
+            f"bank stations {left_bank}, {right_bank} outside" \
+                + f" {stations[0]}-{stations[-1]}"
+                )
+    sta_elev = np.column_stack([stations, elevations]).ravel()
+    mann = [
+        stations[0], mannings[0], 0,
+        left_bank, mannings[1], 0,
+        right_bank, mannings[2], 0,
+        ]
+    lines = [
+        f"Type RM Length L Ch R = 1 ,{str(river_mile).ljust(FIELD_WIDTH)}," \
+            + ",".join(_number(length) for length in lengths),
+        "BEGIN DESCRIPTION:",
+        description,
+        "END DESCRIPTION:",
+        f"#Sta/Elev= {len(stations)} ",
+        ]
+    lines += _table(sta_elev, STA_ELEV_PER_LINE)
+    lines.append("#Mann= 3 , 0 , 0 ")
+    lines += _table(mann, MANN_PER_LINE)
+    lines += [
+        f"Bank Sta={_number(left_bank)},{_number(right_bank)}",
+        f"Exp/Cntr={exp_cntr[0]},{exp_cntr[1]}",
+        "",
+        ]
+    return lines
+
+
+def write_geometry(path, blocks, title="Floodway cross sections"):
+    """
+    Writes a geometry file.
+
+    :param path: Path of the file, e.g. "<project>.g01".
+    :param blocks: Lists of lines from cross_section_block.
+    :param title: Geom Title of the file.
+    :return: `path`.
+    """
+    lines = [
+        f"Geom Title={title}",
+        f"Program Version={PROGRAM_VERSION}",
+        "",
+        ]
+    for block in blocks:
+        lines += block
+    with open(path, "w", newline="\r\n", encoding="ascii") as file:
+        file.write("\n".join(lines) + "\n")
+    return path
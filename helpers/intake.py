@@ -0,0 +1,248 @@
+"""
+This module watches the tmp/ directory for new project databases and
+hands over only complete, valid ones. On Linux it is driven by inotify
+close-write and rename events, so a job is picked up as soon as the
+database file is closed and an idle server does not wake up at all;
+elsewhere it falls back to polling the directory.
+
+Classes:
+- Inotify: minimal ctypes binding of the Linux inotify API.
+- DbIntake: reports `.db` files in a directory once they are complete
+  and valid.
+
+Functions:
+- validate_project_db(db_file):
+    Checks that a file is a readable sqlite3 project database with a
+    `project_data` row holding id, parcelid, cntyname and lname.
+"""
+import ctypes
+import ctypes.util
+import os
+import os.path
+import select
+import sqlite3
+import struct
+import time
+
+REQUIRED_COLUMNS = ("id", "parcelid", "cntyname", "lname")
+JOURNAL_SUFFIXES = ("-journal", "-wal")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def validate_project_db(db_file):
+    """
+    Checks that a file is a complete project database.
+
+    :param db_file: Path of the sqlite3 project database.
+    :return: Tuple (valid, reason); reason is an empty string for a
+    valid database.
+    """
+    for suffix in JOURNAL_SUFFIXES:
+        if os.path.exists(f"{db_file}{suffix}"):
+            return False, f"{suffix[1:]} file present"
+    try:
+        uri = f"file:{os.path.abspath(db_file)}?mode=ro"
+        with sqlite3.connect(uri, uri=True) as conn:
+            c = conn.cursor()
+            c.execute("PRAGMA table_info(project_data);")
+            columns = {row[1].lower() for row in c.fetchall()}
+            missing = [n for n in REQUIRED_COLUMNS if n not in columns]
+            if missing:
+                return False, f"project_data lacks {', '.join(missing)}"
+            c.execute(
+                f"SELECT {', '.join(REQUIRED_COLUMNS)} FROM project_data;")
+            row = c.fetchone()
+    except sqlite3.Error as e:
+        return False, f"not a readable sqlite3 database ({e})"
+    if row is None:
+        return False, "project_data is empty"
+    empty = [n for n, v in zip(REQUIRED_COLUMNS, row) if v in (None, "")]
+    if empty:
+        return False, f"project_data has no {', '.join(empty)}"
+    return True, ""
+
+
+class Inotify:
+    """
+    Minimal inotify binding; raises OSError where inotify is not
+    available.
+    """
+
+    def __init__(self):
+        name = ctypes.util.find_library("c")
+        if name is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not supported")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read(self, timeout=None):
+        """
+        Waits up to `timeout` seconds (forever for None) for events.
+
+        :return: List of (mask, name) tuples.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd is not None and self.fd >= 0:
+            os.close(self.fd)
+        self.fd = None
+
+
+class DbIntake:
+    """
+    Reports project databases that appear in `watch_dir`.
+
+    Files already present when the intake is created are reported by
+    the first call to `wait`. A file that fails validation is logged
+    once and reported later if it is rewritten and then validates.
+
+    Parameters:
+    - watch_dir: directory receiving the `.db` files (tmp/).
+    - log: optional callable(message).
+    - poll_interval: seconds between directory scans when inotify is
+    unavailable.
+    """
+
+    def __init__(self, watch_dir, log=None, poll_interval=5):
+        self.watch_dir = watch_dir
+        self.log = log or (lambda message: None)
+        self.poll_interval = poll_interval
+        self.rejected = {}
+        self.reported = {}
+        self.sizes = {}
+        self.pending = set()
+        try:
+            self.inotify = Inotify()
+            self.inotify.add_watch(
+                watch_dir, IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE)
+            self.log(f"intake: watching {watch_dir} with inotify")
+        except OSError as e:
+            self.inotify = None
+            self.log(
+                f"intake: inotify unavailable ({e}), polling {watch_dir}" \
+                    + f" every {poll_interval}s")
+        self.pending.update(self._scan())
+
+    def _scan(self):
+        return {
+            os.path.join(self.watch_dir, f)
+            for f in os.listdir(self.watch_dir) if f.endswith(".db")
+            }
+
+    def _signature(self, db_file):
+        st = os.stat(db_file)
+        return st.st_size, st.st_mtime_ns
+
+    def _accept(self, db_file):
+        """
+        Validates a candidate file; returns True if it can be queued.
+        """
+        try:
+            signature = self._signature(db_file)
+        except FileNotFoundError:
+            self.rejected.pop(db_file, None)
+            self.reported.pop(db_file, None)
+            return False
+        if signature in (
+            self.rejected.get(db_file), self.reported.get(db_file)):
+            return False
+        if any(os.path.exists(f"{db_file}{s}") for s in JOURNAL_SUFFIXES):
+            # still being written; the journal's deletion re-triggers it
+            return False
+        valid, reason = validate_project_db(db_file)
+        if not valid:
+            self.rejected[db_file] = signature
+            self.log(f"intake: not queueing {db_file}: {reason}")
+            return False
+        self.rejected.pop(db_file, None)
+        self.reported[db_file] = signature
+        return True
+
+    def _poll_candidates(self, timeout):
+        """
+        Polling fallback; a file is a candidate once its size and mtime
+        did not change between two scans.
+        """
+        if timeout is None or timeout > self.poll_interval:
+            timeout = self.poll_interval
+        time.sleep(timeout)
+        candidates = set()
+        sizes = {}
+        for db_file in self._scan():
+            try:
+                sizes[db_file] = self._signature(db_file)
+            except FileNotFoundError:
+                continue
+            if self.sizes.get(db_file) == sizes[db_file]:
+                candidates.add(db_file)
+        self.sizes = sizes
+        return candidates
+
+    def wait(self, timeout=None):
+        """
+        Waits for new project databases.
+
+        :param timeout: Maximum seconds to wait; None waits until a
+        database arrives (inotify) or one poll interval (polling).
+        :return: Sorted list of paths of valid databases.
+        """
+        if not self.pending:
+            if self.inotify is None:
+                self.pending.update(self._poll_candidates(timeout))
+            else:
+                for mask, name in self.inotify.read(timeout):
+                    if mask & IN_Q_OVERFLOW:
+                        self.pending.update(self._scan())
+                    elif name.endswith(".db"):
+                        if not mask & IN_DELETE:
+                            self.pending.add(
+                                os.path.join(self.watch_dir, name))
+                    elif name.endswith(JOURNAL_SUFFIXES):
+                        db_file = name.rsplit("-", 1)[0]
+                        if db_file.endswith(".db"):
+                            self.pending.add(
+                                os.path.join(self.watch_dir, db_file))
+        ready = sorted(f for f in self.pending if self._accept(f))
+        self.pending.clear()
+        return ready
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
@@ -0,0 +1,271 @@
+"""
+This module provides the durable job table of the job runner. Every
+project database handed to pre_main becomes a row in a local sqlite3
+file that survives restarts; jobs are claimed atomically, and a failed
+or timed out project is put back in the queue with an exponential
+backoff until it runs out of attempts.
+
+Classes:
+- JobQueue: the job table.
+
+Job states:
+- queued: waiting to be claimed (not before `not_before`).
+- running: claimed by a runner.
+- done: finished without failed stages.
+- failed: gave up after `max_attempts` attempts.
+- cancelled: cancelled by the user.
+"""
+import os
+import sqlite3
+import time
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    job_dir TEXT NOT NULL,
+    db_file TEXT NOT NULL,
+    project_number TEXT,
+    l_name TEXT,
+    state TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    runner_pid INTEGER,
+    failed_stage TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim
+    ON jobs (state, priority DESC, created);
+"""
+
+
+class JobQueue:
+    """
+    Persistent job table stored in a sqlite3 file.
+
+    Parameters:
+    - path: sqlite3 file holding the table.
+    - max_attempts: default number of attempts per job.
+    - backoff: seconds before the first retry; doubled on every
+    further attempt.
+    - max_backoff: upper bound of the retry delay in seconds.
+    """
+
+    def __init__(self, path, max_attempts=3, backoff=60, max_backoff=3600):
+        self.path = str(path)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        conn = self._open()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _connect(self):
+        return _Transaction(self._open())
+
+    def enqueue(
+        self,
+        job_id,
+        job_dir,
+        db_file,
+        project_number=None,
+        l_name=None,
+        priority=0,
+        max_attempts=None
+        ):
+        """
+        Adds a job in the "queued" state.
+
+        :param priority: Jobs with a higher priority are claimed first.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, job_dir, db_file," \
+                    + " project_number, l_name, state, priority," \
+                    + " max_attempts, created)" \
+                    + " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                (
+                    job_id,
+                    str(job_dir),
+                    str(db_file),
+                    project_number,
+                    l_name,
+                    QUEUED,
+                    int(priority),
+                    max_attempts or self.max_attempts,
+                    time.time()
+                    )
+                )
+
+    def claim(self, runner_pid=None):
+        """
+        Atomically moves the most urgent due job to "running".
+
+        :param runner_pid: Pid recorded as the owner of the job.
+        :return: The claimed row (sqlite3.Row), or None.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE state = ?" \
+                    + " AND not_before <= ?" \
+                    + " ORDER BY priority DESC, created LIMIT 1;",
+                (QUEUED, now)
+                ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1," \
+                    + " started = ?, finished = NULL, runner_pid = ?" \
+                    + " WHERE job_id = ?;",
+                (RUNNING, now, runner_pid or os.getpid(), row["job_id"])
+                )
+            return conn.execute(
+                "SELECT * FROM jobs WHERE job_id = ?;", (row["job_id"],)
+                ).fetchone()
+
+    def complete(self, job_id):
+        self._finish(job_id, DONE)
+
+    def cancel(self, job_id, error="cancelled"):
+        self._finish(job_id, CANCELLED, error=error)
+
+    def _finish(self, job_id, state, error=None, failed_stage=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, finished = ?, last_error = ?," \
+                    + " failed_stage = ? WHERE job_id = ?;",
+                (state, time.time(), error, failed_stage, job_id)
+                )
+
+    def fail(self, job_id, error, failed_stage=None):
+        """
+        Records a failed attempt and schedules a retry with backoff, or
+        marks the job "failed" once it has used all of its attempts.
+
+        :param error: Short description of the failure.
+        :param failed_stage: Name(s) of the pipeline stage(s) that
+        failed, if known.
+        :return: The new state ("queued" or "failed").
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ?;",
+                (job_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            if row["attempts"] >= row["max_attempts"]:
+                state, not_before = FAILED, 0
+            else:
+                state = QUEUED
+                delay = self.backoff * 2 ** max(0, row["attempts"] - 1)
+                not_before = now + min(delay, self.max_backoff)
+            conn.execute(
+                "UPDATE jobs SET state = ?, finished = ?, not_before = ?," \
+                    + " last_error = ?, failed_stage = ? WHERE job_id = ?;",
+                (state, now, not_before, error, failed_stage, job_id)
+                )
+        return state
+
+    def requeue(self, job_id):
+        """
+        Puts a job stopped by a clean runner shutdown back in the
+        queue without counting the attempt.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0)," \
+                    + " not_before = 0 WHERE job_id = ? AND state = ?;",
+                (QUEUED, job_id, RUNNING)
+                )
+
+    def recover(self):
+        """
+        Handles every job left "running" by a previous runner that did
+        not shut down cleanly. The interrupted attempt counts, as the
+        job may be what brought the runner down: it is retried with
+        backoff, or marked "failed" once it has used all of its
+        attempts.
+
+        :return: List of (job id, new state) of the recovered jobs.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE state = ?;", (RUNNING,)
+                ).fetchall()
+        return [
+            (
+                row["job_id"],
+                self.fail(
+                    row["job_id"],
+                    "interrupted: runner exited while the job was running"
+                    )
+                )
+            for row in rows
+            ]
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM jobs WHERE job_id = ?;", (job_id,)
+                ).fetchone()
+
+    def jobs(self, states=None):
+        """
+        Lists jobs, most urgent first.
+
+        :param states: Optional iterable of states to filter on.
+        :return: List of sqlite3.Row.
+        """
+        query = "SELECT * FROM jobs"
+        params = ()
+        if states:
+            states = tuple(states)
+            query += f" WHERE state IN ({', '.join('?' * len(states))})"
+            params = states
+        query += " ORDER BY priority DESC, created;"
+        with self._connect() as conn:
+            return conn.execute(query, params).fetchall()
+
+
+class _Transaction:
+    """
+    Context manager running the block in a single IMMEDIATE
+    transaction, so a claim cannot interleave with another writer.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE;")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.execute("COMMIT;")
+            else:
+                self.conn.execute("ROLLBACK;")
+        finally:
+            self.conn.close()
+        return False
@@ -0,0 +1,414 @@
+"""
+This module provides a bounded runner for project databases. Every
+queued `.db` file gets its own workspace under `tmp/jobs/<job_id>`
+(the database, the project tree, tmp files and logs) and is processed
+by its own `main.py` subprocess, so up to `max_jobs` projects run side
+by side without sharing files or killing each other.
+
+Jobs are started as `python3 main.py <db> <pid>` or, when a
+`helpers.warm_pool.WarmPool` is given, in a child forked from the
+already warm pre_main process.
+
+Jobs are recorded in the persistent `helpers.job_queue.JobQueue`, so
+queued work survives a restart of pre_main. The submitted database is
+kept in `<job_dir>/input/` and copied into the workspace for each
+attempt; a project that fails or times out is retried with backoff
+until it runs out of attempts. A retry keeps the project tree and the
+stage checkpoints of the previous attempt (see `helpers.checkpoint`),
+so it only recomputes the stages that did not finish.
+
+Classes:
+- Job: state of one running attempt of a project database.
+- JobRunner: claims jobs for free slots, reaps finished jobs, enforces
+  the per-job timeout and handles per-job cancellation.
+
+Functions:
+- write_job_result(job_dir, stage_errors):
+    Called by main.py to report which stages failed.
+
+Cancellation:
+    A job is cancelled with `JobRunner.cancel(job_id)` or by creating a
+    file named `cancel` in its workspace. The job's whole process group
+    (main.py, its stage processes and browsers) receives SIGTERM, and
+    SIGKILL if it is still alive after `kill_grace` seconds. Sibling
+    jobs are not touched.
+"""
+import json
+import os
+import os.path
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from helpers.job_queue import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    JobQueue
+    )
+
+JOB_DIR_ENV = "FLOODWAY_JOB_DIR"
+RESUME_ENV = "FLOODWAY_RESUME"
+FINAL_ATTEMPT_ENV = "FLOODWAY_FINAL_ATTEMPT"
+CANCEL_FILE = "cancel"
+RESULT_FILE = "result.json"
+INPUT_DIR = "input"
+QUEUE_FILE = "queue.sqlite"
+
+
+def read_project_info(db_file):
+    """
+    Reads the project number and last name from a project database.
+
+    :param db_file: Path of the sqlite3 project database.
+    :return: Tuple (project_number, l_name), or (None, None) if the
+    database cannot be read.
+    """
+    try:
+        with sqlite3.connect(str(db_file)) as conn:
+            c = conn.cursor()
+            c.execute("SELECT id, lname FROM project_data;")
+            row = c.fetchone()
+        return str(row[0]), str(row[1])
+    except (sqlite3.Error, TypeError):
+        return None, None
+
+
+def write_job_result(job_dir, stage_errors):
+    """
+    Records the outcome of a run in its job workspace.
+
+    :param job_dir: The job workspace (FLOODWAY_JOB_DIR).
+    :param stage_errors: Dict of failed stage name to error message;
+    empty if every stage succeeded.
+    """
+    with open(os.path.join(str(job_dir), RESULT_FILE), "w") as f:
+        json.dump({"failed_stages": stage_errors}, f)
+
+
+def read_job_result(job_dir):
+    """
+    :return: Dict of failed stage name to error, or None if main.py did
+    not get as far as writing a result.
+    """
+    try:
+        with open(os.path.join(job_dir, RESULT_FILE), "r") as f:
+            return json.load(f).get("failed_stages", {})
+    except (OSError, ValueError):
+        return None
+
+
+class Job:
+    """
+    State of one attempt of a project database handled by the
+    JobRunner.
+    """
+
+    def __init__(self, row):
+        self.job_id = row["job_id"]
+        self.job_dir = row["job_dir"]
+        self.db_file = row["db_file"]
+        self.project_number = row["project_number"]
+        self.l_name = row["l_name"]
+        self.attempt = row["attempts"]
+        self.max_attempts = row["max_attempts"]
+        self.output_path = os.path.join(self.job_dir, "main_output.log")
+        self.proc = None
+        self.started = None
+        self.finished = None
+        self.status = "running"
+        self.kill_deadline = None
+
+    def __repr__(self):
+        return f"Job({self.job_id}, {self.status})"
+
+
+class JobRunner:
+    """
+    Runs up to `max_jobs` project databases concurrently, each in an
+    isolated workspace and its own process group.
+
+    Parameters:
+    - python_script: path of main.py.
+    - jobs_dir: directory holding one workspace per job and the queue.
+    - log_file: shared log that receives runner messages and, once a
+    job ends, that job's output.
+    - max_jobs: number of projects processed at the same time.
+    - timeout: seconds after which a running job is cancelled.
+    - python_3: interpreter used for main.py (defaults to the one
+    running this process).
+    - on_failed: optional callable(job) invoked when a job has used all
+    of its attempts; `job.status` is "failed" or "timeout".
+    - kill_grace: seconds between SIGTERM and SIGKILL on cancellation.
+    - warm_pool: optional helpers.warm_pool.WarmPool; when given, jobs
+    run in children forked from the warm parent instead of a new
+    interpreter.
+    - queue: the JobQueue (defaults to `<jobs_dir>/queue.sqlite`).
+    """
+
+    def __init__(
+        self,
+        python_script,
+        jobs_dir,
+        log_file,
+        max_jobs=2,
+        timeout=1200,
+        python_3=None,
+        on_failed=None,
+        kill_grace=10,
+        warm_pool=None,
+        queue=None
+        ):
+        self.python_script = python_script
+        self.jobs_dir = jobs_dir
+        self.log_file = log_file
+        self.max_jobs = max(1, int(max_jobs))
+        self.timeout = timeout
+        self.python_3 = python_3 or sys.executable
+        self.on_failed = on_failed
+        self.kill_grace = kill_grace
+        self.warm_pool = warm_pool
+        self.running = {}
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.queue = queue or JobQueue(os.path.join(jobs_dir, QUEUE_FILE))
+        for job_id, state in self.queue.recover():
+            if state == FAILED:
+                self.log(f"Interrupted job {job_id} out of attempts, failed")
+            else:
+                self.log(f"Requeued interrupted job {job_id}")
+
+    def log(self, message):
+        with open(self.log_file, "a") as f:
+            f.write(f"{datetime.now()}: {message}\n")
+
+    def submit(self, db_file, priority=0):
+        """
+        Moves a project database into a new job workspace and queues it.
+
+        :param db_file: Path of the sqlite3 project database.
+        :param priority: Jobs with a higher priority start first.
+        :return: The job id.
+        """
+        name = os.path.basename(db_file)
+        stem = os.path.splitext(name)[0]
+        job_id = f"{stem}-{uuid.uuid4().hex[:8]}"
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(os.path.join(job_dir, INPUT_DIR), exist_ok=True)
+        input_db = os.path.join(job_dir, INPUT_DIR, name)
+        shutil.move(db_file, input_db)
+        project_number, l_name = read_project_info(input_db)
+        self.queue.enqueue(
+            job_id,
+            job_dir,
+            os.path.join(job_dir, name),
+            project_number=project_number,
+            l_name=l_name,
+            priority=priority
+            )
+        self.log(f"Queued {db_file} as job {job_id}")
+        return job_id
+
+    def active_count(self):
+        return len(self.running)
+
+    def has_work(self):
+        """
+        True while jobs run or queued jobs wait (possibly for their
+        retry backoff), i.e. while `poll` has to be called regularly.
+        """
+        return bool(self.running) or bool(self.queue.jobs((QUEUED,)))
+
+    def _prepare(self, job):
+        """
+        Resets the workspace for a new attempt; main.py deletes its
+        database when it finishes, so each attempt gets a fresh copy.
+        Retries keep the tmp files, which the checkpoints of the
+        previous attempt may refer to.
+        """
+        names = ("logs",) if job.attempt > 1 else ("logs", "tmp")
+        for name in names:
+            shutil.rmtree(os.path.join(job.job_dir, name), ignore_errors=True)
+        for name in ("logs", "tmp"):
+            os.makedirs(os.path.join(job.job_dir, name), exist_ok=True)
+        for name in (RESULT_FILE, CANCEL_FILE):
+            path = os.path.join(job.job_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.copyfile(
+            os.path.join(
+                job.job_dir, INPUT_DIR, os.path.basename(job.db_file)),
+            job.db_file
+            )
+
+    def _job_env(self, job):
+        return {
+            JOB_DIR_ENV: job.job_dir,
+            RESUME_ENV: "1" if job.attempt > 1 else "0",
+            FINAL_ATTEMPT_ENV: \
+                "1" if job.attempt >= job.max_attempts else "0",
+            }
+
+    def _start(self, job):
+        self._prepare(job)
+        if self.warm_pool is not None:
+            job.proc = self.warm_pool.spawn(
+                [job.db_file, os.getpid()],
+                self._job_env(job),
+                job.output_path
+                )
+            self._started(job)
+            return
+        env = os.environ.copy()
+        env.update(self._job_env(job))
+        with open(job.output_path, "a") as output:
+            job.proc = subprocess.Popen(
+                [
+                    self.python_3,
+                    self.python_script,
+                    job.db_file,
+                    str(os.getpid())
+                    ],
+                stdout=output,
+                stderr=subprocess.STDOUT,
+                env=env,
+                cwd=os.path.dirname(self.python_script),
+                start_new_session=True
+                )
+        self._started(job)
+
+    def _started(self, job):
+        job.started = time.time()
+        self.running[job.job_id] = job
+        self.log(
+            f"Started job {job.job_id} attempt {job.attempt}" \
+                + f" (pid {job.proc.pid}," \
+                + f" project {job.l_name}-{job.project_number})")
+
+    def cancel(self, job_id, reason=CANCELLED):
+        """
+        Cancels a queued or running job without affecting other jobs.
+
+        :param job_id: Id of the job to cancel.
+        :param reason: Final status recorded for the job.
+        :return: True if the job was found.
+        """
+        job = self.running.get(job_id)
+        if job is None:
+            row = self.queue.get(job_id)
+            if row is None:
+                return False
+            if row["state"] not in (CANCELLED, FAILED):
+                self.queue.cancel(job_id)
+                self.log(f"Job {job_id} cancelled")
+                shutil.rmtree(row["job_dir"], ignore_errors=True)
+            return True
+        if job.kill_deadline is None:
+            job.status = reason
+            job.kill_deadline = time.time() + self.kill_grace
+            self._signal(job, signal.SIGTERM)
+            self.log(f"Cancelling job {job_id} ({reason})")
+        return True
+
+    def shutdown(self):
+        """
+        Stops every running job and puts it back in the queue, so the
+        next runner starts it again without counting the attempt.
+        """
+        for job in self.running.values():
+            self._signal(job, signal.SIGTERM)
+        deadline = time.time() + self.kill_grace
+        while time.time() < deadline and any(
+            job.proc.poll() is None for job in self.running.values()):
+            time.sleep(0.2)
+        for job_id, job in list(self.running.items()):
+            if job.proc.poll() is None:
+                self._signal(job, signal.SIGKILL)
+            self.queue.requeue(job_id)
+            self.log(f"Job {job_id} interrupted, requeued")
+        self.running.clear()
+
+    def _signal(self, job, sig):
+        try:
+            os.killpg(job.proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def poll(self):
+        """
+        Reaps finished jobs, enforces timeouts and cancel requests, and
+        claims queued jobs for free slots.
+
+        :return: List of jobs that ended during this call.
+        """
+        ended = []
+        now = time.time()
+        for job_id, job in list(self.running.items()):
+            if job.proc.poll() is not None:
+                del self.running[job_id]
+                self._finish(job)
+                ended.append(job)
+                continue
+            if job.kill_deadline is not None:
+                if now >= job.kill_deadline:
+                    self._signal(job, signal.SIGKILL)
+                continue
+            if os.path.exists(os.path.join(job.job_dir, CANCEL_FILE)):
+                self.cancel(job_id)
+            elif self.timeout and now - job.started > self.timeout:
+                self.cancel(job_id, reason="timeout")
+        while len(self.running) < self.max_jobs:
+            row = self.queue.claim()
+            if row is None:
+                break
+            self._start(Job(row))
+        return ended
+
+    def _finish(self, job):
+        job.finished = time.time()
+        if os.path.exists(job.output_path):
+            with open(job.output_path, "r") as output, \
+                open(self.log_file, "a") as f:
+                f.write(output.read())
+            os.remove(job.output_path)
+        if job.status == CANCELLED:
+            self.queue.cancel(job.job_id)
+            self.log(f"Job {job.job_id} cancelled")
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+            return
+        failed_stages = read_job_result(job.job_dir)
+        if job.status == "timeout":
+            error = f"timed out after {self.timeout}s"
+        elif job.proc.returncode != 0:
+            error = f"exit code {job.proc.returncode}"
+        elif failed_stages is None:
+            error = "main.py wrote no result"
+        elif failed_stages:
+            error = "; ".join(f"{k}: {v}" for k, v in failed_stages.items())
+        else:
+            job.status = "done"
+            self.queue.complete(job.job_id)
+            self.log(f"Job {job.job_id} done")
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+            return
+        state = self.queue.fail(
+            job.job_id,
+            error,
+            failed_stage=", ".join(failed_stages or ()) or None
+            )
+        if job.status != "timeout":
+            job.status = "failed"
+        self.log(f"Job {job.job_id} {job.status}: {error}")
+        if state == FAILED:
+            self.log(f"Job {job.job_id} gave up after {job.attempt} attempts")
+            if self.on_failed is not None:
+                try:
+                    self.on_failed(job)
+                except Exception as e:
+                    self.log(f"Error: on_failed failed for {job.job_id}: {e}")
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+        else:
+            self.log(f"Job {job.job_id} queued for retry")
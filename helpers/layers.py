@@ -0,0 +1,118 @@
+"""
+This module loads the static reference layers of ./gis (the bank
+lines, the floodway lines, the river and its cross sections). Each
+layer is converted once to GeoParquet next to its shapefile and decoded
+from there, at most once per process; later loads in the same process
+are served from memory.
+
+Usage (optional; layers are converted on first load otherwise):
+    python -m helpers.layers ./gis/suw_eb_line.shp [...]
+
+Functions:
+- cache_path(source):
+    GeoParquet copy of a layer.
+
+- convert_layer(source, path=None):
+    Writes the GeoParquet copy of a layer.
+
+- load_layer(source):
+    GeoDataFrame of a layer.
+
+- clear():
+    Drops the layers held by this process.
+
+Note:
+- A copy is fresh when its modification time equals the one of its
+  source; it is written to a temporary file and renamed, so concurrent
+  projects never read a partial copy.
+- Without pyarrow the layers are read from their shapefiles (still
+  once per process).
+- load_layer returns a copy of the frame held in memory; the geometries
+  themselves are shared and immutable.
+"""
+import argparse
+import os
+import sys
+import geopandas as gpd
+
+# source path -> (source mtime, GeoDataFrame)
+_layers = {}
+
+
+def cache_path(source):
+    """
+    :param source: Path of the layer's shapefile.
+    :return: Path of its GeoParquet copy.
+    """
+    return f"{os.path.splitext(str(source))[0]}.parquet"
+
+
+def convert_layer(source, path=None):
+    """
+    Writes the GeoParquet copy of a layer.
+
+    :param source: Path of the layer's shapefile.
+    :param path: Path of the copy; defaults to cache_path(source).
+    :return: (path of the copy, GeoDataFrame of the layer).
+    """
+    path = str(path or cache_path(source))
+    mtime = os.stat(str(source)).st_mtime_ns
+    gdf = gpd.read_file(source)
+    partial = f"{path}.partial.{os.getpid()}"
+    gdf.to_parquet(partial)
+    # the copy carries the mtime of the source it was made from
+    os.utime(partial, ns=(os.stat(partial).st_atime_ns, mtime))
+    os.replace(partial, path)
+    return path, gdf
+
+
+def _read(source, mtime):
+    path = cache_path(source)
+    try:
+        if os.stat(path).st_mtime_ns == mtime:
+            return gpd.read_parquet(path)
+    except OSError:
+        pass
+    except ImportError:
+        return gpd.read_file(source)
+    try:
+        return convert_layer(source, path)[1]
+    except ImportError:
+        return gpd.read_file(source)
+
+
+def load_layer(source):
+    """
+    :param source: Path of the layer's shapefile, e.g. EB_LINE.
+    :return: GeoDataFrame of the layer, decoded once per process and
+    per version of the source.
+    """
+    key = str(source)
+    mtime = os.stat(key).st_mtime_ns
+    cached = _layers.get(key)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _read(key, mtime))
+        _layers[key] = cached
+    return cached[1].copy()
+
+
+def clear():
+    """
+    Drops the layers held by this process.
+    """
+    _layers.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert reference layers to GeoParquet")
+    parser.add_argument("sources", nargs="+", help="layer shapefiles")
+    args = parser.parse_args(argv)
+    for source in args.sources:
+        path, gdf = convert_layer(source)
+        print(f"{source}: {len(gdf)} features -> {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+This module provides deferred imports for the heavy browser, GUI and
+reporting dependencies (selenium, undetected_chromedriver, pyautogui,
+folium, reportlab, ...) and a virtual display that is started on first
+use instead of at import time. Stages that return early (for example
+when `river_frontage_length == 0`) never load them, and a worker that
+only does geometry starts without them.
+
+Functions:
+- lazy_import(name):
+    Returns a proxy for module `name` that imports it on first
+    attribute access.
+
+- lazy_attr(module, name):
+    Returns a proxy for `module.name` (a class or function) that
+    imports the module on first call or attribute access.
+
+- timed_import(name):
+    Imports module `name` now and records how long it took.
+
+- start_display():
+    Starts the pyvirtualdisplay Display of this process, once, and binds
+    pyautogui to it.
+
+- import_report():
+    Formats the recorded import times, slowest first.
+
+Note:
+- The proxies cannot be used where Python needs the real object, e.g.
+  in an `except` clause; use an attribute of a lazy module there
+  (`except selenium_exceptions.WebDriverException`).
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+DISPLAY = ":99"
+
+# module name -> seconds spent importing it in this process
+IMPORT_TIMES = {}
+_lock = threading.RLock()
+_display = None
+
+
+def timed_import(name):
+    """
+    Imports a module and records the import time.
+
+    :param name: Dotted module name.
+    :return: The module.
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_TIMES[name] = time.perf_counter() - started
+        return module
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = timed_import(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] else "not loaded"
+        return f"<lazy module {self.__dict__['_name']} ({state})>"
+
+
+class LazyAttr:
+    """
+    Stand-in for a class or function of a module that is imported on
+    first call or attribute access.
+    """
+
+    def __init__(self, module, name):
+        self._module = LazyModule(module)
+        self._name = name
+
+    def _load(self):
+        return getattr(self._module, self._name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._module.__dict__['_name']}.{self._name}>"
+
+
+def lazy_import(name):
+    """
+    :param name: Dotted module name.
+    :return: A LazyModule for `name`.
+    """
+    return LazyModule(name)
+
+
+def lazy_attr(module, name):
+    """
+    :param module: Dotted module name.
+    :param name: Name of the class or function in that module.
+    :return: A LazyAttr for `module.name`.
+    """
+    return LazyAttr(module, name)
+
+
+def start_display():
+    """
+    Starts the virtual display used by the browser stages, once per
+    process, and points pyautogui at it.
+
+    :return: The pyvirtualdisplay Display.
+    """
+    global _display
+    with _lock:
+        if _display is not None:
+            return _display
+        os.environ["DISPLAY"] = DISPLAY
+        pyvirtualdisplay = timed_import("pyvirtualdisplay")
+        display = pyvirtualdisplay.Display(
+            visible=True,
+            size=(1366, 768),
+            backend="xvfb",
+            use_xauth=True
+            )
+        display.start()
+        pyautogui = timed_import("pyautogui")
+        xlib_display = timed_import("Xlib.display")
+        pyautogui._pyautogui_x11._display = xlib_display.Display(
+            os.environ["DISPLAY"]
+            )
+        _display = display
+        return display
+
+
+def import_report():
+    """
+    :return: List of log lines, one per recorded import, slowest
+    first.
+    """
+    return [
+        f"import {name}: {seconds:.3f}s"
+        for name, seconds in sorted(
+            IMPORT_TIMES.items(), key=lambda item: -item[1])
+        ]
@@ -1,6 +1,8 @@
 import math
 import rasterio
 import rasterio.mask
+import rasterio.transform
+import rasterio.windows
 import pdfrw
 import numpy as np
 import subprocess
@@ -9,6 +11,8 @@ import signal
 import psutil
 import glob
 import requests
+from dirs_configs.config import DEM_TILE_CACHE_DIR
+from helpers.dem_store import TileCache, open_store, pixel_window, tile_cache
 
 
 def find_closest_index(arr, target):
@@ -121,6 +125,60 @@ def read_raster(filename):
     return data, transform
 
 
+def read_dem(source, bounds, store=None):
+    """
+    Read the cells of a DEM that cover a bounding box.
+
+    The cells come from the tiled store of the DEM when one has been
+    prepared (see helpers.dem_store): only the tiles that intersect
+    `bounds` are used, through the shared cache of decoded tiles.
+    Without a store they are read from `source`.
+
+    Parameters:
+    - source: path of the source DEM
+    - bounds: (minx, miny, maxx, maxy) in the DEM's CRS
+    - store: TileIndex to read from (default: the store of `source`,
+    if any)
+
+    Returns:
+    - data: band 1 of the cells as a 2D array; cells of tiles without
+    data hold the nodata value
+    - transform: affine transformation for data
+    - meta: dict with the "crs" (WKT), "nodata", "dtype" and "extent"
+    (bounds of the whole DEM)
+    """
+    if store is None:
+        store = open_store(source)
+    if store is None:
+        with rasterio.open(source) as src:
+            row_start, row_stop, col_start, col_stop = pixel_window(
+                src.transform, bounds, src.height, src.width)
+            window = rasterio.windows.Window(
+                col_start,
+                row_start,
+                col_stop - col_start,
+                row_stop - row_start
+                )
+            data = src.read(1, window=window)
+            transform = src.window_transform(window)
+            meta = {
+                "crs": src.crs.to_wkt() if src.crs else None,
+                "nodata": src.nodata,
+                "dtype": src.dtypes[0],
+                "extent": list(src.bounds),
+                }
+        return data, transform, meta
+    data, transform = tile_cache(store, DEM_TILE_CACHE_DIR).read(bounds)
+    meta = {
+        "crs": store.crs,
+        "nodata": store.nodata,
+        "dtype": store.dtype,
+        "extent": list(rasterio.transform.array_bounds(
+            store.height, store.width, store.transform)),
+        }
+    return data, transform, meta
+
+
 def interpolate_z_values(line_string, raster_data, raster_transform):
     """
     Interpolates z-values based on raster data for the coordinates in
@@ -129,7 +187,9 @@ def interpolate_z_values(line_string, raster_data, raster_transform):
     Parameters:
     - line_string: a shapely.geometry.LineString object containing
     x, y coordinates
-    - raster_data: a 2D numpy array representing the raster data
+    - raster_data: a 2D numpy array representing the raster data, or
+    the helpers.dem_store.TileCache of a DEM store (cells are then
+    looked up in the shared, memory-mapped tiles)
     - raster_transform: an affine transformation for the raster data
 
     Returns:
@@ -141,7 +201,10 @@ def interpolate_z_values(line_string, raster_data, raster_transform):
                                         line_points[:, 0],
                                         line_points[:, 1])
     try:
-        z_values = raster_data[row, col]
+        if isinstance(raster_data, TileCache):
+            z_values = raster_data.cells(row, col)
+        else:
+            z_values = raster_data[row, col]
     except IndexError:
         z_values = np.array([])
     return z_values
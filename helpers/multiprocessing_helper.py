@@ -23,8 +23,20 @@ Functions:
         Creates polygons from a coordinates file and transforms their
         CRS.
 
-    parcel_geom(filename, parcelid):
-        Fetches parcel geometry based on parcel id in parallel.
+    parcel_geom(filename, parcelid, log=None):
+        Fetches parcel geometry based on parcel id from the parcel
+        index (helpers.parcel_store).
+
+    thread_pool(name):
+        Shared, bounded thread pool of this process, one per name (e.g.
+        per worker module).
+
+    submit_thread(func, *args, pool):
+        Runs func on a shared thread pool and returns a future.
+
+    wait_results(futures, timeout=None):
+        Collects results, re-raising exceptions and failing with a
+        TimeoutError instead of blocking forever.
 
 Dependencies:
     multiprocessing, shapely, pyproj, geopandas, dotenv
@@ -33,20 +45,18 @@ Author:
     Your Name (your.email@example.com)
 
 """
-from multiprocessing import (
-    Pool,
-    Pipe,
-    Queue,
-    Process,
-    cpu_count
-    )
-import multiprocessing
+from multiprocessing import Pool
 import concurrent.futures
+import os
 from shapely.geometry import Polygon
 import pyproj
 import geopandas as gpd
 import threading
-from threading import Thread
+from helpers.parcel_store import open_index
+
+THREAD_POOL_SIZE = 4
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
 
 
 def split_into_chunks(lst, num_chunks, divisible_by=1):
@@ -154,42 +164,71 @@ def create_polygons_from_coordinates_file(file_path):
     return transformed_polygons
 
 
-def parcel_geom(filename, parcelid):
+def parcel_geom(filename, parcelid, log=None):
     """
-    Fetches parcel geometry based on parcel id in parallel.
+    Fetches parcel geometry based on parcel id. The lookup goes
+    through the PARCELID index of the shapefile, which is built on
+    first use, instead of reading and scanning the whole layer.
 
-    :param filename: Filename to read the geodataframe from
+    :param filename: Parcel shapefile
     :param parcelid: Parcel ID to be searched for
-    :return: List of resulting geodataframes containing the parcel
-    geometry
-    """
-    attribute_1 = 'PARCELID'
-    value_1 = parcelid
-    num_cores = cpu_count()
-    chunks = chunk_geodataframe(filename, num_cores)
-    result = parallel_geom_search(chunks,
-                                  attribute_1,
-                                  value_1,
-                                  num_cores
-                                  )
-    return result
+    :param log: Callable receiving the messages of an index build
+    :return: List holding one geodataframe with the parcel geometry,
+    empty when the parcel is unknown
+    """
+    gdf = open_index(filename, log=log).frame(parcelid)
+    return [gdf] if not gdf.empty else []
+
+
+def thread_pool(name="default"):
+    """
+    Returns the shared, bounded thread pool `name` of this process.
+
+    :param name: Pool name, e.g. the worker module using it.
+    :return: A concurrent.futures.ThreadPoolExecutor.
+    """
+    with _POOLS_LOCK:
+        # pools are not inherited by forked stage processes
+        if _POOLS.get("pid") != os.getpid():
+            _POOLS.clear()
+            _POOLS["pid"] = os.getpid()
+        pool = _POOLS.get(name)
+        if pool is None:
+            pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=THREAD_POOL_SIZE,
+                thread_name_prefix=f"{name}_thread"
+                )
+            _POOLS[name] = pool
+        return pool
+
+
+def submit_thread(func, *args, pool="default"):
+    """
+    Runs func(*args) on the shared thread pool `pool`.
+
+    :return: A concurrent.futures.Future; its result() re-raises any
+    exception raised by func.
+    """
+    return thread_pool(pool).submit(func, *args)
 
 
-def run_with_q_process(func, *args):
-	def q_wrapper(q, *args):
-		result = func(*args)
-		q.put(result)
-	q = Queue()
-	p = Process(target=q_wrapper, args=(q,) + args)
-	p.start()
-	return p, q
-
-
-def run_with_q_thread(func, *args):
-    def q_wrapper(q, *args):
-        result = func(*args)
-        q.put(result)
-    q = Queue()
-    t = Thread(target=q_wrapper, args=(q,) + args)
-    t.start()
-    return t, q
+def wait_results(futures, timeout=None):
+    """
+    Waits for futures and returns their results in order.
+
+    :param futures: List of futures from submit_thread.
+    :param timeout: Seconds to wait for all of them; None waits forever.
+    :return: List of results.
+    :raises concurrent.futures.TimeoutError: If they are not all done
+    in time; the futures that have not started are cancelled.
+    :raises Exception: The first exception raised by a future.
+    """
+    done, not_done = concurrent.futures.wait(futures, timeout=timeout)
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        raise concurrent.futures.TimeoutError(
+            f"{len(not_done)} of {len(futures)} tasks not done" \
+                + f" after {timeout}s"
+                )
+    return [future.result() for future in futures]
@@ -0,0 +1,258 @@
+"""
+This module keeps an indexed copy of a parcel shapefile so that the
+geometry of one parcel is fetched without reading the whole layer. The
+copy is a sqlite3 file next to the shapefile holding every parcel as
+WKB, with a B-tree index on PARCELID and an R*Tree over the parcel
+bounding boxes.
+
+Layout of an index file (by default `<source without extension>
+_index.sqlite3`, e.g. `./gis/subset_parcels20_index.sqlite3`):
+- parcels (fid, parcelid, wkb) with the index parcels_parcelid.
+- parcels_rtree (fid, minx, maxx, miny, maxy).
+- meta (key, value): source stamp and CRS of the layer.
+
+Usage (optional; the index is built on first lookup otherwise):
+    python -m helpers.parcel_store ./gis/subset_parcels20.shp \\
+        [--index FILE]
+
+Functions:
+- index_path(source):
+    Default index file of a parcel shapefile.
+
+- build_index(source, path=None, log=print):
+    Writes the index file of a parcel shapefile.
+
+- open_index(source, path=None, build=True, log=None):
+    Returns the ParcelIndex of `source`, building it when it is missing
+    or older than the shapefile.
+
+- lookup_parcel(parcelid, source):
+    Geometry of one parcel.
+
+Classes:
+- ParcelIndex: lookups by PARCELID and by bounding box.
+
+Note:
+- PARCELID values are compared as text.
+- An index records the size and modification time of its source and
+  is rebuilt once the source changes. It is written to a temporary file
+  and renamed, so concurrent projects never read a partial index.
+- Connections are opened read-only and per process; forked stages open
+  their own.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import geopandas as gpd
+from shapely import wkb
+
+PARCELID = "PARCELID"
+
+_SCHEMA = """
+CREATE TABLE parcels (
+    fid INTEGER PRIMARY KEY,
+    parcelid TEXT NOT NULL,
+    wkb BLOB NOT NULL
+);
+CREATE INDEX parcels_parcelid ON parcels (parcelid);
+CREATE VIRTUAL TABLE parcels_rtree USING rtree(fid, minx, maxx, miny, maxy);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# index file -> ParcelIndex
+_indexes = {}
+
+
+def index_path(source):
+    """
+    :param source: Path of the parcel shapefile.
+    :return: The default index file of `source`.
+    """
+    return f"{os.path.splitext(str(source))[0]}_index.sqlite3"
+
+
+def _no_log(message):
+    pass
+
+
+def _source_stamp(source):
+    stat = os.stat(str(source))
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_index(source, path=None, log=print):
+    """
+    Writes the index file of a parcel shapefile.
+
+    :param source: Path of the parcel shapefile (with a PARCELID
+    column).
+    :param path: Index file; defaults to index_path(source).
+    :param log: Callable receiving progress messages.
+    :return: Path of the index file.
+    """
+    path = str(path or index_path(source))
+    started = time.time()
+    stamp = _source_stamp(source)
+    gdf = gpd.read_file(source)
+    partial = f"{path}.partial.{os.getpid()}"
+    if os.path.exists(partial):
+        os.remove(partial)
+    conn = sqlite3.connect(partial)
+    try:
+        conn.executescript(_SCHEMA)
+        rows, boxes = [], []
+        for fid, (parcelid, geom) in enumerate(
+            zip(gdf[PARCELID], gdf.geometry)):
+            if geom is None or geom.is_empty:
+                continue
+            minx, miny, maxx, maxy = geom.bounds
+            rows.append((fid, str(parcelid), wkb.dumps(geom)))
+            boxes.append((fid, minx, maxx, miny, maxy))
+        conn.executemany("INSERT INTO parcels VALUES (?, ?, ?);", rows)
+        conn.executemany(
+            "INSERT INTO parcels_rtree VALUES (?, ?, ?, ?, ?);", boxes)
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?);",
+            (
+                ("source_stamp", json.dumps(stamp)),
+                ("crs", gdf.crs.to_wkt() if gdf.crs else ""),
+                )
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(partial, path)
+    log(
+        f"parcel index: {len(rows)} parcels of {source} in" \
+            + f" {time.time() - started:.1f}s"
+            )
+    return path
+
+
+class ParcelIndex:
+    """
+    Read-only view of an index file.
+
+    Parameters:
+    - path: the index file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.mtime = os.stat(self.path).st_mtime_ns
+        self._conn = None
+        self._pid = None
+        meta = dict(self._connect().execute("SELECT key, value FROM meta;"))
+        self.source_stamp = json.loads(meta["source_stamp"])
+        self.crs = meta["crs"] or None
+
+    def _connect(self):
+        # sqlite connections must not cross a fork
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                f"file:{os.path.abspath(self.path)}?mode=ro",
+                uri=True,
+                check_same_thread=False
+                )
+            self._pid = os.getpid()
+        return self._conn
+
+    def geometries(self, parcelid):
+        """
+        :param parcelid: PARCELID of the parcel.
+        :return: List of the geometries recorded under `parcelid`, in
+        the order of the shapefile.
+        """
+        rows = self._connect().execute(
+            "SELECT wkb FROM parcels WHERE parcelid = ? ORDER BY fid;",
+            (str(parcelid),)
+            ).fetchall()
+        return [wkb.loads(row[0]) for row in rows]
+
+    def frame(self, parcelid):
+        """
+        :return: GeoDataFrame with the PARCELID and geometry of the
+        parcel (empty when it is unknown).
+        """
+        geoms = self.geometries(parcelid)
+        return gpd.GeoDataFrame(
+            {PARCELID: [str(parcelid)] * len(geoms)},
+            geometry=geoms,
+            crs=self.crs
+            )
+
+    def within(self, bounds):
+        """
+        :param bounds: (minx, miny, maxx, maxy).
+        :return: List of (parcelid, geometry) of the parcels whose
+        bounding box intersects `bounds`.
+        """
+        minx, miny, maxx, maxy = bounds
+        rows = self._connect().execute(
+            "SELECT p.parcelid, p.wkb FROM parcels_rtree r" \
+                + " JOIN parcels p ON p.fid = r.fid" \
+                + " WHERE r.minx <= ? AND r.maxx >= ?" \
+                + " AND r.miny <= ? AND r.maxy >= ? ORDER BY p.fid;",
+            (maxx, minx, maxy, miny)
+            ).fetchall()
+        return [(parcelid, wkb.loads(blob)) for parcelid, blob in rows]
+
+
+def open_index(source, path=None, build=True, log=None):
+    """
+    :param source: Path of the parcel shapefile.
+    :param path: Index file; defaults to index_path(source).
+    :param build: Build the index when it is missing or stale.
+    :param log: Callable receiving the messages of a build, e.g. the
+    debug method of a stage logger; None to build silently.
+    :return: The ParcelIndex of `source`, shared within this process,
+    or None when there is no up-to-date index and `build` is False.
+    """
+    path = str(path or index_path(source))
+    try:
+        stamp = _source_stamp(source)
+    except OSError:
+        # the index is a complete copy of the parcels
+        stamp = None
+    index = _indexes.get(path)
+    try:
+        if index is None or index.mtime != os.stat(path).st_mtime_ns:
+            index = ParcelIndex(path)
+    except (OSError, sqlite3.Error, KeyError):
+        index = None
+    if index is None or (stamp is not None and index.source_stamp != stamp):
+        if not build:
+            return None
+        index = ParcelIndex(
+            build_index(source, path, log=log or _no_log))
+    _indexes[path] = index
+    return index
+
+
+def lookup_parcel(parcelid, source):
+    """
+    :param parcelid: PARCELID of the parcel.
+    :param source: Path of the parcel shapefile.
+    :return: The shapely geometry of the parcel, or None when it is
+    unknown.
+    """
+    geoms = open_index(source).geometries(parcelid)
+    return geoms[0] if geoms else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the PARCELID index of a parcel shapefile")
+    parser.add_argument("source", help="parcel shapefile, e.g. parcels20.shp")
+    parser.add_argument("--index", help="index file" \
+        + " (default: <source without extension>_index.sqlite3)")
+    args = parser.parse_args(argv)
+    build_index(args.source, args.index)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+This module samples ground profiles along lines (the HEC-RAS line, the
+center line) from the project's DEM. Station coordinates are computed
+with NumPy from the line's vertices and the DEM is interpolated at
+them, instead of calling `line.interpolate` once per foot and looking
+up the nearest cell.
+
+Functions:
+- stations(line, spacing=1.0):
+    Stations along a line and their x/y coordinates.
+
+- sample_grid(data, transform, xs, ys, nodata=None, method="bilinear"):
+    Interpolates a north-up grid at arbitrary points.
+
+- sample_profile(dem, line, spacing=1.0, method="bilinear", fill=True):
+    The (n, 4) station/x/y/z profile of a line on a DemWindow.
+
+- sample_profiles(dem, lines, spacing=1.0, method="bilinear",
+  fill=True):
+    sample_profile for many lines, from one read of the DEM.
+
+- arc_length(coords):
+    Cumulative distance along a sequence of points.
+
+- resample_profile(profile, count=None, spacing=None, method="spline",
+  window=11, polyorder=3, nodata=None, out=None):
+    Smooths and resamples the columns of a profile against its
+    stations.
+
+Note:
+- Cells holding the nodata value are left out of the interpolation;
+  points without any valid neighbouring cell get NaN, which
+  `sample_profile` fills from the neighbouring stations by default.
+"""
+import numpy as np
+from scipy import ndimage, signal
+from scipy.interpolate import CubicSpline
+
+METHODS = ("nearest", "bilinear", "bicubic")
+RESAMPLE_METHODS = ("spline", "linear", "savgol")
+
+
+def stations(line, spacing=1.0):
+    """
+    :param line: shapely LineString (a z coordinate is ignored).
+    :param spacing: Distance between stations in feet.
+    :return: (distance, x, y) arrays for stations every `spacing` feet
+    from the start of the line, plus one at its end.
+    """
+    coords = np.asarray(line.coords)[:, :2]
+    along = arc_length(coords)
+    steps = np.diff(along)
+    length = along[-1]
+    distance = np.arange(0.0, length, spacing)
+    if distance.size == 0 or distance[-1] < length:
+        distance = np.append(distance, length)
+    # repeated vertices would make `along` non-increasing
+    keep = np.concatenate([[True], steps > 0])
+    xs = np.interp(distance, along[keep], coords[keep, 0])
+    ys = np.interp(distance, along[keep], coords[keep, 1])
+    return distance, xs, ys
+
+
+def _bilinear(data, valid, rows, cols):
+    """
+    Bilinear interpolation at fractional cell positions measured from
+    cell centers, with nodata cells weighted out.
+    """
+    height, width = data.shape
+    row0 = np.clip(np.floor(rows).astype(np.int64), 0, height - 1)
+    col0 = np.clip(np.floor(cols).astype(np.int64), 0, width - 1)
+    row1 = np.minimum(row0 + 1, height - 1)
+    col1 = np.minimum(col0 + 1, width - 1)
+    dr = np.clip(rows - row0, 0.0, 1.0)
+    dc = np.clip(cols - col0, 0.0, 1.0)
+    total = np.zeros(rows.shape)
+    weights = np.zeros(rows.shape)
+    for r, c, w in (
+        (row0, col0, (1 - dr) * (1 - dc)),
+        (row0, col1, (1 - dr) * dc),
+        (row1, col0, dr * (1 - dc)),
+        (row1, col1, dr * dc),
+        ):
+        w = np.where(valid[r, c], w, 0.0)
+        total += w * np.where(valid[r, c], data[r, c], 0.0)
+        weights += w
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = total / weights
+    values[weights == 0] = np.nan
+    return values
+
+
+def sample_grid(data, transform, xs, ys, nodata=None, method="bilinear"):
+    """
+    Interpolates a north-up grid at points.
+
+    :param data: 2D array of cell values.
+    :param transform: Affine transform of `data`.
+    :param xs, ys: Coordinates of the points.
+    :param nodata: Value marking cells without data (NaN cells are
+    always treated as nodata).
+    :param method: "nearest" (the cell containing the point, as
+    misc_helper.interpolate_z_values), "bilinear" or "bicubic".
+    :return: Array of values, NaN where no valid cell is near.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    data = np.asarray(data, dtype=np.float64)
+    valid = ~np.isnan(data)
+    if nodata is not None:
+        valid &= data != nodata
+    inverse = ~transform
+    cols, rows = inverse * (np.asarray(xs, float), np.asarray(ys, float))
+    if method == "nearest":
+        row = np.clip(np.floor(rows).astype(np.int64), 0, data.shape[0] - 1)
+        col = np.clip(np.floor(cols).astype(np.int64), 0, data.shape[1] - 1)
+        return np.where(valid[row, col], data[row, col], np.nan)
+    # fractional positions measured from cell centers
+    rows = rows - 0.5
+    cols = cols - 0.5
+    values = _bilinear(data, valid, rows, cols)
+    if method == "bicubic":
+        filled = np.where(
+            valid, data, data[valid].mean() if valid.any() else 0.0)
+        cubic = ndimage.map_coordinates(
+            filled, [rows, cols], order=3, mode="nearest")
+        # keep bicubic values only where the kernel support (4x4 cells
+        # around the point, 5x5 around its nearest cell) is all valid
+        clean = ndimage.minimum_filter(
+            valid.astype(np.uint8), size=5, mode="nearest")
+        support = ndimage.map_coordinates(
+            clean, [np.round(rows), np.round(cols)], order=0, mode="nearest")
+        values = np.where(support > 0, cubic, values)
+    return values
+
+
+def _fill_gaps(distance, z):
+    gaps = np.isnan(z)
+    if gaps.any() and not gaps.all():
+        z = z.copy()
+        z[gaps] = np.interp(distance[gaps], distance[~gaps], z[~gaps])
+    return z
+
+
+def sample_profile(dem, line, spacing=1.0, method="bilinear", fill=True):
+    """
+    Samples the ground profile of a line.
+
+    :param dem: helpers.dem_window.DemWindow of the project.
+    :param line: shapely LineString.
+    :param spacing: Distance between stations in feet.
+    :param method: Interpolation, see `sample_grid`.
+    :param fill: Replace NaN elevations (nodata) by linear
+    interpolation between the nearest valid stations.
+    :return: (n, 4) array of station, x, y, z.
+    """
+    distance, xs, ys = stations(line, spacing)
+    if dem.resolution is None:
+        dem.ensure(line.bounds)
+    # a few cells around the line for the interpolation kernels
+    margin = 3 * dem.resolution
+    minx, miny, maxx, maxy = line.bounds
+    data, transform = dem.read(
+        (minx - margin, miny - margin, maxx + margin, maxy + margin))
+    z = sample_grid(data, transform, xs, ys, dem.nodata, method)
+    if fill:
+        z = _fill_gaps(distance, z)
+    return np.column_stack([distance, xs, ys, z])
+
+
+def sample_profiles(dem, lines, spacing=1.0, method="bilinear", fill=True):
+    """
+    Samples the ground profiles of many lines from a single read of the
+    DEM covering all of them (e.g. the cross sections of neighbouring
+    parcels). The read spans the joint bounding box of the lines, so
+    they should lie on the same reach.
+
+    :param lines: Sequence of shapely LineStrings.
+    :return: List of (n, 4) arrays of station, x, y, z, aligned with
+    `lines`; see `sample_profile`.
+    """
+    if len(lines) == 0:
+        return []
+    sampled = [stations(line, spacing) for line in lines]
+    bounds = np.array([line.bounds for line in lines])
+    minx, miny = bounds[:, :2].min(axis=0)
+    maxx, maxy = bounds[:, 2:].max(axis=0)
+    if dem.resolution is None:
+        dem.ensure((minx, miny, maxx, maxy))
+    margin = 3 * dem.resolution
+    data, transform = dem.read(
+        (minx - margin, miny - margin, maxx + margin, maxy + margin))
+    z = sample_grid(
+        data,
+        transform,
+        np.concatenate([xs for _, xs, _ in sampled]),
+        np.concatenate([ys for _, _, ys in sampled]),
+        dem.nodata,
+        method
+        )
+    profiles = []
+    start = 0
+    for distance, xs, ys in sampled:
+        line_z = z[start:start + len(distance)]
+        start += len(distance)
+        if fill:
+            line_z = _fill_gaps(distance, line_z)
+        profiles.append(np.column_stack([distance, xs, ys, line_z]))
+    return profiles
+
+
+def arc_length(coords):
+    """
+    :param coords: (n, 2) or (n, 3) array of points; only x and y are
+    measured.
+    :return: Array of the distance from the first point to each point
+    along the polyline.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    steps = np.hypot(*np.diff(coords[:, :2], axis=0).T)
+    return np.concatenate([[0.0], np.cumsum(steps)])
+
+
+def resample_profile(
+    profile,
+    count=None,
+    spacing=None,
+    method="spline",
+    window=11,
+    polyorder=3,
+    nodata=None,
+    out=None
+    ):
+    """
+    Smooths and resamples a profile. Every column is fitted against the
+    first one, the station (distance along the line, as sampled by
+    `sample_profile`), so the result does not depend on how densely the
+    line was sampled.
+
+    :param profile: (n, k) array: station, then k - 1 value columns
+    (e.g. station, y, z). Use arc_length to build the station column of
+    bare coordinates.
+    :param count: Number of output stations, evenly spaced from the
+    first station to the last.
+    :param spacing: Distance between output stations, plus one at the
+    last station; used when `count` is None.
+    :param method: "spline" (cubic spline through the points),
+    "linear" (straight segments) or "savgol" (Savitzky-Golay filter of
+    `window` points and order `polyorder`, then linear).
+    :param nodata: Value marking missing values; rows with a missing
+    value (or NaN) are left out of the fit.
+    :param out: (m, k) array receiving the result, e.g. a view into a
+    larger array; allocated when None.
+    :return: (m, k) array of the output stations and the resampled
+    columns.
+    :raises ValueError: on an unknown method, or with fewer than two
+    valid rows.
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"method must be one of {RESAMPLE_METHODS}")
+    profile = np.asarray(profile, dtype=np.float64)
+    valid = ~np.isnan(profile).any(axis=1)
+    if nodata is not None:
+        valid &= ~(profile[:, 1:] == nodata).any(axis=1)
+    if not valid.all():
+        profile = profile[valid]
+    if len(profile) < 2:
+        raise ValueError("a profile needs at least two valid rows")
+    t = profile[:, 0]
+    values = profile[:, 1:]
+    if count is not None:
+        t2 = np.linspace(t[0], t[-1], count)
+    elif spacing is not None:
+        t2 = np.arange(t[0], t[-1], spacing)
+        if t2[-1] < t[-1]:
+            t2 = np.append(t2, t[-1])
+    else:
+        t2 = t
+    if out is None:
+        out = np.empty((len(t2), profile.shape[1]))
+    out[:, 0] = t2
+    if method == "spline":
+        out[:, 1:] = CubicSpline(t, values, axis=0)(t2)
+        return out
+    if method == "savgol":
+        # the window must be odd and hold at most every point
+        length = min(window, len(t))
+        length -= 1 - length % 2
+        if length > polyorder:
+            values = signal.savgol_filter(values, length, polyorder, axis=0)
+    for column in range(values.shape[1]):
+        out[:, column + 1] = np.interp(t2, t, values[:, column])
+    return out
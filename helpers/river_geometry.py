@@ -0,0 +1,261 @@
+"""
+This module computes the HEC-RAS cross section of a parcel in process
+with Shapely, from the reference layers of ./gis, instead of a chain of
+PostGIS queries each uploading its intermediate result as a table. It
+mirrors the queries of `geometry.hecras` step by step (ST_ShortestLine,
+ST_ClosestPoint, ST_Translate, ST_Intersection, ST_Length); the PostGIS
+path is kept there as the
+"postgis" backend (config.GEOMETRY_BACKEND) to validate against.
+
+Functions:
+- reference():
+    The reference layers and the indexes built on them, once per
+    process.
+
+- cross_section(parcel, layers=None):
+    The HEC-RAS line of a parcel and its intersections with the bank
+    lines and the river centerline.
+
+- cross_sections(parcels, layers=None, log=print):
+    cross_section for many parcels, the lines built in one vectorized
+    pass.
+
+- closest_to(geometry, point):
+    The part of an intersection result closest to a point.
+
+Classes:
+- RiverLayers: the reference layers as shapely geometries.
+- HxSection: result of cross_section.
+
+Note:
+- The PostGIS tables wfldwy_pt and efldwy_pt hold the vertices of the
+  floodway lines; they are derived here from wfldwy_l and efldwy_l.
+- Layers with several features are merged into one geometry, where the
+  queries used the first row returned.
+- The river station of a line, and whether it lies between two cross
+  sections, comes from helpers.river_stations.
+"""
+from collections import namedtuple
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point
+from dirs_configs.input_vars import (
+    EB_LINE,
+    EFLDWY,
+    SUW,
+    WB_LINE,
+    WFLDWY
+    )
+from helpers.layers import load_layer
+
+RiverLayers = namedtuple(
+    "RiverLayers",
+    [
+        "efldwy",
+        "wfldwy",
+        "efldwy_pts",
+        "wfldwy_pts",
+        "eb_line",
+        "wb_line",
+        "cut_fids",
+        "cut_tree",
+        ]
+    )
+
+HxSection = namedtuple(
+    "HxSection",
+    [
+        "hx_line",
+        "efldwy_pt",
+        "eb_pt",
+        "wb_pt",
+        "river_section_fid",
+        "hx_length",
+        ]
+    )
+
+_reference = {}
+
+
+def _merged(gdf):
+    geoms = [geom for geom in gdf.geometry if geom is not None]
+    if len(geoms) == 1:
+        return geoms[0]
+    return shapely.line_merge(shapely.union_all(geoms))
+
+
+def _vertices(line):
+    """
+    :return: STRtree and array of the vertices of a (multi)line.
+    """
+    points = shapely.points(shapely.get_coordinates(line))
+    return STRtree(points), points
+
+
+def reference():
+    """
+    :return: RiverLayers of the reference layers, loaded and indexed
+    once per process.
+    """
+    layers = _reference.get("layers")
+    if layers is None:
+        efldwy = _merged(load_layer(EFLDWY))
+        wfldwy = _merged(load_layer(WFLDWY))
+        cuts = load_layer(SUW)
+        layers = RiverLayers(
+            efldwy=efldwy,
+            wfldwy=wfldwy,
+            efldwy_pts=_vertices(efldwy),
+            wfldwy_pts=_vertices(wfldwy),
+            eb_line=_merged(load_layer(EB_LINE)),
+            wb_line=_merged(load_layer(WB_LINE)),
+            cut_fids=list(cuts["fid"]),
+            cut_tree=STRtree(
+                np.array(list(cuts.geometry), dtype=object)),
+            )
+        _reference["layers"] = layers
+    return layers
+
+
+def closest_to(geometry, point):
+    """
+    :param geometry: Result of an intersection (Point, MultiPoint or a
+    collection).
+    :param point: shapely Point.
+    :return: The Point of `geometry` closest to `point`, or None.
+    """
+    if isinstance(geometry, Point):
+        return geometry
+    points = [
+        geom for geom in getattr(geometry, "geoms", ())
+        if isinstance(geom, Point)
+        ]
+    if not points:
+        return None
+    return min(points, key=lambda p: p.distance(point))
+
+
+def _nearest_vertices(vertices, points):
+    tree, vertex_points = vertices
+    found = tree.query_nearest(points, all_matches=False)
+    nearest = np.empty(len(points), dtype=object)
+    nearest[found[0]] = vertex_points[found[1]]
+    return nearest
+
+
+def _points_on(lines, others):
+    """
+    :return: The point of each of `lines` nearest to `others`
+    (nearest_points(line, other)[0]), element-wise.
+    """
+    return shapely.get_point(shapely.shortest_line(lines, others), 0)
+
+
+def _hx_lines(layers, centroids):
+    """
+    Builds the HEC-RAS lines through an array of parcel centroids at
+    once.
+
+    :return: (array of HEC-RAS lines, array of their east ends).
+    """
+    centroid_xy = shapely.get_coordinates(centroids)
+    # floodway vertices nearest to the centroids
+    west_lines = shapely.linestrings(np.stack([
+        centroid_xy,
+        shapely.get_coordinates(
+            _nearest_vertices(layers.wfldwy_pts, centroids))
+        ], axis=1))
+    east_lines = shapely.linestrings(np.stack([
+        centroid_xy,
+        shapely.get_coordinates(
+            _nearest_vertices(layers.efldwy_pts, centroids))
+        ], axis=1))
+    east_pts = _points_on(east_lines, layers.efldwy)
+    west_pts = _points_on(west_lines, layers.wfldwy)
+    hline_1 = np.stack([
+        shapely.get_coordinates(east_pts),
+        shapely.get_coordinates(west_pts)
+        ], axis=1)
+    # move the lines so that they pass through the centroids
+    on_line = shapely.get_coordinates(
+        _points_on(shapely.linestrings(hline_1), centroids))
+    hline_2 = shapely.linestrings(
+        hline_1 + (centroid_xy - on_line)[:, np.newaxis, :])
+    east_pts = _points_on(layers.efldwy, hline_2)
+    west_pts = _points_on(layers.wfldwy, hline_2)
+    hx_lines = shapely.linestrings(np.stack([
+        shapely.get_coordinates(west_pts),
+        shapely.get_coordinates(east_pts)
+        ], axis=1))
+    return hx_lines, east_pts
+
+
+def _section(layers, hx_line, east_pt, centroid):
+    """
+    The bank points and the river section crossed by a HEC-RAS line.
+
+    :return: HxSection.
+    :raises ValueError: see cross_section.
+    """
+    eb_pt = closest_to(hx_line.intersection(layers.eb_line), centroid)
+    wb_pt = closest_to(hx_line.intersection(layers.wb_line), centroid)
+    if eb_pt is None or wb_pt is None:
+        raise ValueError("hecras line does not cross both bank lines")
+    crossed = layers.cut_tree.query(hx_line, predicate="intersects")
+    if len(crossed) == 0:
+        raise ValueError("hecras line does not cross the river")
+    index = int(np.min(crossed))
+    return HxSection(
+        hx_line=hx_line,
+        efldwy_pt=np.asarray([east_pt.x, east_pt.y]),
+        eb_pt=np.asarray([eb_pt.x, eb_pt.y]),
+        wb_pt=np.asarray([wb_pt.x, wb_pt.y]),
+        river_section_fid=layers.cut_fids[index],
+        hx_length=hx_line.length,
+        )
+
+
+def cross_section(parcel, layers=None):
+    """
+    Builds the HEC-RAS line of a parcel: the line between the floodway
+    lines, parallel to the one joining the floodway points nearest to
+    the parcel centroid, moved onto the centroid.
+
+    :param parcel: shapely Polygon of the parcel.
+    :param layers: RiverLayers; defaults to reference().
+    :return: HxSection.
+    :raises ValueError: when the line does not cross a bank line or the
+    river centerline.
+    """
+    layers = layers or reference()
+    centroids = shapely.centroid(np.array([parcel], dtype=object))
+    hx_lines, east_pts = _hx_lines(layers, centroids)
+    return _section(layers, hx_lines[0], east_pts[0], centroids[0])
+
+
+def cross_sections(parcels, layers=None, log=print):
+    """
+    Builds the HEC-RAS lines of many parcels in one pass; the line
+    construction runs vectorized over all the parcels.
+
+    :param parcels: Sequence of shapely Polygons.
+    :param layers: RiverLayers; defaults to reference().
+    :param log: Callable receiving a message per parcel that failed.
+    :return: List of HxSection, aligned with `parcels`; None for a
+    parcel whose line does not cross the banks or the river.
+    """
+    layers = layers or reference()
+    if len(parcels) == 0:
+        return []
+    centroids = shapely.centroid(np.array(list(parcels), dtype=object))
+    hx_lines, east_pts = _hx_lines(layers, centroids)
+    sections = []
+    for i, (hx_line, east_pt, centroid) in enumerate(
+        zip(hx_lines, east_pts, centroids)):
+        try:
+            sections.append(_section(layers, hx_line, east_pt, centroid))
+        except ValueError as e:
+            log(f"cross section of parcel {i}: {e}")
+            sections.append(None)
+    return sections
@@ -0,0 +1,188 @@
+"""
+This module answers "which river mile, between which cross sections"
+for a point or a line crossing the Suwannee, from an index built once
+per process over the river centerline: the measure (distance along the
+centerline) of every cross section with its station, and an STRtree
+over the centerline segments. It replaces the PostGIS lookups of
+`hecras_calc` and `center_line` (suw_cut, suw_xs_pt, ST_LineLocatePoint)
+and the gauge if-chain of `water_level`.
+
+Functions:
+- station_index():
+    The StationIndex of the reference layers, built once per process.
+
+- gauge_bracket(mile):
+    The water-level gauges bracketing a river mile.
+
+Classes:
+- StationIndex: linear referencing of the centerline by river station.
+- RiverStation: result of StationIndex.locate.
+
+Note:
+- The centerline is suw_cut merged into one line (suw_cl_l_merged in
+  PostGIS); a cross section is placed at the measure where it crosses
+  it.
+- Miles are interpolated linearly in measure between the two bracketing
+  cross sections.
+"""
+from collections import namedtuple
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point
+from dirs_configs.input_vars import SUW, SUW_XS
+from helpers.layers import load_layer
+from helpers.river_geometry import closest_to
+
+# feet between a point and a centerline segment for the point to lie on
+# it
+XS_TOLERANCE = 0.01
+
+GAUGE_URL = "http://www.mysuwanneeriver.org/realtime/river-30-day.php?id={}"
+# (upper mile, lower mile, upstream gauge, downstream gauge), upstream
+# first
+GAUGES = (
+    (221, 196, "02314500", "02315000"),
+    (196, 171, "02315000", "02315500"),
+    (171, 150, "02315500", "02315550"),
+    (150, 135, "02315550", "02315650"),
+    (135, 127, "02315650", "02319500"),
+    (127, 113, "02319500", "02319800"),
+    (113, 103, "02319800", "02320000"),
+    (103, 98, "02320000", "02320000"),
+    (98, 76, "02320000", "02320500"),
+    (76, 57, "02320500", "02323000"),
+    (57, 43, "02323000", "02323150"),
+    (43, 34, "02323150", "02323500"),
+    (34, 25, "02323500", "02323567"),
+    (25, 17, "02323567", "02323590"),
+    (17, 9, "02323590", "02323592"),
+    )
+
+RiverStation = namedtuple(
+    "RiverStation",
+    [
+        "mile",
+        "upper_xs",
+        "lower_xs",
+        "section_fid",
+        "ratio",
+        "measure",
+        ]
+    )
+
+_index = {}
+
+
+class StationIndex:
+    """
+    Linear referencing of the river centerline by cross-section station.
+
+    Parameters:
+    - cut_fids: fid of each centerline segment (suw_cut).
+    - cuts: the centerline segments.
+    - xs_stations: river station of each cross section (suw_xs).
+    - xs_lines: the cross sections.
+    """
+
+    def __init__(self, cut_fids, cuts, xs_stations, xs_lines):
+        self.cut_fids = list(cut_fids)
+        self.cuts = np.array(list(cuts), dtype=object)
+        self.cut_tree = STRtree(self.cuts)
+        self.centerline = shapely.line_merge(shapely.union_all(self.cuts))
+        placed = []
+        for station, line in zip(xs_stations, xs_lines):
+            crossing = closest_to(
+                line.intersection(self.centerline), line.centroid)
+            if crossing is not None:
+                placed.append(
+                    (self.centerline.project(crossing), float(station)))
+        placed.sort()
+        self.measures = np.array([measure for measure, _ in placed])
+        self.stations = np.array([station for _, station in placed])
+
+    def measure(self, point):
+        """
+        :return: Distance along the centerline of the point of the
+        centerline nearest to `point`.
+        """
+        return self.centerline.project(point)
+
+    def mile(self, measure):
+        """
+        :return: River mile at `measure`, interpolated between the cross
+        sections.
+        """
+        return float(np.interp(measure, self.measures, self.stations))
+
+    def locate(self, geometry, near=None):
+        """
+        :param geometry: shapely Point on the centerline, or a line
+        crossing it.
+        :param near: Point picking the crossing when a line crosses the
+        centerline more than once; defaults to the line's centroid.
+        :return: RiverStation of the point or crossing.
+        :raises ValueError: when a line does not cross the centerline or
+        the point is not between two cross sections.
+        """
+        if isinstance(geometry, Point):
+            point = geometry
+        else:
+            point = closest_to(
+                geometry.intersection(self.centerline),
+                near or geometry.centroid)
+            if point is None:
+                raise ValueError("line does not cross the river centerline")
+        measure = self.measure(point)
+        after = int(np.searchsorted(self.measures, measure, side="right"))
+        if after == 0 or after == len(self.measures):
+            raise ValueError(
+                f"measure {measure:.1f} is not between two cross sections")
+        pair = self.stations[after - 1:after + 1]
+        found = self.cut_tree.query(
+            point, predicate="dwithin", distance=XS_TOLERANCE)
+        if len(found):
+            index = int(np.min(found))
+        else:
+            index = int(self.cut_tree.nearest(point))
+        cut = shapely.line_merge(self.cuts[index])
+        return RiverStation(
+            mile=self.mile(measure),
+            upper_xs=float(pair.max()),
+            lower_xs=float(pair.min()),
+            section_fid=self.cut_fids[index],
+            ratio=cut.line_locate_point(point, normalized=True),
+            measure=measure,
+            )
+
+
+def station_index():
+    """
+    :return: The StationIndex of SUW and SUW_XS, built once per process.
+    """
+    index = _index.get("index")
+    if index is None:
+        cuts = load_layer(SUW)
+        xs = load_layer(SUW_XS)
+        index = StationIndex(
+            cuts["fid"], cuts.geometry, xs["stream_stn"], xs.geometry)
+        _index["index"] = index
+    return index
+
+
+def gauge_bracket(mile):
+    """
+    :param mile: River mile, e.g. the one of a parcel's center line.
+    :return: (upper mile, lower mile, upstream gauge url, downstream
+    gauge url) of the gauges bracketing `mile`, or None outside the
+    gauged reach. A mile on a gauge belongs to the reach below it.
+    """
+    for upper, lower, upstream, downstream in reversed(GAUGES):
+        if upper >= float(mile) >= lower:
+            return (
+                upper,
+                lower,
+                GAUGE_URL.format(upstream),
+                GAUGE_URL.format(downstream),
+                )
+    return None
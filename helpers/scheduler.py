@@ -0,0 +1,493 @@
+"""
+This module provides a dependency-graph scheduler for the pipeline
+stages. Each stage declares the named values it consumes and produces
+and the resource class it needs. The scheduler launches every stage as
+soon as all of its inputs are available, runs "cpu" stages on a
+process pool and "io" stages (browser, network, database) on a thread
+pool, and reports the critical path once the graph has drained.
+
+Functions:
+- Stage(name, func, inputs, outputs, resource, requires=(),
+  timeout=None):
+    Declarative description of one pipeline stage. `func` is called
+    with the values named in `inputs` (in order) and its return value
+    is bound to the names in `outputs`. `requires` lists values that
+    must exist before the stage starts but are not passed to `func`.
+    A stage still running `timeout` seconds after it started (not after
+    it was submitted, so time queued behind busy workers does not count)
+    is abandoned and recorded as "timeout".
+
+- validate_stages(stages, initial):
+    Checks that every stage input is produced exactly once.
+
+- run_stages(stages, initial, logger, max_cpu=None, max_io=None,
+  initializer=None, initargs=(), checkpoint=None):
+    Runs the stage graph and returns the produced values and a timing
+    record per stage. With a `helpers.checkpoint.Checkpoint`, stages
+    with a valid checkpoint are not run again.
+
+- critical_path(stages, records):
+    Walks back from the last stage to finish through the inputs each
+    stage waited on longest.
+
+- format_report(stages, records):
+    Formats the per-stage timings and the critical path for logging.
+
+- failed_stages(records):
+    Returns the error of every stage that raised or timed out.
+
+Note:
+- The process pool uses the "fork" start method so that stage
+  processes share the project directories chosen at import time by
+  `dirs_configs.config` and the logger handlers configured by main.
+  Its workers are forked when the pool is created, before any io stage
+  thread runs; a pool replaced after a stage killed its process is
+  only forked again once no io stage is running.
+- Every cpu stage receives the artifacts (helpers.artifacts) held by
+  main when it is submitted; the artifacts it produces are merged back
+  into main and saved with its checkpoint.
+"""
+import os
+import threading
+import time
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+    )
+from concurrent.futures.process import BrokenProcessPool
+from helpers import artifacts, tracing
+
+# seconds between checks for started stages while a stage with a
+# timeout is queued
+START_POLL = 1.0
+
+CPU = "cpu"
+IO = "io"
+
+Stage = namedtuple(
+    "Stage",
+    ["name", "func", "inputs", "outputs", "resource", "requires", "timeout"],
+    defaults=((), None)
+    )
+
+# queue of (stage name, start time) written by every stage as it starts,
+# read by run_stages to start the clock of stage timeouts; created by
+# run_stages and inherited by the forked stage processes
+_started = None
+
+
+def _call_stage(name, func, args, shared=None):
+    """
+    Runs a stage function inside a trace span and returns its result
+    together with the wall-clock start/end time, the pid and thread it
+    ran in and the artifacts it produced.
+
+    :param shared: Artifacts of main, for stages run in a stage process.
+    """
+    artifacts.load(shared)
+    started = time.time()
+    if _started is not None:
+        _started.put((name, started))
+    with tracing.span(name):
+        result = func(*args)
+    finished = time.time()
+    return result, started, finished, os.getpid(), \
+        threading.get_native_id(), artifacts.drain()
+
+
+def _bind_outputs(stage, result):
+    """
+    Maps a stage's return value onto its declared output names.
+
+    :param stage: The Stage that produced the result.
+    :param result: The value returned by the stage function.
+    :return: A dict of output name to value.
+    """
+    if not stage.outputs:
+        return {}
+    if len(stage.outputs) == 1:
+        return {stage.outputs[0]: result}
+    if result is None or len(result) != len(stage.outputs):
+        raise ValueError(
+            f"{stage.name}: expected {len(stage.outputs)} outputs," \
+                + f" got {result!r}"
+                )
+    return dict(zip(stage.outputs, result))
+
+
+def validate_stages(stages, initial):
+    """
+    Checks a stage graph before it is run.
+
+    :param stages: List of Stage objects.
+    :param initial: Dict of values available before any stage runs.
+    :return: Dict mapping each produced value name to its stage name.
+    :raises ValueError: If a value is produced twice, a stage name is
+    repeated, a stage has an unknown resource class, or an input is
+    never produced.
+    """
+    producers = {}
+    names = set()
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"duplicate stage name: {stage.name}")
+        names.add(stage.name)
+        if stage.resource not in (CPU, IO):
+            raise ValueError(
+                f"{stage.name}: unknown resource class {stage.resource}")
+        for output in stage.outputs:
+            if output in producers or output in initial:
+                raise ValueError(f"value produced twice: {output}")
+            producers[output] = stage.name
+    for stage in stages:
+        for name in tuple(stage.inputs) + tuple(stage.requires):
+            if name not in producers and name not in initial:
+                raise ValueError(
+                    f"{stage.name}: input {name} is never produced")
+    return producers
+
+
+def _process_pool(max_workers, initializer, initargs):
+    """
+    :return: A fork ProcessPoolExecutor whose worker processes are
+    already running, so that no later submit forks main while other
+    threads hold locks.
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=initializer,
+        initargs=initargs
+        )
+    # with "fork" the first submit starts every worker of the pool
+    pool.submit(os.getpid).result()
+    return pool
+
+
+def run_stages(
+    stages,
+    initial,
+    logger,
+    max_cpu=None,
+    max_io=None,
+    initializer=None,
+    initargs=(),
+    checkpoint=None
+    ):
+    """
+    Runs a stage graph, starting each stage as soon as its inputs are
+    ready.
+
+    A stage that raises is recorded as "failed" and every stage that
+    depends on one of its outputs is recorded as "skipped"; independent
+    branches keep running. If a stage kills its own process every cpu
+    stage that was running in it is recorded as "failed" and the pool
+    is replaced as soon as no io stage is running; cpu stages wait for
+    the new pool. A stage that exceeds its timeout is recorded as
+    "timeout" and treated like a failed stage; it is not waited for
+    when the pools shut down, and its process is left for main's
+    cleanup to terminate.
+
+    Parameters:
+    - stages: list of Stage objects.
+    - initial: dict of values available before any stage runs.
+    - logger: logger used for scheduler progress messages.
+    - max_cpu: size of the process pool (defaults to os.cpu_count()).
+    - max_io: size of the thread pool (defaults to one thread per io
+    stage).
+    - initializer, initargs: passed to the process pool and run once in
+    every stage process.
+    - checkpoint: optional helpers.checkpoint.Checkpoint. Successful
+    stages are saved to it, and a stage whose checkpoint is valid is
+    recorded as "resumed" and its saved outputs are used instead of
+    running it.
+
+    Returns:
+    - values: dict of every value available when the graph drained.
+    - records: dict of stage name to a dict with the keys "resource",
+    "status", "ready", "submitted", "started", "finished", "pid", "tid"
+    and "error". Times are wall-clock seconds (time.time()).
+    """
+    global _started
+    validate_stages(stages, initial)
+    graph_start = time.time()
+    values = dict(initial)
+    available_at = {name: graph_start for name in initial}
+    unavailable = set()
+    pending = {stage.name: stage for stage in stages}
+    records = {}
+    running = {}
+    # cpu future -> the pool it was submitted to
+    pools = {}
+    # stage name -> future of a stage with a timeout, until it starts
+    queued = {}
+    deadlines = {}
+    abandoned = False
+    keys = {}
+    if max_io is None:
+        max_io = max(1, sum(1 for s in stages if s.resource == IO))
+    _started = multiprocessing.get_context("fork").SimpleQueue()
+    cpu_pool = _process_pool(max_cpu, initializer, initargs)
+    io_pool = ThreadPoolExecutor(
+        max_workers=max_io,
+        thread_name_prefix="stage_io"
+        )
+    try:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    needed = tuple(stage.inputs) + tuple(stage.requires)
+                    blocked = [n for n in needed if n in unavailable]
+                    if blocked:
+                        del pending[name]
+                        unavailable.update(stage.outputs)
+                        records[name] = {
+                            "resource": stage.resource,
+                            "status": "skipped",
+                            "error": f"missing {', '.join(blocked)}",
+                            }
+                        logger.debug(
+                            f"scheduler: {name} skipped-missing {blocked}")
+                        progressed = True
+                        continue
+                    if any(n not in values for n in needed):
+                        continue
+                    if checkpoint is not None and name not in keys:
+                        keys[name] = checkpoint.key(
+                            stage, {n: values[n] for n in needed})
+                        outputs = checkpoint.load(name, keys[name])
+                        if outputs is not None:
+                            del pending[name]
+                            now = time.time()
+                            values.update(outputs)
+                            artifacts.load(checkpoint.load_artifacts(name))
+                            for output in outputs:
+                                available_at[output] = now
+                            records[name] = {
+                                "resource": stage.resource,
+                                "status": "resumed",
+                                }
+                            logger.debug(f"scheduler: {name} resumed")
+                            progressed = True
+                            continue
+                    if stage.resource == CPU and cpu_pool is None:
+                        # never fork while an io stage thread is working
+                        if any(s.resource == IO for s in running.values()):
+                            continue
+                        cpu_pool = _process_pool(
+                            max_cpu, initializer, initargs)
+                    del pending[name]
+                    args = tuple(values[n] for n in stage.inputs)
+                    if stage.resource == CPU:
+                        future = cpu_pool.submit(
+                            _call_stage,
+                            stage.name,
+                            stage.func,
+                            args,
+                            artifacts.snapshot()
+                            )
+                        pools[future] = cpu_pool
+                    else:
+                        # io stages share the store of main
+                        future = io_pool.submit(
+                            _call_stage, stage.name, stage.func, args)
+                    running[future] = stage
+                    if stage.timeout:
+                        queued[name] = future
+                    records[name] = {
+                        "resource": stage.resource,
+                        "status": "running",
+                        "ready": max(
+                            [available_at[n] for n in needed] \
+                                + [graph_start]),
+                        "submitted": time.time(),
+                        }
+                    logger.debug(f"scheduler: {name} started")
+            if not running:
+                break
+            while not _started.empty():
+                name, started = _started.get()
+                future = queued.pop(name, None)
+                if future is not None and future in running:
+                    deadlines[future] = started + running[future].timeout
+            timeout = None
+            if deadlines:
+                timeout = max(0, min(deadlines.values()) - time.time())
+            if queued:
+                timeout = START_POLL if timeout is None \
+                    else min(timeout, START_POLL)
+            done, _ = wait(
+                running, timeout=timeout, return_when=FIRST_COMPLETED)
+            now = time.time()
+            for future, deadline in list(deadlines.items()):
+                if future in done or deadline > now:
+                    continue
+                stage = running.pop(future)
+                del deadlines[future]
+                pools.pop(future, None)
+                future.cancel()
+                abandoned = True
+                records[stage.name].update({
+                    "status": "timeout",
+                    "finished": now,
+                    "error": f"timed out after {stage.timeout}s",
+                    })
+                unavailable.update(stage.outputs)
+                logger.debug(
+                    f"scheduler: {stage.name} timed out" \
+                        + f" after {stage.timeout}s")
+            for future in done:
+                stage = running.pop(future)
+                deadlines.pop(future, None)
+                queued.pop(stage.name, None)
+                pool = pools.pop(future, None)
+                record = records[stage.name]
+                try:
+                    result, started, finished, pid, tid, produced = \
+                        future.result()
+                    outputs = _bind_outputs(stage, result)
+                except BrokenProcessPool as e:
+                    if pool is cpu_pool:
+                        cpu_pool.shutdown(wait=False)
+                        cpu_pool = None
+                    _record_failure(stage, record, e, unavailable, logger)
+                    continue
+                except BaseException as e:
+                    _record_failure(stage, record, e, unavailable, logger)
+                    continue
+                now = time.time()
+                values.update(outputs)
+                artifacts.load(produced)
+                for output in outputs:
+                    available_at[output] = now
+                record.update({
+                    "status": "done",
+                    "started": started,
+                    "finished": finished,
+                    "pid": pid,
+                    "tid": tid,
+                    })
+                if checkpoint is not None:
+                    try:
+                        checkpoint.save(
+                            stage.name,
+                            keys.get(stage.name),
+                            outputs,
+                            produced
+                            )
+                    except Exception as e:
+                        logger.debug(
+                            f"scheduler: {stage.name} checkpoint failed-{e}")
+                logger.debug(
+                    f"scheduler: {stage.name} complete" \
+                        + f" ({finished - started:.2f}s)")
+        for name, stage in pending.items():
+            records[name] = {
+                "resource": stage.resource,
+                "status": "skipped",
+                "error": "inputs never became available",
+                }
+    finally:
+        if cpu_pool is not None:
+            cpu_pool.shutdown(wait=not abandoned, cancel_futures=abandoned)
+        io_pool.shutdown(wait=not abandoned, cancel_futures=abandoned)
+    return values, records
+
+
+def _record_failure(stage, record, error, unavailable, logger):
+    record.update({
+        "status": "failed",
+        "finished": time.time(),
+        "error": f"{type(error).__name__}: {error}",
+        })
+    unavailable.update(stage.outputs)
+    logger.debug(f"scheduler: {stage.name} failed-{record['error']}")
+
+
+def critical_path(stages, records):
+    """
+    Finds the chain of stages that determined the end-to-end wall time.
+
+    Starting from the stage that finished last, each step moves to the
+    producer of the input that became available last, i.e. the input
+    the stage actually waited for.
+
+    :param stages: List of Stage objects that were run.
+    :param records: The records returned by run_stages.
+    :return: List of stage names, first stage first.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            producers[output] = stage.name
+    finished = [
+        (record["finished"], name) for name, record in records.items()
+        if record.get("finished") is not None
+        ]
+    if not finished:
+        return []
+    path = [max(finished)[1]]
+    while True:
+        stage = by_name[path[-1]]
+        upstream = [
+            producers[n] for n in tuple(stage.inputs) + tuple(stage.requires)
+            if n in producers
+            and records.get(producers[n], {}).get("finished") is not None
+            ]
+        if not upstream:
+            break
+        path.append(max(upstream, key=lambda n: records[n]["finished"]))
+    path.reverse()
+    return path
+
+
+def failed_stages(records):
+    """
+    :param records: The records returned by run_stages.
+    :return: Dict of failed or timed out stage name to error message.
+    Stages skipped because of a failed input are not included.
+    """
+    return {
+        name: record.get("error", "")
+        for name, record in records.items()
+        if record.get("status") in ("failed", "timeout")
+        }
+
+
+def format_report(stages, records):
+    """
+    Formats stage timings and the critical path as log lines.
+
+    :param stages: List of Stage objects that were run.
+    :param records: The records returned by run_stages.
+    :return: List of strings, one per line.
+    """
+    lines = []
+    for stage in stages:
+        record = records.get(stage.name, {})
+        status = record.get("status", "not run")
+        if record.get("started") is not None:
+            run = record["finished"] - record["started"]
+            waited = record["started"] - record["ready"]
+            lines.append(
+                f"stage {stage.name} [{stage.resource}] {status}:" \
+                    + f" run {run:.2f}s, queued {waited:.2f}s")
+        else:
+            lines.append(
+                f"stage {stage.name} [{stage.resource}] {status}" \
+                    + f" {record.get('error', '')}".rstrip())
+    path = critical_path(stages, records)
+    if path:
+        first = records[path[0]]
+        start = first.get("started", first.get("submitted"))
+        total = records[path[-1]]["finished"] - start
+        lines.append(
+            f"critical path ({total:.2f}s): {' -> '.join(path)}")
+    return lines
@@ -0,0 +1,200 @@
+"""
+This module provides lightweight spans for the pipeline that are
+merged into one Chrome trace / Perfetto JSON file per project run.
+
+Every process appends its events to `<directory>/<pid>.jsonl`, so the
+main process, the forked stage processes and the io threads never
+share a file; `write_trace` merges them once the run is over. The
+file opens in chrome://tracing or https://ui.perfetto.dev.
+
+Functions:
+- configure(directory):
+    Enables tracing for this process and the processes forked from it.
+
+- span(name, cat="stage", **args):
+    Context manager recording a complete event with the wall-clock
+    start/end, pid and thread of the block.
+
+- complete_event(name, started, finished, cat="stage", pid=None,
+  tid=None, args=None):
+    Records an event whose times were measured elsewhere.
+
+- stage_wait_events(records, critical=()):
+    Records, for every stage the scheduler ran, the time it was ready
+    but waited for a pool slot, and marks the stages on the critical
+    path.
+
+- write_trace(path, directory=None):
+    Merges the event files into a single trace file.
+
+Note:
+- Nothing is recorded until `configure` has been called, so stage
+  functions run outside of main (e.g. from a notebook) are unaffected.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_state = {"directory": None, "named": set()}
+_lock = threading.Lock()
+
+
+def configure(directory):
+    """
+    :param directory: Directory receiving the per-process event files.
+    """
+    os.makedirs(str(directory), exist_ok=True)
+    _state["directory"] = str(directory)
+    _state["named"] = set()
+
+
+def _us(seconds):
+    return int(seconds * 1000000)
+
+
+def _write(events):
+    directory = _state["directory"]
+    if directory is None:
+        return
+    path = os.path.join(directory, f"{os.getpid()}.jsonl")
+    with _lock:
+        with open(path, "a") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+
+def complete_event(
+    name,
+    started,
+    finished,
+    cat="stage",
+    pid=None,
+    tid=None,
+    args=None
+    ):
+    """
+    Records a complete ("X") event.
+
+    :param started, finished: Wall-clock times (time.time()).
+    :param pid, tid: Process and thread the event belongs to; default
+    to the calling process and thread.
+    :param args: Optional dict shown with the event.
+    """
+    events = []
+    if pid is None:
+        pid = os.getpid()
+    if tid is None:
+        tid = threading.get_native_id()
+        if (pid, tid) not in _state["named"]:
+            _state["named"].add((pid, tid))
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": threading.current_thread().name},
+                })
+    event = {
+        "name": name,
+        "cat": cat,
+        "ph": "X",
+        "ts": _us(started),
+        "dur": max(0, _us(finished) - _us(started)),
+        "pid": pid,
+        "tid": tid,
+        }
+    if args:
+        event["args"] = args
+    events.append(event)
+    _write(events)
+
+
+@contextmanager
+def span(name, cat="stage", **args):
+    """
+    Records the wall-clock time spent in the `with` block.
+
+    :param name: Event name, e.g. the stage name.
+    :param cat: Event category ("stage", "wait", "main", ...).
+    :param args: Values shown with the event.
+    """
+    started = time.time()
+    try:
+        yield
+    finally:
+        complete_event(name, started, time.time(), cat, args=args)
+
+
+def stage_wait_events(records, critical=()):
+    """
+    Records the scheduling waits of a run_stages call.
+
+    For each stage that ran, a "wait" event covers the time between all
+    of its inputs being available and the stage starting, i.e. the time
+    spent waiting for a free process or thread. Stages restored from a
+    checkpoint get an instant event.
+
+    :param records: The records returned by helpers.scheduler.run_stages.
+    :param critical: Names of the stages on the critical path.
+    """
+    for name, record in records.items():
+        on_path = name in critical
+        if record.get("status") == "resumed":
+            _write([{
+                "name": f"{name} (resumed)",
+                "cat": "stage",
+                "ph": "i",
+                "s": "p",
+                "ts": _us(time.time()),
+                "pid": os.getpid(),
+                "tid": 0,
+                }])
+            continue
+        if record.get("started") is None:
+            continue
+        complete_event(
+            f"wait {name}",
+            record["ready"],
+            record["started"],
+            cat="wait",
+            pid=record.get("pid"),
+            tid=record.get("tid"),
+            args={"critical_path": on_path, "status": record["status"]}
+            )
+
+
+def write_trace(path, directory=None):
+    """
+    Merges the per-process event files into one trace file.
+
+    :param path: Output JSON file.
+    :param directory: Event directory (defaults to the configured one).
+    :return: Number of events written.
+    """
+    directory = directory or _state["directory"]
+    if directory is None:
+        return 0
+    events = []
+    for event_file in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(event_file, "r") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    main_pid = os.getpid()
+    for pid in sorted({e["pid"] for e in events if e.get("pid")}):
+        events.append({
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {
+                "name": "main" if pid == main_pid else f"stages {pid}"},
+            })
+    os.makedirs(os.path.dirname(str(path)) or ".", exist_ok=True)
+    with open(str(path), "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
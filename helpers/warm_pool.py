@@ -0,0 +1,231 @@
+"""
+This module provides the resident ("warm") execution mode of the job
+runner. The pre_main process imports the heavy third-party libraries
+once and keeps a few idle children forked from that warm interpreter.
+Each new project database is handed to an idle child, which only has
+to import the project's own modules and run `main.py`; interpreter
+startup and the geopandas/rasterio/selenium/... imports are paid once
+per day instead of once per project.
+
+Classes:
+- WarmProcess: handle of a forked child with the subset of the
+  `subprocess.Popen` interface used by `JobRunner` (pid, poll,
+  returncode).
+- WarmPool: keeps `spares` idle children ready and dispatches jobs to
+  them.
+
+Functions:
+- preload_modules(modules=PRELOAD_MODULES, log=None):
+    Imports the listed modules into the current process and returns the
+    time each import took.
+
+Note:
+- Only third-party modules are preloaded. `dirs_configs.config` picks
+  the project code and the job workspace at import time, so the
+  project's own modules are imported by each child after it has
+  received its job.
+- The children are forked, so the pool must be created before the
+  parent starts any threads.
+"""
+import importlib
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+import runpy
+
+PRELOAD_MODULES = (
+    "numpy",
+    "pandas",
+    "scipy.interpolate",
+    "scipy.signal",
+    "shapely",
+    "shapely.geometry",
+    "shapely.ops",
+    "pyproj",
+    "fiona",
+    "geopandas",
+    "rasterio",
+    "rasterio.mask",
+    "skimage",
+    "sqlalchemy",
+    "psycopg2",
+    "pdfplumber",
+    "pdfrw",
+    "selenium.webdriver",
+    "requests",
+    "psutil",
+    )
+
+
+def preload_modules(modules=PRELOAD_MODULES, log=None):
+    """
+    Imports modules so that forked children inherit them.
+
+    :param modules: Iterable of module names.
+    :param log: Optional callable(message) for progress messages.
+    :return: Dict of module name to import time in seconds; modules
+    that failed to import are left out.
+    """
+    timings = {}
+    for name in modules:
+        started = time.time()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            if log is not None:
+                log(f"warm_pool: preload {name} failed-{e}")
+            continue
+        timings[name] = time.time() - started
+    if log is not None:
+        total = sum(timings.values())
+        log(f"warm_pool: preloaded {len(timings)} modules in {total:.2f}s")
+    return timings
+
+
+class WarmProcess:
+    """
+    Handle of a child forked by WarmPool. The child is the leader of
+    its own session, so `os.killpg(proc.pid, sig)` reaches it and every
+    process it starts.
+    """
+
+    def __init__(self, pid, job_fd):
+        self.pid = pid
+        self.job_fd = job_fd
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                pid, status = os.waitpid(self.pid, os.WNOHANG)
+            except ChildProcessError:
+                self.returncode = -1
+                return self.returncode
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def dispatch(self, message):
+        with os.fdopen(self.job_fd, "w") as f:
+            f.write(json.dumps(message))
+        self.job_fd = None
+
+    def kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            os.waitpid(self.pid, 0)
+        except ChildProcessError:
+            pass
+        if self.job_fd is not None:
+            os.close(self.job_fd)
+            self.job_fd = None
+
+
+class WarmPool:
+    """
+    Keeps idle children forked from the warm parent and runs one
+    project in each.
+
+    Parameters:
+    - python_script: path of main.py, executed as `__main__` in the
+    child with the same arguments pre_main passes on the command line.
+    - spares: number of idle children kept ready.
+    """
+
+    def __init__(self, python_script, spares=1):
+        self.python_script = python_script
+        self.spares = max(1, int(spares))
+        self.idle = []
+        self.fill()
+
+    def fill(self):
+        self.idle = [p for p in self.idle if p.poll() is None]
+        while len(self.idle) < self.spares:
+            self.idle.append(self._fork())
+
+    def _fork(self):
+        read_fd, write_fd = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            # the job pipes of the other idle children must not stay
+            # open here, or they would never see end-of-file
+            for proc in self.idle:
+                if proc.job_fd is not None:
+                    os.close(proc.job_fd)
+            self._child(read_fd)
+        os.close(read_fd)
+        return WarmProcess(pid, write_fd)
+
+    def _child(self, read_fd):
+        """
+        Body of an idle child; never returns.
+        """
+        code = 1
+        try:
+            os.setsid()
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            with os.fdopen(read_fd, "r") as f:
+                data = f.read()
+            if not data:
+                os._exit(0)
+            message = json.loads(data)
+            with open(message["output_path"], "a") as output:
+                os.dup2(output.fileno(), 1)
+                os.dup2(output.fileno(), 2)
+            os.environ.update(message["env"])
+            source_dir = os.path.dirname(self.python_script)
+            os.chdir(source_dir)
+            if source_dir not in sys.path:
+                sys.path.insert(0, source_dir)
+            sys.argv = [self.python_script] + message["args"]
+            try:
+                runpy.run_path(self.python_script, run_name="__main__")
+                code = 0
+            except SystemExit as e:
+                if e.code is None:
+                    code = 0
+                elif isinstance(e.code, int):
+                    code = e.code
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def spawn(self, args, env, output_path):
+        """
+        Hands a job to an idle child and forks a replacement.
+
+        :param args: Command line arguments for main.py.
+        :param env: Environment variables set in the child before
+        main.py is imported (e.g. FLOODWAY_JOB_DIR).
+        :param output_path: File receiving the child's stdout/stderr.
+        :return: The WarmProcess running the job.
+        """
+        self.idle = [p for p in self.idle if p.poll() is None]
+        proc = self.idle.pop(0) if self.idle else self._fork()
+        proc.dispatch({
+            "args": [str(a) for a in args],
+            "env": env,
+            "output_path": output_path,
+            })
+        self.fill()
+        return proc
+
+    def close(self):
+        for proc in self.idle:
+            proc.kill()
+        self.idle = []
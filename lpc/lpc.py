@@ -1,7 +1,6 @@
 import os
 import os.path
 import time
-os.environ['DISPLAY'] = ':99'
 import numpy as np
 import requests
 from bs4 import BeautifulSoup
@@ -11,34 +10,21 @@ from helpers.geom_helper import *
 from dirs_configs.input_vars import *
 from helpers.misc_helper import *
 from helpers.multiprocessing_helper import *
-from pyvirtualdisplay import Display
-from xvfbwrapper import Xvfb
-import Xlib.display
-import pyautogui
-disp = Display(
-    visible=True,
-    size=(1366, 768),
-    backend="xvfb",
-    use_xauth=True
-    )
-disp.start()
-pyautogui._pyautogui_x11._display = Xlib.display.Display(
-    os.environ["DISPLAY"]
-    )
+from helpers.lazy import lazy_attr, lazy_import, start_display
 import uuid
 from multiprocessing import Pool, cpu_count
 import pyproj
 import rasterio.mask
 import shapely.geometry
-import undetected_chromedriver as uc
-import wget
 from requests.adapters import HTTPAdapter
-from selenium import webdriver
-from selenium.webdriver.common.by import By
 from shapely.geometry import Point, Polygon, LineString
 import geopandas as gpd
 from urllib3.util.retry import Retry
-import selenium.webdriver.chrome.options as ChromeOptions
+# browser dependencies are loaded on first use, see helpers.lazy
+uc = lazy_import("undetected_chromedriver")
+wget = lazy_import("wget")
+webdriver = lazy_import("selenium.webdriver")
+By = lazy_attr("selenium.webdriver.common.by", "By")
 
 
 def download_file(url, out_path):
@@ -72,6 +58,7 @@ def lpc(gs_1, county, projectnumber, river_frontage_length, logger_1):
         logger = logger_1
         river_frontage_length = int(river_frontage_length)
         logger.debug(f"river_frontage_length: {river_frontage_length}")
+        start_display()
         options = webdriver.ChromeOptions()
         options.add_argument("--window-size=1920x1080")
         driver_path = "/usr/local/bin/chromedriver"
@@ -17,10 +17,13 @@ env = os.environ.copy()
 bash_path = Path("./bash")
 kill_processes = bash_path / "kill_processes.sh"
 start_xvfb = bash_path / "start_xvfb.sh"
-result1 = subprocess.run([kill_processes], env=env)
-time.sleep(1)
-result2 = subprocess.run([start_xvfb], env=env)
-time.sleep(1)
+# under the pre_main job runner the display is shared by sibling jobs
+# and is managed by the runner, so only standalone runs reset it
+if not os.environ.get("FLOODWAY_JOB_DIR"):
+    result1 = subprocess.run([kill_processes], env=env)
+    time.sleep(1)
+    result2 = subprocess.run([start_xvfb], env=env)
+    time.sleep(1)
 from dirs_configs.file_paths import (
     WORKER_1_LOG_PATH,
     WORKER_2_LOG_PATH,
@@ -28,10 +31,11 @@ from dirs_configs.file_paths import (
     WORKER_4_LOG_PATH,
     MAIN_LOG_PATH,
     )
-from workers.worker_module_1 import worker_1
-from workers.worker_module_2 import worker_2
-from workers.worker_module_3 import worker_3
-from workers.worker_module_4 import worker_4
+from workers.pipeline import run_pipeline
+from helpers.scheduler import failed_stages
+from helpers.job_runner import write_job_result
+from helpers import tracing
+from helpers import dem_window
 from sync.remote_drive import upload_drive, dirs_strings
 from helpers.misc_helper import log_rotation
 from dotenv import load_dotenv
@@ -41,23 +45,21 @@ load_dotenv(
     )
 from multiprocessing import (
     Pool,
-    Process,
-    Queue,
     current_process,
     Pipe
     )
-import multiprocessing
 import threading
 import logging
 from dirs_configs.config import (
     BASE_DIR,
+    FINAL_ATTEMPT,
+    JOB_DIR,
     LOG_DIR,
     OUTPUT_DIR,
     RESULT_DIR,
     TMP_DIR
     )
 from loggers.logger_main import get_main_logger
-import cProfile
 import time
 import signal
 import uuid
@@ -147,7 +149,8 @@ def rclone_copy(fp_zip, directory, full_path):
 def main(dbfile, pid):
     try:
         excld_pid = pid
-        kill_python3_processes(excld_pid)
+        if not JOB_DIR:
+            kill_python3_processes(excld_pid)
         unique_id = uuid.uuid4()
         pid_dirname = f"{unique_id}_pid"
         pid_dir_path = TMP_DIR / pid_dirname
@@ -158,105 +161,30 @@ def main(dbfile, pid):
         with open(lock_file, 'w') as f:
             f.write("lock")
         logger_main = get_main_logger()
+        tracing.configure(pid_dir_path / "trace")
         print("--------------------")
         print("--------------------")
         print("main: main started")
         print(f"{str(datetime.now())}")
         db_file = dbfile
+        # stage name -> error, reported to the job runner at the end
+        stage_errors = {"main": "did not finish"}
         try:
             start_time = time.time()
-            # error_event = multiprocessing.Event()
-            processes = []
         except Exception as e:
             logger_main.debug(f"main: first block failed-{e}")
             print(f"main: first block failed-{e}")
         try:
-            parent_conn1, child_conn1 = multiprocessing.Pipe()
-            parent_conn2, child_conn2 = multiprocessing.Pipe()
-            parent_conn3, child_conn3 = multiprocessing.Pipe()
-            parent_conn4, child_conn4 = multiprocessing.Pipe()
-            parent_conn5, child_conn5 = multiprocessing.Pipe()
-            parent_conn6, child_conn6 = multiprocessing.Pipe()
-            parent_conn7, child_conn7 = multiprocessing.Pipe()
-            logger_main.debug("main: pipes created")
-            # print("main: pipes created")
-            # error_event_1 = threading.Event()
-            # # error_event_2 = threading.Event()
-            # # error_event_3 = threading.Event()
-            # # error_event_4 = threading.Event()
-            # print("main: error_events created")
             pid = os.getpid()
             print(f"main: pid: {pid}")
-            p1 = Process(
-                target=worker_1,
-                args=(
-                    parent_conn1,
-                    parent_conn2,
-                    parent_conn3,
-                    parent_conn5,
-                    parent_conn7,
-                    pid,
-                    db_file,
-                    pid_dir_path
-                    ))
-            p1.start()
-            processes.append(p1)
-            # if error_event_1.is_set():
-            #     p1.terminate()
-            #     os.kill(pid, signal.SIGTERM)
-            logger_main.debug("main: worker_1 started")
-            print("main: worker_1 started")
-            p2 = Process(
-                target=worker_2,
-                args=(
-                    child_conn1,
-                    child_conn2,
-                    parent_conn4,
-                    parent_conn6,
-                    pid_dir_path
-                    ))
-            p2.start()
-            processes.append(p2)
-            logger_main.debug("main: worker_2 started")
-            print("main: worker_2 started")
-            p3 = Process(
-                target=worker_3,
-                args=(
-                    child_conn3,
-                    child_conn4,
-                    pid_dir_path
-                    ))
-            p3.start()
-            processes.append(p3)
-            logger_main.debug("main: worker_3 started")
-            print("main: worker_3 started")
-            p4 = Process(
-                target=worker_4,
-                args=(
-                    child_conn5,
-                    child_conn6,
-                    child_conn7,
-                    pid_dir_path
-                    ))
-            p4.start()
-            processes.append(p4)
-            logger_main.debug("main: worker_4 started")
-            print("main: worker_4 started")
-            # while not error_event.is_set() and any(
-                # p.is_alive() for p in processes):
-            #     time.sleep(0.5)
-            # if error_event.is_set():
-            #     for p in processes:
-            #         p.terminate()
-            #         p.join()
-            #     sys.exit(1)
-            for p in processes:
-                p.join()
-                # p1.join()
-                # p2.join()
-                # p3.join()
-                # p4.join()
+            with tracing.span("pipeline", cat="main"):
+                values, records = run_pipeline(
+                    db_file, pid, pid_dir_path, logger_main)
+            stage_errors = failed_stages(records)
+            logger_main.debug("main: pipeline complete")
+            print("main: pipeline complete")
         except Exception as e:
+            stage_errors = {"pipeline": str(e)}
             logger_main.debug(f"main: second block failed-{e}")
             print(f"main: second block failed-{e}")
         try:
@@ -264,6 +192,12 @@ def main(dbfile, pid):
         except Exception as e:
             logger_main.debug(f"main: third block failed-{e}")
             print(f"main: third block failed-{e}")
+        if JOB_DIR and stage_errors and not FINAL_ATTEMPT:
+            # the job will be retried: keep the project tree for the
+            # stage checkpoints and leave the upload to the retry
+            logger_main.debug("main: stages failed, project kept for retry")
+            print("main: stages failed, project kept for retry")
+            return
         try:
             project_number, l_name = dirs_strings(db_file)
             fp_out = RESULT_DIR / "logs"
@@ -276,7 +210,8 @@ def main(dbfile, pid):
                 ]
             max_file_size = 1024
             log_rotation(fp_out, log_paths_combined, max_file_size)
-            fp_zip, new_dirs, full_pathx = upload_drive(db_file)
+            with tracing.span("upload_drive", cat="main"):
+                fp_zip, new_dirs, full_pathx = upload_drive(db_file)
             logger_main.debug("main: upload_drive complete")
             print("main: upload_drive complete")
             end_time = time.time()
@@ -292,6 +227,7 @@ def main(dbfile, pid):
                     + f" and {execution_seconds:.2f} seconds"
                     )
         except Exception as e:
+            stage_errors["upload_drive"] = str(e)
             logger_main.debug(f"main: fouth(final) block failed-{e}")
             print(f"main: fourth(final) block failed-{e}")
         try:
@@ -324,6 +260,19 @@ def main(dbfile, pid):
     except Exception as e:
         print(f"main: main failed-{e}")
     finally:
+        try:
+            if JOB_DIR:
+                write_job_result(JOB_DIR, stage_errors)
+        except:
+            pass
+        try:
+            stem = os.path.splitext(os.path.basename(str(db_file)))[0]
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            trace_path = RESULT_DIR / "traces" / f"{stem}-{stamp}.json"
+            if tracing.write_trace(trace_path):
+                print(f"main: trace written to {trace_path}")
+        except:
+            pass
         try:
             pids = "pids_comb.txt"
             pids_path = os.path.join(pid_dir_path, pids)
@@ -342,6 +291,10 @@ def main(dbfile, pid):
                 shutil.rmtree(pid_dir_path)
         except:
             pass
+        try:
+            dem_window.clear()
+        except:
+            pass
         try:
             if os.path.exists(db_file):
                 os.remove(db_file)
@@ -357,3 +310,10 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
     main(args.dbfile, args.pid)
+    # a stage abandoned after its timeout may still hold a thread that
+    # would keep the interpreter from exiting
+    if threading.active_count() > 1:
+        logging.shutdown()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
@@ -6,13 +6,21 @@ load_dotenv(
     "/home/jpournelle/python_projects/" \
         + "plabz/river_division/main/main.env"
     )
+import argparse
 import requests
 import time
 import subprocess
 from datetime import datetime
 import glob
 import shutil
-import sqlite3
+from helpers.intake import DbIntake
+from helpers.job_runner import JobRunner
+from helpers.warm_pool import WarmPool, preload_modules
+from helpers.dem_store import prune_tile_cache
+from helpers.parcel_store import open_index
+
+PYTHON_3 = "/home/jpournelle/anaconda3/envs/g39/bin/python3"
+JOB_TIMEOUT = 1200
 
 
 def log_message(message, file_path):
@@ -20,118 +28,63 @@ def log_message(message, file_path):
         f.write(f"{datetime.now()}: {message}\n")
 
 
-def process_db_file(python_script, db_file, log_file, pid):
-    try:
-        log_message(f"------------------------------------------", log_file)
-        log_message(f"------------------------------------------", log_file)
-        log_message(f"{str(datetime.now())}", log_file)
-        log_message(f"Processing {db_file}", log_file)
-        log_message(f"Python3 script initiated", log_file)
-        python_3 = "/home/jpournelle/anaconda3/envs/g39/bin/python3"
-        command = f"{python_3} {python_script} {db_file} {pid}"
-        try:
-            with open(log_file, "a") as log_output:
-                proc = subprocess.Popen(
-                    ["/bin/bash", "-c", command],
-                    stdout=log_output,
-                    stderr=subprocess.STDOUT
-                )
-                proc.wait(timeout=1200)
-        except subprocess.TimeoutExpired:
-            log_message("Subprocess timed out.", log_file)
-            script_path = os.path.realpath(__file__)
-            source_dir = os.path.dirname(script_path)
-            tmp_dir = os.path.join(source_dir, "tmp")
-            lock = os.path.join(tmp_dir, "lock.txt")
-            bound_coords = os.path.join(tmp_dir, "bound_coords.txt")
-            xml_links = os.path.join(tmp_dir, "xml_links.txt")
-            pid_dir = os.path.join(source_dir, "*pid")
-            pid_dir_path = [d for d in glob.glob(pid_dir) if os.path.isdir(d)]
-            if os.path.exists(db_file):
-                os.remove(db_file)
-            if os.path.exists(lock):
-                os.remove(lock)
-            if os.path.exists(bound_coords):
-                os.remove(bound_coords)
-            if os.path.exists(xml_links):
-                os.remove(xml_links)
-            if os.path.exists(pid_dir_path):
-                shutil.rmtree(pid_dir_path)
-            proc.terminate()
-            with sqlite3.connect(str(db_file)) as conn:
-                c = conn.cursor()
-                c.execute("SELECT id FROM project_data;")
-                project_number = str(c.fetchone()[0])
-                c.execute("SELECT lname FROM project_data;")
-                l_name = str(c.fetchone()[0])
-            url = os.getenv("SLACK_URL")
-            headers = {
-                "Content-Type": "application/json",
-            }
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            data = {
-                "text":f"AlphApex Floodway Program timed out at {current_time}. Project" \
-                    + f" {l_name}-{project_number} needs to be ran again."
-                }
-            response = requests.post(url, json=data, headers=headers)
-            log_message(response.text, log_file)
-        if proc.poll() is None:
-            proc.kill()
-    except Exception as e:
-        log_message(f"Error: {e}", log_file)
-        script_path = os.path.realpath(__file__)
-        source_dir = os.path.dirname(script_path)
-        tmp_dir = os.path.join(source_dir, "tmp")
-        lock = os.path.join(tmp_dir, "lock.txt")
-        bound_coords = os.path.join(tmp_dir, "bound_coords.txt")
-        xml_links = os.path.join(tmp_dir, "xml_links.txt")
-        pid_dir = os.path.join(source_dir, "*pid")
-        pid_dir_path = [d for d in glob.glob(pid_dir) if os.path.isdir(d)]
-        if os.path.exists(db_file):
-            os.remove(db_file)
-        if os.path.exists(lock):
-            os.remove(lock)
-        if os.path.exists(bound_coords):
-            os.remove(bound_coords)
-        if os.path.exists(xml_links):
-            os.remove(xml_links)
-        if os.path.exists(pid_dir_path):
-            shutil.rmtree(pid_dir_path)
-        proc.terminate()
-        with sqlite3.connect(str(db_file)) as conn:
-            c = conn.cursor()
-            c.execute("SELECT id FROM project_data;")
-            project_number = str(c.fetchone()[0])
-            c.execute("SELECT lname FROM project_data;")
-            l_name = str(c.fetchone()[0])
-        url = os.getenv("SLACK_URL")
-        headers = {
-            "Content-Type": "application/json",
+def notify_failed(job, log_file):
+    """
+    Posts a Slack message asking for a project that failed or timed out
+    on every attempt to be ran again.
+    """
+    url = os.getenv("SLACK_URL")
+    headers = {
+        "Content-Type": "application/json",
+    }
+    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    data = {
+        "text":f"AlphApex Floodway Program {job.status} at {current_time}" \
+            + f" after {job.attempt} attempts. Project" \
+            + f" {job.l_name}-{job.project_number} needs to be ran again."
         }
-        current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        data = {
-            "text":f"AlphApex Floodway Program timed out at {current_time}. Project" \
-                + f" {l_name}-{project_number} needs to be ran again."
-            }
-        response = requests.post(url, json=data, headers=headers)
-        log_message(response.text, log_file)
+    response = requests.post(url, json=data, headers=headers)
+    log_message(response.text, log_file)
+
 
+def start_display(source_dir):
+    """
+    Clears leftover browsers/displays and starts the shared Xvfb display
+    once for all jobs.
+    """
+    bash_path = os.path.join(source_dir, "bash")
+    subprocess.run([os.path.join(bash_path, "kill_processes.sh")])
+    time.sleep(1)
+    subprocess.run([os.path.join(bash_path, "start_xvfb.sh")])
+    time.sleep(1)
 
-def process_existing_files(tmp_dir, python_script, log_file, pid):
-    for file in os.listdir(tmp_dir):
-        if file.endswith('.db'):
-            full_path = os.path.join(tmp_dir, file)
-            process_db_file(python_script, full_path, log_file, pid)
 
+def recover_jobs(runner, tmp_dir, log_file):
+    """
+    Moves databases left in job workspaces that the job queue does not
+    know about back into tmp/ so they are queued again, and removes
+    those workspaces. Workspaces of queued jobs are kept.
+    """
+    known = {row["job_dir"] for row in runner.queue.jobs()}
+    for job_dir in glob.glob(os.path.join(runner.jobs_dir, "*")):
+        if not os.path.isdir(job_dir) or job_dir in known:
+            continue
+        for db_file in glob.glob(os.path.join(job_dir, "**", "*.db"),
+                                 recursive=True):
+            shutil.move(db_file, tmp_dir)
+            log_message(f"Recovered {db_file}", log_file)
+        shutil.rmtree(job_dir, ignore_errors=True)
 
-def main(pid):
+
+def main(pid, max_jobs, warm=False):
     script_path = os.path.realpath(__file__)
     source_dir = os.path.dirname(script_path)
     tmp_dir = os.path.join(source_dir, "tmp")
+    jobs_dir = os.path.join(tmp_dir, "jobs")
     lock = os.path.join(tmp_dir, "lock.txt")
     bound_coords = os.path.join(tmp_dir, "bound_coords.txt")
     xml_links = os.path.join(tmp_dir, "xml_links.txt")
-    pid_dir = os.path.join(source_dir, "*pid")
+    pid_dir = os.path.join(tmp_dir, "*pid")
     pid_dir_path = [d for d in glob.glob(pid_dir) if os.path.isdir(d)]
     if os.path.exists(lock):
             os.remove(lock)
@@ -139,15 +92,74 @@ def main(pid):
         os.remove(bound_coords)
     if os.path.exists(xml_links):
         os.remove(xml_links)
-    if os.path.exists(pid_dir_path):
-        shutil.rmtree(pid_dir_path)
+    for d in pid_dir_path:
+        shutil.rmtree(d)
     python_script = os.path.join(source_dir, "main.py")
     log_file = os.path.join(source_dir, "logs", "main.log")
-    process_existing_files(tmp_dir, python_script, log_file, pid)
-    while True:
-        process_existing_files(tmp_dir, python_script, log_file, pid)
-        time.sleep(5)
+    pruned = prune_tile_cache(os.path.join(tmp_dir, "dem_tiles"))
+    if pruned:
+        log_message(f"Removed {pruned} cached DEM tiles", log_file)
+    # built once here rather than by the first concurrent projects
+    try:
+        open_index(
+            os.path.join(source_dir, "gis", "subset_parcels20.shp"),
+            log=lambda message: log_message(message, log_file)
+            )
+    except Exception as e:
+        log_message(f"Parcel index not built: {e}", log_file)
+    python_3 = PYTHON_3 if os.path.exists(PYTHON_3) else None
+    start_display(source_dir)
+    warm_pool = None
+    if warm:
+        preload_modules(log=lambda m: log_message(m, log_file))
+        warm_pool = WarmPool(python_script, spares=max_jobs)
+    runner = JobRunner(
+        python_script,
+        jobs_dir,
+        log_file,
+        max_jobs=max_jobs,
+        timeout=JOB_TIMEOUT,
+        python_3=python_3,
+        on_failed=lambda job: notify_failed(job, log_file),
+        warm_pool=warm_pool
+        )
+    recover_jobs(runner, tmp_dir, log_file)
+    log_message(
+        f"pre_main started with {max_jobs} job slots" \
+            + (" (warm)" if warm else ""),
+        log_file
+        )
+    intake = DbIntake(tmp_dir, log=lambda m: log_message(m, log_file))
+    try:
+        while True:
+            # block until a database arrives while idle; wake up every
+            # second while jobs run or wait for a retry
+            busy = runner.has_work()
+            for db_file in intake.wait(timeout=1 if busy else None):
+                runner.submit(db_file)
+            runner.poll()
+    finally:
+        intake.close()
+        runner.shutdown()
+        if warm_pool is not None:
+            warm_pool.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="AlphApex Floodway Program job runner")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=int(os.getenv("FLOODWAY_MAX_JOBS", "2")),
+        help="number of project databases processed concurrently"
+        )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        default=os.getenv("FLOODWAY_WARM", "") == "1",
+        help="keep the heavy libraries loaded and run projects in" \
+            + " processes forked from this one"
+        )
+    args = parser.parse_args()
     pid = os.getpid()
-    main(pid)
+    main(pid, args.jobs, warm=args.warm)
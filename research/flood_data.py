@@ -9,6 +9,11 @@ Functions:
     fema_data(projectnumber, string, logger_1): Opens a PDF file only if
     it has a byte size indicating that it is not empty and extracts
     relevant flood risk data.
+
+Note:
+    fema_data raises instead of ending the process: it runs on a thread
+    of the job process, and a raised error fails its stage (and the
+    stages depending on it) in the scheduler.
 """
 import glob
 import os
@@ -16,14 +21,16 @@ import time
 from dirs_configs.config import DATA_DIR
 from helpers.misc_helper import find_index_of_substring_in_list
 import pdfplumber
-import signal
 
 
-def fema_data(projectnumber, string, logger_1, pid):
+def fema_data(projectnumber, string, logger_1):
     """
     Continuously checks for a non-empty PDF file at a
     specified path based on the project number and
     processes it to extract flood data when found.
+
+    :raises TimeoutError: when no report shows up within the timeout.
+    :raises RuntimeError: when the parcel is in a high-risk flood zone.
     """
     logger = logger_1
     logger.debug('FEMA Data: %s', string)
@@ -45,10 +52,13 @@ def fema_data(projectnumber, string, logger_1, pid):
                         )
         if time.time() - start_time >= timeout:
             logger.debug(
-                f"Timeout reached. Killing process for project" \
+                f"Timeout reached. Giving up on project" \
                     + f" number {projectnumber}."
                     )
-            os.kill(int(os.getpid()), signal.SIGKILL)
+            raise TimeoutError(
+                f"fema_data: no flood report for {projectnumber}" \
+                    + f" after {timeout}s"
+                    )
         time.sleep(10)
     with pdfplumber.open(pdf_file_path) as pdf:
         first_page = pdf.pages[0]
@@ -81,17 +91,19 @@ def fema_data(projectnumber, string, logger_1, pid):
         n = int(len(lst_1) - 2)
         yr100 = lst_1[n]
         logger.debug('100 YR Flood: %s', yr100)
-        if yr100 == '(High':
-            os.kill(pid, signal.SIGKILL)
-            os.kill(int(os.getpid()), signal.SIGKILL)
-        else:
-            pass
     except:
         yr100 = 'N/A'
         logger.debug(
             f"Error: Unable to extract 100 YR Flood data for" \
                 + f" project number {projectnumber}."
                 )
+    if yr100 == '(High':
+        logger.debug(
+            f"fema_data: project number {projectnumber} is in a" \
+                + " high-risk flood zone."
+                )
+        raise RuntimeError(
+            f"fema_data: {projectnumber} is in a high-risk flood zone")
     try:
         lst_str_2 = str(lst[result_index_2])
         lst_2 = lst_str_2.split(' ')
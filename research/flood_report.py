@@ -19,7 +19,6 @@ import time
 import os.path
 import sqlite3
 import os
-os.environ['DISPLAY'] = ':99'
 from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv(
@@ -30,35 +29,23 @@ from base64 import b64decode
 import subprocess
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor, wait
-import img2pdf
-import undetected_chromedriver as uc
 from dirs_configs.config import DATA_DIR, BASE_DIR
 from dirs_configs.input_vars import *
 from helpers.misc_helper import url_active
-from PIL import Image
-from selenium import webdriver
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.print_page_options import PrintOptions
-import selenium.webdriver.chrome.options as ChromeOptions
-from selenium.common.exceptions import WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.desired_capabilities import (
-    DesiredCapabilities
-    )
-from pyvirtualdisplay import Display
-from xvfbwrapper import Xvfb
-import Xlib.display
-import pyautogui
-from contextlib import contextmanager
-disp = Display(visible=True, size=(1366, 768), backend="xvfb", use_xauth=True)
-disp.start()
-pyautogui._pyautogui_x11._display = Xlib.display.Display(
-    os.environ["DISPLAY"]
-    )
+from helpers.lazy import lazy_attr, lazy_import, start_display
 import signal
+# browser dependencies are loaded on first use, see helpers.lazy
+uc = lazy_import("undetected_chromedriver")
+webdriver = lazy_import("selenium.webdriver")
+selenium_exceptions = lazy_import("selenium.common.exceptions")
+ActionChains = lazy_attr(
+    "selenium.webdriver.common.action_chains", "ActionChains")
+By = lazy_attr("selenium.webdriver.common.by", "By")
+Keys = lazy_attr("selenium.webdriver.common.keys", "Keys")
+PrintOptions = lazy_attr(
+    "selenium.webdriver.common.print_page_options", "PrintOptions")
+Service = lazy_attr("selenium.webdriver.chrome.service", "Service")
+Xvfb = lazy_attr("xvfbwrapper", "Xvfb")
 
 
 def flood_report(projectnumber,
@@ -70,6 +57,7 @@ def flood_report(projectnumber,
     logger = logger_1
     bash_passwd = os.getenv("BASH_PASSWD")
     start_time = time.time()
+    start_display()
     with Xvfb():
         try:
             driver_path = "/usr/local/bin/chromedriver"
@@ -117,7 +105,7 @@ def flood_report(projectnumber,
                         '//*[@id="parcelId_CountySearchForm-inputEl"]'
                     ).send_keys(clean_parcelid)
                     time.sleep(5)
-                except WebDriverException as e:
+                except selenium_exceptions.WebDriverException as e:
                     logger.debug(
                         f"get_flood_report:failed- WebdriverException{e}"
                         )
@@ -159,7 +147,7 @@ def flood_report(projectnumber,
                 return None
         except(ValueError, TypeError) as e:
             logger.debug(f"get_flood_report:failed- {e}")
-        except WebDriverException as e:
+        except selenium_exceptions.WebDriverException as e:
             logger.debug(
                 f"get_flood_report:failed- WebdriverException{e}"
                 )
@@ -16,42 +16,31 @@ saved.
 The function does not return anything.
 """
 import time
-import os.path
 import sqlite3
-import os
-os.environ['DISPLAY'] = ':99'
 from pathlib import Path
 from base64 import b64decode
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor, wait
-import img2pdf
-import undetected_chromedriver as uc
 from dirs_configs.config import DATA_DIR
 from dirs_configs.input_vars import *
 from loggers.logger import get_logger
-from helpers.misc_helper import start_xvfb
-from PIL import Image
-from selenium import webdriver
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.print_page_options import PrintOptions
-import selenium.webdriver.chrome.options as ChromeOptions
+from helpers.multiprocessing_helper import submit_thread, wait_results
+from helpers.lazy import lazy_attr, lazy_import, start_display
 from dotenv import load_dotenv
-from pyvirtualdisplay import Display
-from xvfbwrapper import Xvfb
-import Xlib.display
-import pyautogui
 from contextlib import contextmanager
-import multiprocessing
 import threading
-disp = Display(
-    visible=True, size=(1366, 768), backend="xvfb", use_xauth=True
-    )
-disp.start()
-pyautogui._pyautogui_x11._display = Xlib.display.Display(
-    os.environ["DISPLAY"]
-    )
+# browser dependencies are loaded on first use, see helpers.lazy
+img2pdf = lazy_import("img2pdf")
+uc = lazy_import("undetected_chromedriver")
+webdriver = lazy_import("selenium.webdriver")
+Image = lazy_import("PIL.Image")
+ActionChains = lazy_attr(
+    "selenium.webdriver.common.action_chains", "ActionChains")
+By = lazy_attr("selenium.webdriver.common.by", "By")
+Keys = lazy_attr("selenium.webdriver.common.keys", "Keys")
+PrintOptions = lazy_attr(
+    "selenium.webdriver.common.print_page_options", "PrintOptions")
+Xvfb = lazy_attr("xvfbwrapper", "Xvfb")
+# seconds parcel_research waits for the property and directions pages
+RESEARCH_TIMEOUT = 540
 
 
 def parcel_research(projectnumber,
@@ -62,28 +51,26 @@ def parcel_research(projectnumber,
     time.sleep(500 / 1000)
     logger = logger_1
     start_time = time.time()
+    start_display()
     try:
-        results = []
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=2) as executor:
-            futures = []
-            futures.append(
-                executor.submit(
-                    prop_details,
-                    projectnumber,
-                    parcelid,
-                    county,
-                    logger_1)
-                )
-            futures.append(
-                executor.submit(
-                    directions,
-                    projectnumber,
-                    parcelid,
-                    logger_1)
-                )
-            concurrent.futures.wait(futures)
-            results = [future.result() for future in futures]
+        futures = [
+            submit_thread(
+                prop_details,
+                projectnumber,
+                parcelid,
+                county,
+                logger_1,
+                pool="worker_3"
+                ),
+            submit_thread(
+                directions,
+                projectnumber,
+                parcelid,
+                logger_1,
+                pool="worker_3"
+                ),
+            ]
+        results = wait_results(futures, timeout=RESEARCH_TIMEOUT)
     except Exception as e:
         logger.debug(f"parcel_research:failed - {e}")
     finally:
@@ -8,37 +8,7 @@ Functions:
 Generates a PDF file containing a map of river mile for a given
 project number, using the provided GeoDataFrames.
 """
-import os
-import os.path
 import time
-os.environ['DISPLAY'] = ':99'
-from pyvirtualdisplay import Display
-from xvfbwrapper import Xvfb
-import Xlib.display
-import pyautogui
-disp = Display(
-    visible=True,
-    size=(1366, 768),
-    backend="xvfb",
-    use_xauth=True
-    )
-disp.start()
-pyautogui._pyautogui_x11._display = Xlib.display.Display(
-    os.environ["DISPLAY"]
-    )
-import undetected_chromedriver as uc
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.print_page_options import PrintOptions
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
-import selenium.webdriver.chrome.options as ChromeOptions
-import folium
 import json
 import geopandas as gpd
 from shapely.geometry import (
@@ -55,10 +25,19 @@ from dirs_configs.config import *
 from dirs_configs.file_paths import *
 from dirs_configs.input_vars import *
 from helpers.misc_helper import style_function
-from PIL import Image
-from reportlab.pdfgen import canvas
+from helpers.layers import load_layer
+from helpers.lazy import lazy_attr, lazy_import, start_display
 import pyproj
 from shapely.ops import transform
+# browser and report dependencies are loaded on first use, see
+# helpers.lazy
+folium = lazy_import("folium")
+uc = lazy_import("undetected_chromedriver")
+webdriver = lazy_import("selenium.webdriver")
+Image = lazy_import("PIL.Image")
+canvas = lazy_import("reportlab.pdfgen.canvas")
+PrintOptions = lazy_attr(
+    "selenium.webdriver.common.print_page_options", "PrintOptions")
 
 
 def river_mile(projectnumber, gs_1, gdf_hxline, logger_1):
@@ -116,7 +95,7 @@ def river_mile(projectnumber, gs_1, gdf_hxline, logger_1):
         shapefile_paths = [EFLDWY, WFLDWY, SUW, SUW_XS]
         folium_geoms = []
         for path in shapefile_paths:
-            gdf = gpd.read_file(path)
+            gdf = load_layer(path)
             if not gdf.empty:
                 geometry = shape(gdf.geometry.iloc[0])
                 reprojected_geometry = transform(project, geometry)
@@ -140,6 +119,7 @@ def river_mile(projectnumber, gs_1, gdf_hxline, logger_1):
         folium.GeoJson(folium_geoms[0].to_json()).add_to(m)
         folium.GeoJson(folium_geoms[1].to_json()).add_to(m)
         m.save(str(DATA_DIR / f"{projectnumber}-RiverMile.html"))
+        start_display()
         options = webdriver.ChromeOptions()
         options.add_argument("--window-size=1920x1080")
         print_options = PrintOptions()
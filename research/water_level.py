@@ -34,37 +34,24 @@ with paths and configurations
 suited to a Linux OS. Adjustments may be necessary to execute this
 script in a different OS environment.
 """
-import os
-import os.path
-os.environ['DISPLAY'] = ':99'
 from base64 import b64decode
 import time
 import pdfplumber
 import requests
 from bs4 import BeautifulSoup
-import undetected_chromedriver as uc
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.print_page_options import PrintOptions
-import selenium.webdriver.chrome.options as ChromeOptions
-from selenium.common.exceptions import WebDriverException
 from dirs_configs.config import DATA_DIR
 from helpers.misc_helper import find_index_of_substring_in_list, url_active
+from helpers.river_stations import gauge_bracket
+from helpers.lazy import lazy_attr, lazy_import, start_display
 from dotenv import load_dotenv
-from pyvirtualdisplay import Display
-from xvfbwrapper import Xvfb
-import Xlib.display
-import pyautogui
-disp = Display(
-    visible=True,
-    size=(1366, 768),
-    backend="xvfb",
-    use_xauth=True
-    )
-disp.start()
-pyautogui._pyautogui_x11._display = Xlib.display.Display(
-    os.environ["DISPLAY"]
-    )
+# browser dependencies are loaded on first use, see helpers.lazy
+uc = lazy_import("undetected_chromedriver")
+webdriver = lazy_import("selenium.webdriver")
+selenium_exceptions = lazy_import("selenium.common.exceptions")
+By = lazy_attr("selenium.webdriver.common.by", "By")
+PrintOptions = lazy_attr(
+    "selenium.webdriver.common.print_page_options", "PrintOptions")
+Xvfb = lazy_attr("xvfbwrapper", "Xvfb")
 
 
 def water_level(
@@ -103,142 +90,16 @@ def water_level(
         logger.debug(gdf_center_xs_line_mile)
         water_level_path_1 = DATA_DIR / f"{projectnumber}-WaterLevel1.pdf"
         water_level_path_2 = DATA_DIR / f"{projectnumber}-WaterLevel2.pdf"
-        if float(221) >= float(gdf_center_xs_line_mile) >= float(196):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02314500"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02315000"
-            upper_xs = int(221)
-            lower_xs = int(196)
-        else:
-            pass
-        if float(196) >= float(gdf_center_xs_line_mile) >= float(171):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315000"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315500"
-            upper_xs = int(196)
-            lower_xs = int(171)
-        else:
-            pass
-        if float(171) >= float(gdf_center_xs_line_mile) >= float(150):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315500"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315550"
-            upper_xs = int(171)
-            lower_xs = int(150)
-        else:
-            pass
-        if float(150) >= float(gdf_center_xs_line_mile) >= float(135):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315550"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315650"
-            upper_xs = int(150)
-            lower_xs = int(135)
-        else:
-            pass
-        if float(135) >= float(gdf_center_xs_line_mile) >= float(127):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02315650"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02319500"
-            upper_xs = int(135)
-            lower_xs = int(127)
-        else:
-            pass
-        if float(127) >= float(gdf_center_xs_line_mile) >= float(113):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02319500"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02319800"
-            upper_xs = int(127)
-            lower_xs = int(113)
-        else:
-            pass
-        if float(113) >= float(gdf_center_xs_line_mile) >= float(103):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02319800"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02320000"
-            upper_xs = int(113)
-            lower_xs = int(103)
-        else:
-            pass
-        if float(103) >= float(gdf_center_xs_line_mile) >= float(98):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02320000"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime" \
-               + "river-30-day.php?id=02320000"
-            upper_xs = int(103)
-            lower_xs = int(98)
-        else:
-            pass
-        if float(98) >= float(gdf_center_xs_line_mile) >= float(76):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02320000"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02320500"
-            upper_xs = int(98)
-            lower_xs = int(76)
-        else:
-            pass
-        if float(76) >= float(gdf_center_xs_line_mile) >= float(57):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02320500"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323000"
-            upper_xs = int(76)
-            lower_xs = int(57)
-        else:
-            pass
-        if float(57) >= float(gdf_center_xs_line_mile) >= float(43):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323000"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323150"
-            upper_xs = int(57)
-            lower_xs = int(43)
-        else:
-            pass
-        if float(43) >= float(gdf_center_xs_line_mile) >= float(34):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323150"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323500"
-            upper_xs = int(43)
-            lower_xs = int(34)
-        else:
-            pass
-        if float(34) >= float(gdf_center_xs_line_mile) >= float(25):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323500"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323567"
-            upper_xs = int(34)
-            lower_xs = int(25)
-        else:
-            pass
-        if float(25) >= float(gdf_center_xs_line_mile) >= float(17):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323567"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323590"
-            upper_xs = int(25)
-            lower_xs = int(17)
-        else:
-            pass
-        if float(17) >= float(gdf_center_xs_line_mile) >= float(9):
-            water_level_url_1 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323590"
-            water_level_url_2 = "http://www.mysuwanneeriver.org/realtime/" \
-                + "river-30-day.php?id=02323592"
-            upper_xs = int(17)
-            lower_xs = int(9)
-        else:
-            pass
+        bracket = gauge_bracket(gdf_center_xs_line_mile)
+        if bracket is None:
+            logger.debug(
+                "get_water_level_data: mile %s outside the gauged reach",
+                gdf_center_xs_line_mile
+                )
+            return (None, None, None)
+        upper_xs, lower_xs, water_level_url_1, water_level_url_2 = bracket
         logger.debug("starting webdriver")
+        start_display()
         with Xvfb():
             if upper_xs == 43:
                 response = requests.get(water_level_url_1)
@@ -273,7 +134,7 @@ def water_level(
                             f.write(bytes_1)
                         driver.quit()
                         logger.debug("checkpoint: Water Level Data 1 Completed")
-                    except WebDriverException as e:
+                    except selenium_exceptions.WebDriverException as e:
                         logger.debug("checkpoint: Water Level Data 1 Failed")
                         logger.debug(f"Error: {e}")
                         driver.quit()
@@ -313,7 +174,7 @@ def water_level(
                             f.write(bytes_1)
                         driver.quit()
                         logger.debug("checkpoint: Water Level Data 2 Completed")
-                    except WebDriverException as e:
+                    except selenium_exceptions.WebDriverException as e:
                         logger.debug("checkpoint: Water Level Data 2 Failed")
                         logger.debug(f"Error: {e}")
                         driver.quit()
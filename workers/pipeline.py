@@ -0,0 +1,119 @@
+"""
+This module assembles the stage graph of the floodway program from the
+stages declared by the worker modules and runs it with the dependency
+scheduler in `helpers.scheduler`.
+
+The worker modules keep their historical grouping (and log files):
+- worker_module_1: project variables, directory setup, flood report,
+  FEMA data.
+- worker_module_2: parcel geometry, fillable PDFs, HEC-RAS, river mile.
+- worker_module_3: LAZ point cloud download, parcel research.
+- worker_module_4: center line, top of bank, water level, bank
+  geometry, parcel builder.
+
+Functions:
+- run_pipeline(db_file, pid, pid_dir_path, logger_main):
+    Runs every stage for one project database and logs the per-stage
+    timings, the critical path and the import time of each worker
+    module. Under the job runner each successful
+    stage is checkpointed, and a retry of the job skips the stages whose
+    checkpoints are still valid. Once the graph has drained the
+    artifacts of the stages are written to their files.
+"""
+import os
+import time
+from dirs_configs.config import (
+    CHECKPOINT_DIR,
+    JOB_DIR,
+    RESUME,
+    WORK_DIR
+    )
+from helpers.artifacts import write_artifacts
+from helpers.checkpoint import Checkpoint
+from helpers.lazy import import_report, timed_import
+from helpers.misc_helper import write_pid_to_file
+from helpers.scheduler import critical_path, run_stages, format_report
+from helpers import tracing
+from loggers.logger_worker_1 import get_worker_1_logger
+from loggers.logger_worker_2 import get_worker_2_logger
+from loggers.logger_worker_3 import get_worker_3_logger
+from loggers.logger_worker_4 import get_worker_4_logger
+
+worker_module_1 = timed_import("workers.worker_module_1")
+worker_module_2 = timed_import("workers.worker_module_2")
+worker_module_3 = timed_import("workers.worker_module_3")
+worker_module_4 = timed_import("workers.worker_module_4")
+
+STAGES = (
+    worker_module_1.STAGES
+    + worker_module_2.STAGES
+    + worker_module_3.STAGES
+    + worker_module_4.STAGES
+    )
+
+
+def register_stage_process(pid_dir_path):
+    """
+    Process pool initializer; records the pid of each stage process so
+    that main can terminate stragglers during cleanup.
+    """
+    pid_file_path = os.path.join(pid_dir_path, f"stage_{os.getpid()}.txt")
+    write_pid_to_file(pid_file_path)
+
+
+def project_checkpoint():
+    """
+    :return: The Checkpoint of the current job, or None when main runs
+    outside of the job runner.
+    """
+    if not JOB_DIR:
+        return None
+    return Checkpoint(
+        CHECKPOINT_DIR,
+        WORK_DIR,
+        exclude=("tmp/*_pid/*", "tmp/lock.txt", "tmp/dem_window/*"),
+        resume=RESUME,
+        ignore=("pid",),
+        file_inputs=("db_file",)
+        )
+
+
+def run_pipeline(db_file, pid, pid_dir_path, logger_main):
+    """
+    Runs the full stage graph for one project database.
+
+    :param db_file: Path of the sqlite3 project database.
+    :param pid: Pid handed to stages that abort the run on fatal
+    errors (flood_report).
+    :param pid_dir_path: Directory where stage process pids are
+    recorded.
+    :param logger_main: Logger for scheduler messages and the report.
+    :return: Tuple of (values, records) as returned by run_stages.
+    """
+    initial = {
+        "db_file": db_file,
+        "pid": pid,
+        "logger_worker_1": get_worker_1_logger(),
+        "logger_worker_2": get_worker_2_logger(),
+        "logger_worker_3": get_worker_3_logger(),
+        "logger_worker_4": get_worker_4_logger(),
+        }
+    values, records = run_stages(
+        STAGES,
+        initial,
+        logger_main,
+        initializer=register_stage_process,
+        initargs=(str(pid_dir_path),),
+        checkpoint=project_checkpoint()
+        )
+    # also after failed stages, so a retry finds what was produced
+    started = time.time()
+    written = write_artifacts(log=logger_main.debug)
+    logger_main.debug(
+        f"artifacts: {len(written)} files written" \
+            + f" in {time.time() - started:.2f}s")
+    tracing.stage_wait_events(records, critical_path(STAGES, records))
+    for line in import_report() + format_report(STAGES, records):
+        logger_main.debug(line)
+        print(f"main: {line}")
+    return values, records